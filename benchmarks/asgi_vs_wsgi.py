@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+"""
+Compare concurrent-request throughput of the public pages under WSGI and ASGI.
+
+Calls the project's own WSGI and ASGI applications in-process against the
+same database: WSGI requests run on a pool of threads (like a threaded
+gunicorn worker), ASGI requests run as tasks on one event loop (like a
+uvicorn worker). The page and fragment caches are turned off so every
+request reaches the database.
+
+Expect ASGI to come out at or below WSGI: Django runs the async views' ORM
+queries and template rendering on one shared thread through sync_to_async,
+so they don't overlap and each hop adds overhead.
+
+Usage (after seeding the database):
+    python benchmarks/asgi_vs_wsgi.py
+    python benchmarks/asgi_vs_wsgi.py --requests 500 --concurrency 32 --url /theme/imlil/
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website_cms.settings')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+from cms.models import Page
+
+
+def page_url(page):
+    if page.slug == 'index':
+        return '/'
+    if page.type == 'theme':
+        return f'/theme/{page.slug}/'
+    return f'/page/{page.slug}/'
+
+
+def host():
+    for name in settings.ALLOWED_HOSTS:
+        if name != '*' and not name.startswith('.'):
+            return name
+    return 'localhost'
+
+
+def run_wsgi(urls, requests, concurrency):
+    application = get_wsgi_application()
+
+    def request(url):
+        path = urlsplit(url)
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path.path,
+            'QUERY_STRING': path.query,
+            'SERVER_NAME': host(),
+            'SERVER_PORT': '80',
+            'HTTP_HOST': host(),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(),
+            'wsgi.errors': sys.stderr,
+        }
+        statuses = []
+        body = b''.join(application(environ, lambda status, headers: statuses.append(status)))
+        return int(statuses[0].split()[0]), len(body)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(request, (urls[i % len(urls)] for i in range(requests))))
+
+
+async def run_asgi(urls, requests, concurrency):
+    application = get_asgi_application()
+    limit = asyncio.Semaphore(concurrency)
+
+    async def request(url):
+        path = urlsplit(url)
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path.path,
+            'raw_path': path.path.encode(),
+            'query_string': path.query.encode(),
+            'root_path': '',
+            'headers': [(b'host', host().encode())],
+            'client': ('127.0.0.1', 0),
+            'server': (host(), 80),
+        }
+        messages = []
+        body_sent = asyncio.Event()
+
+        async def receive():
+            if body_sent.is_set():
+                # The client never disconnects; Django cancels this wait itself
+                await asyncio.Event().wait()
+            body_sent.set()
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        async with limit:
+            await application(scope, receive, send)
+        status = next(m['status'] for m in messages if m['type'] == 'http.response.start')
+        body = sum(len(m.get('body', b'')) for m in messages if m['type'] == 'http.response.body')
+        return status, body
+
+    return await asyncio.gather(*(request(urls[i % len(urls)]) for i in range(requests)))
+
+
+def report(label, results, elapsed):
+    errors = sum(1 for status, _ in results if status != 200)
+    print(f'{label:<5} {len(results):>6} requests in {elapsed:6.2f}s  '
+          f'{len(results) / elapsed:8.1f} req/s  {errors} non-200')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='Requests per run')
+    parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight at once')
+    parser.add_argument('--url', action='append', dest='urls',
+                        help='URL to request (repeatable); defaults to every page')
+    args = parser.parse_args()
+
+    urls = args.urls or [page_url(page) for page in Page.objects.order_by('id')]
+    if not urls:
+        sys.exit('There are no pages; seed the database first.')
+
+    print(f'{len(urls)} url(s), {args.requests} requests, concurrency {args.concurrency}')
+    with override_settings(CMS_PAGE_CACHE_TIMEOUT=0, CMS_FRAGMENT_CACHE_TIMEOUT=0, DEBUG=False):
+        # Warm up both stacks (URL resolver, templates, JSON cache) before timing
+        run_wsgi(urls, len(urls), 1)
+        asyncio.run(run_asgi(urls, len(urls), 1))
+
+        started = time.perf_counter()
+        results = run_wsgi(urls, args.requests, args.concurrency)
+        report('WSGI', results, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        results = asyncio.run(run_asgi(urls, args.requests, args.concurrency))
+        report('ASGI', results, time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    main()
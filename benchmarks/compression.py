@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Measure response compression: CPU per page against bytes sent, per coding and level.
+
+Renders the public pages once, then compresses each body at every gzip
+level (and brotli quality, when the brotli package is installed).
+Compare the CPU column with the time a page takes to render.
+
+Usage (after seeding the database):
+    python benchmarks/compression.py [--repeat 20] [--pages 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website_cms.settings')
+
+import django
+django.setup()
+
+from django.test import Client
+from django.test.utils import override_settings
+from cms import compression
+from cms.models import Page
+
+LEVELS = {'gzip': range(1, 10), 'br': range(0, 12)}
+
+
+def cpu_per_page(bodies, coding, level, repeat):
+    """(average CPU milliseconds to compress one page, total compressed bytes)"""
+    start = time.process_time()
+    for _ in range(repeat):
+        size = sum(len(compression.compress_body(body, coding, level)) for body in bodies)
+    return (time.process_time() - start) * 1000 / (repeat * len(bodies)), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--pages', type=int, default=20, help='Most pages to sample')
+    args = parser.parse_args()
+
+    if not Page.objects.exists():
+        print('No pages found; seed the database first.')
+        return
+    urls = ['/'] + [f'/theme/{slug}/' for slug in
+                    Page.objects.filter(type='theme').values_list('slug', flat=True)[:args.pages - 1]]
+    client = Client()
+    bodies = []
+    render_started = time.process_time()
+    # Uncached and uncompressed: the bodies CompressionMiddleware would see.
+    # The test client sends Host: testserver.
+    with override_settings(ALLOWED_HOSTS=['testserver'], CMS_PAGE_CACHE_TIMEOUT=0, CMS_FRAGMENT_CACHE_TIMEOUT=0):
+        for url in urls:
+            response = client.get(url)
+            if response.status_code != 200:
+                sys.exit(f'GET {url} returned {response.status_code}')
+            bodies.append(response.content)
+    render_ms = (time.process_time() - render_started) * 1000 / len(urls)
+    plain = sum(len(body) for body in bodies)
+
+    print(f'Pages:        {len(bodies)}, {plain / len(bodies) / 1024:.1f} KB average')
+    print(f'Render:       {render_ms:.2f} ms CPU per page (uncached)')
+    print()
+    print(f'{"coding":<8}{"level":>6}{"CPU ms/page":>13}{"KB/page":>10}{"ratio":>8}')
+    for coding in compression.CODINGS:
+        if coding == 'br' and compression._brotli() is None:
+            print('br: not measured (pip install brotli)')
+            continue
+        configured = compression.compression_levels().get(coding)
+        for level in LEVELS[coding]:
+            cpu_ms, size = cpu_per_page(bodies, coding, level, args.repeat)
+            marker = '  <- CMS_COMPRESSION_LEVELS' if level == configured else ''
+            print(f'{coding:<8}{level:>6}{cpu_ms:>13.3f}{size / len(bodies) / 1024:>10.1f}'
+                  f'{size / plain:>8.1%}{marker}')
+    print()
+    print('Cached pages are compressed once when stored, so a cache hit costs none of this.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+"""
+Measure media serving throughput for large files: Python copy vs sendfile.
+
+Serves a generated file from a temporary MEDIA_ROOT through the project's
+WSGI application on a real socket, and downloads it from client threads:
+whole-file GETs and random Range requests (what a seeking <video> sends).
+
+Server modes:
+  copy       no wsgi.file_wrapper: Django reads the file and writes every
+             block from Python (runserver, most ASGI servers)
+  sendfile   a wsgi.file_wrapper that hands the open file to sendfile(2),
+             like gunicorn does, so the kernel copies the bytes
+  x-accel    CMS_FILE_OFFLOAD='x-accel': Django only returns the
+             X-Accel-Redirect header and nginx would send the file; this
+             measures the cost of that handoff (no body is transferred)
+
+CPU is the benchmark process's CPU time (server and client threads
+together) per GB, so lower means cheaper serving.
+
+Usage:
+    python benchmarks/media_throughput.py
+    python benchmarks/media_throughput.py --size 512 --requests 40 --concurrency 8 --range-size 1
+"""
+import argparse
+import http.client
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import ServerHandler, WSGIRequestHandler, WSGIServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website_cms.settings')
+
+import django
+django.setup()
+
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+
+MODES = ('copy', 'sendfile', 'x-accel')
+
+
+class SendfileHandler(ServerHandler):
+    """wsgiref handler that sends wsgi.file_wrapper responses with sendfile(2)"""
+    def sendfile(self):
+        try:
+            fileno = self.result.filelike.fileno()
+        except (AttributeError, OSError):
+            return False
+        if not self.headers_sent:
+            self.send_headers()
+        self._flush()
+        offset = os.lseek(fileno, 0, os.SEEK_CUR)
+        remaining = int(self.headers['Content-Length'])
+        socket_fileno = self.request_handler.connection.fileno()
+        while remaining > 0:
+            sent = os.sendfile(socket_fileno, fileno, offset, remaining)
+            if not sent:
+                break
+            offset += sent
+            remaining -= sent
+            self.bytes_sent += sent
+        return True
+
+
+class CopyHandler(ServerHandler):
+    wsgi_file_wrapper = None
+
+
+class RequestHandler(WSGIRequestHandler):
+    handler_class = CopyHandler
+
+    def handle(self):
+        # WSGIRequestHandler.handle, with a configurable handler class
+        self.raw_requestline = self.rfile.readline(65537)
+        if not self.raw_requestline or not self.parse_request():
+            return
+        handler = self.handler_class(self.rfile, self.wfile, self.get_stderr(), self.get_environ(),
+                                     multithread=True)
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+def start_server(mode):
+    handler = type('Handler', (RequestHandler,), {
+        'handler_class': SendfileHandler if mode == 'sendfile' else CopyHandler,
+    })
+    server = ThreadingServer(('127.0.0.1', 0), handler)
+    server.set_app(get_wsgi_application())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fetch(port, url, byte_range=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    headers = {'Host': 'localhost'}
+    if byte_range:
+        headers['Range'] = f'bytes={byte_range[0]}-{byte_range[1]}'
+    connection.request('GET', url, headers=headers)
+    response = connection.getresponse()
+    buffer = bytearray(1024 * 1024)
+    received = 0
+    while True:
+        count = response.readinto(buffer)
+        if not count:
+            break
+        received += count
+    connection.close()
+    return response.status, received
+
+
+def run(mode, port, url, size, kind, requests, concurrency, range_size):
+    rng = random.Random(0)
+    jobs = []
+    for _ in range(requests):
+        if kind == 'range':
+            start = rng.randrange(0, max(1, size - range_size))
+            jobs.append((start, min(size, start + range_size) - 1))
+        else:
+            jobs.append(None)
+
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda byte_range: fetch(port, url, byte_range), jobs))
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    # With x-accel the web server answers the Range; Django's handoff is a 200
+    expected_status = 206 if kind == 'range' and mode != 'x-accel' else 200
+    errors = sum(1 for status, _ in results if status != expected_status)
+    received = sum(count for _, count in results)
+    if mode != 'x-accel':
+        expected = sum(end - start + 1 for start, end in jobs) if kind == 'range' else size * requests
+        if received != expected:
+            errors += 1
+    if mode == 'x-accel':
+        # No body is sent; the handoff's cost is per request
+        print(f'{mode:<9} {kind:<6} {requests:>5} req  {requests / elapsed:9.1f} req/s  '
+              f'{"":>11}  {cpu * 1000 / requests:7.2f} ms CPU/req  {errors} errors')
+    else:
+        print(f'{mode:<9} {kind:<6} {requests:>5} req  {requests / elapsed:9.1f} req/s  '
+              f'{received / elapsed / 1e6:7.0f} MB/s  {cpu / max(received, 1) * 1e9:7.2f} s CPU/GB  {errors} errors')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=256, help='Test file size in MB')
+    parser.add_argument('--requests', type=int, default=20, help='Requests per run')
+    parser.add_argument('--range-requests', type=int, default=200, help='Range requests per run')
+    parser.add_argument('--range-size', type=float, default=1, help='Bytes per Range request, in MB')
+    parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight at once')
+    parser.add_argument('--mode', action='append', dest='modes', choices=MODES,
+                        help='Server mode to run (repeatable); defaults to all')
+    args = parser.parse_args()
+
+    size = args.size * 1024 * 1024
+    range_size = int(args.range_size * 1024 * 1024)
+    media_root = tempfile.mkdtemp(prefix='media-bench-')
+    try:
+        os.makedirs(os.path.join(media_root, 'videos'))
+        with open(os.path.join(media_root, 'videos', 'bench.mp4'), 'wb') as bench_file:
+            block = os.urandom(1024 * 1024)
+            for _ in range(args.size):
+                bench_file.write(block)
+
+        print(f'{args.size} MB file, concurrency {args.concurrency}, '
+              f'{args.range_size:g} MB ranges, {os.cpu_count()} CPU(s)')
+        for mode in args.modes or MODES:
+            offload = 'x-accel' if mode == 'x-accel' else None
+            with override_settings(MEDIA_ROOT=media_root, DEBUG=False, CMS_FILE_OFFLOAD=offload,
+                                   CMS_SERVER_TIMING=False, ALLOWED_HOSTS=['localhost']):
+                server = start_server(mode)
+                port = server.server_address[1]
+                try:
+                    # Warm up the URL resolver and middleware
+                    fetch(port, '/media/videos/bench.mp4', (0, 0))
+                    run(mode, port, '/media/videos/bench.mp4', size, 'full',
+                        args.requests, args.concurrency, range_size)
+                    run(mode, port, '/media/videos/bench.mp4', size, 'range',
+                        args.range_requests, args.concurrency, range_size)
+                finally:
+                    server.shutdown()
+                    server.server_close()
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Check that rendering each page runs a fixed number of SQL queries.
+
+Renders every Page through its public view, in public mode and in edit
+mode, with the page and fragment caches turned off, plus the dashboard
+pages. Exits with status 1 if any view fails or runs more queries than
+expected, which usually means an N+1 lookup crept back into a template or
+tag. cms/tests.py checks the same counts on the initial data under
+`manage.py test`.
+
+Usage (after seeding the database):
+    python benchmarks/query_counts.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website_cms.settings')
+
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from cms.models import Page, Section
+
+# Sections + elements
+PAGE_QUERIES = 2
+# Plus the content version lookup for conditional GET (cached afterwards)
+PUBLIC_PAGE_QUERIES = PAGE_QUERIES + 1
+# Plus session and user lookups for the logged-in editor (no conditional GET)
+EDIT_PAGE_QUERIES = PAGE_QUERIES + 2
+DASHBOARD_QUERIES = {
+    'dashboard': 4,
+    'edit_page': 4,
+    'edit_section': 4,
+}
+
+
+def page_url(page):
+    if page.slug == 'index':
+        return '/'
+    if page.type == 'theme':
+        return f'/theme/{page.slug}/'
+    return f'/page/{page.slug}/'
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    return response.status_code, len(queries)
+
+
+def main():
+    failures = []
+
+    def check(label, client, url, expected):
+        status, count = count_queries(client, url)
+        if status != 200:
+            print(f'FAIL {label:40} {url} returned {status}')
+            failures.append(label)
+            return
+        result = 'ok' if count <= expected else 'FAIL'
+        print(f'{result:4} {label:40} {count:3} queries (expected {expected})')
+        if count > expected:
+            failures.append(label)
+
+    with override_settings(ALLOWED_HOSTS=['testserver'], CMS_PAGE_CACHE_TIMEOUT=0, CMS_FRAGMENT_CACHE_TIMEOUT=0), \
+            transaction.atomic():
+        editor = User.objects.create_superuser('query-count-editor', password='unused')
+
+        public = Client(raise_request_exception=False)
+        editing = Client(raise_request_exception=False)
+        editing.force_login(editor)
+        session = editing.session
+        session['edit_mode'] = True
+        session.save()
+
+        for page in Page.objects.order_by('id'):
+            check(f'{page.slug} (public)', public, page_url(page), PUBLIC_PAGE_QUERIES)
+            check(f'{page.slug} (edit mode)', editing, page_url(page), EDIT_PAGE_QUERIES)
+
+        check('dashboard', editing, '/dashboard/', DASHBOARD_QUERIES['dashboard'])
+        page = Page.objects.first()
+        if page:
+            check('edit_page', editing, f'/dashboard/page/{page.id}/', DASHBOARD_QUERIES['edit_page'])
+        section = Section.objects.first()
+        if section:
+            check('edit_section', editing, f'/dashboard/section/{section.id}/', DASHBOARD_QUERIES['edit_section'])
+
+        transaction.set_rollback(True)
+
+    if failures:
+        print(f'{len(failures)} view(s) failed or went over their query budget')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
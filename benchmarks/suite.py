@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+"""
+Benchmark page rendering and the editing API on a generated dataset.
+
+"run" creates a throwaway test database on the configured backend (SQLite
+or MySQL), seeds it with the generate_site dataset at the given size, then
+measures latency percentiles, throughput and query counts for the public
+views, the dashboard and the editor API. Results go to a JSON file. "compare" diffs
+two result files and exits with status 1 if anything regressed.
+
+Usage:
+    python benchmarks/suite.py run --pages 50 --sections 6 --elements 8 --output before.json
+    python benchmarks/suite.py compare before.json after.json [--threshold 0.1]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website_cms.settings')
+
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from cms.models import Page, Section, Element
+from cms.seeders.site import SiteGenerator
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def seed(args):
+    """Fill the (empty) test database; returns the editor user"""
+    SiteGenerator(
+        pages=args.pages,
+        gallery_size=args.gallery_size,
+        sections=args.sections,
+        elements=args.elements,
+        payload_size=args.payload,
+        seed=args.seed,
+    ).generate()
+    return User.objects.create_superuser('bench-editor', password='unused')
+
+
+def send(client, method, url, data):
+    if method == 'post_json':
+        return client.post(url, data, content_type='application/json')
+    return getattr(client, method)(url, data)
+
+
+def measure(client, method, url, data, iterations, warmup):
+    for _ in range(warmup):
+        send(client, method, url, data)
+    timings = []
+    queries = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            request_started = time.perf_counter()
+            response = send(client, method, url, data)
+            timings.append((time.perf_counter() - request_started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f'{method.upper()} {url} returned {response.status_code}')
+        queries.append(len(captured))
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        'url': url,
+        'iterations': iterations,
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p90_ms': round(percentile(timings, 90), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'max_ms': round(timings[-1], 3),
+        'requests_per_second': round(iterations / elapsed, 1),
+        'queries': max(queries),
+    }
+
+
+def percentile(sorted_values, percent):
+    index = (len(sorted_values) - 1) * percent / 100
+    lower = int(index)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (index - lower)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    creation = connection.creation
+    if connection.vendor == 'sqlite':
+        # A file rather than the in-memory default, closer to a real deployment
+        connection.settings_dict['TEST']['NAME'] = os.path.join(BASE_DIR, 'benchmarks', '.bench.sqlite3')
+    creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+    try:
+        return run_benchmarks(args)
+    finally:
+        creation.destroy_test_db(connection.settings_dict['NAME'], verbosity=0)
+
+
+def run_benchmarks(args):
+    seed_started = time.perf_counter()
+    editor = seed(args)
+    seed_seconds = time.perf_counter() - seed_started
+
+    theme_page = Page.objects.filter(type='theme').order_by('id').first()
+    section = Section.objects.filter(page=theme_page).order_by('id').first()
+    element = Element.objects.filter(section=section).order_by('id').first()
+    # Ten elements' title and description in one request
+    batch = list(Element.objects.filter(section__page=theme_page).order_by('id')[:10])
+
+    public = Client()
+    editing = Client()
+    editing.force_login(editor)
+
+    endpoints = [
+        ('home', public, 'get', '/', None),
+        ('page_detail', public, 'get', f'/page/{theme_page.slug}/', None),
+        ('theme_page', public, 'get', f'/theme/{theme_page.slug}/', None),
+        ('dashboard', editing, 'get', '/dashboard/', None),
+        ('edit_section', editing, 'get', f'/dashboard/section/{section.id}/', None),
+        ('update_element', editing, 'post', f'/dashboard/element/{element.id}/update/',
+         {'field': 'title', 'value': 'Benchmark title'}),
+        ('update_elements', editing, 'post_json', '/dashboard/elements/update/',
+         {'changes': [{'id': batch_element.id, 'field': field, 'value': f'Benchmark {field}'}
+                      for batch_element in batch for field in ('title', 'description')]}),
+        ('get_element', editing, 'get', f'/dashboard/element/{element.id}/get/', None),
+    ]
+
+    caches = {} if args.cached else {'CMS_PAGE_CACHE_TIMEOUT': 0, 'CMS_FRAGMENT_CACHE_TIMEOUT': 0}
+    results = {}
+    # The test client sends Host: testserver
+    with override_settings(ALLOWED_HOSTS=['testserver'], **caches):
+        cache.clear()
+        for name, client, method, url, data in endpoints:
+            results[name] = measure(client, method, url, data, args.iterations, args.warmup)
+            print(f'{name:15} p50 {results[name]["p50_ms"]:8.2f}ms  p90 {results[name]["p90_ms"]:8.2f}ms  '
+                  f'{results[name]["requests_per_second"]:8.1f} req/s  {results[name]["queries"]:3} queries')
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'revision': git_revision(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'platform': platform.platform(),
+        },
+        'dataset': {
+            'pages': args.pages,
+            'sections_per_page': args.sections,
+            'elements_per_section': args.elements,
+            'gallery_size': args.gallery_size,
+            'payload_bytes': args.payload,
+            'seed': args.seed,
+            'seed_seconds': round(seed_seconds, 2),
+        },
+        'options': {'iterations': args.iterations, 'warmup': args.warmup, 'cached': args.cached},
+        'results': results,
+    }
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+    print(f'Results written to {args.output}')
+
+
+def compare(args):
+    with open(args.before) as before_file, open(args.after) as after_file:
+        before, after = json.load(before_file), json.load(after_file)
+    if before.get('dataset') != after.get('dataset'):
+        print('Warning: the two runs used different datasets')
+
+    regressions = []
+    print(f'{"endpoint":15} {"metric":8} {"before":>10} {"after":>10} {"change":>8}')
+    for name, old in before['results'].items():
+        new = after['results'].get(name)
+        if new is None:
+            continue
+        for metric in ('p50_ms', 'p90_ms', 'p99_ms', 'queries'):
+            change = (new[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+            if metric == 'queries':
+                regressed = new[metric] > old[metric]
+            else:
+                # p99 of a short run is too noisy to gate on; it is shown for reference
+                regressed = metric != 'p99_ms' and change > args.threshold
+            flag = '  REGRESSION' if regressed else ''
+            print(f'{name:15} {metric:8} {old[metric]:10.2f} {new[metric]:10.2f} {change:+8.1%}{flag}')
+            if regressed:
+                regressions.append(f'{name} {metric}')
+
+    if regressions:
+        print(f'{len(regressions)} regression(s): {", ".join(regressions)}')
+        sys.exit(1)
+    print('No regressions')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Seed a test database and run the benchmarks')
+    run_parser.add_argument('--pages', type=int, default=20, help='Pages, including the home page')
+    run_parser.add_argument('--sections', type=int, default=5, help='Sections per theme page')
+    run_parser.add_argument('--elements', type=int, default=5, help='Elements per generic section')
+    run_parser.add_argument('--gallery-size', type=int, default=12, help='Gallery images per theme page')
+    run_parser.add_argument('--payload', type=int, default=512, help='Approximate JSON bytes per element')
+    run_parser.add_argument('--seed', type=int, default=0, help='Random seed for the dataset')
+    run_parser.add_argument('--iterations', type=int, default=100, help='Timed requests per endpoint')
+    run_parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per endpoint')
+    run_parser.add_argument('--cached', action='store_true', help='Keep the page and fragment caches on')
+    run_parser.add_argument('--output', default='benchmark-results.json', help='Where to write the results')
+
+    compare_parser = commands.add_parser('compare', help='Diff two result files')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='Relative latency increase counted as a regression (0.1 = 10%%)')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == '__main__':
+    main()
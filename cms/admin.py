@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import Page, Section, Element, EditHistory
+from .models import Page, Section, Element, EditHistory, Job, MediaFile
+
+class SectionListFilter(admin.RelatedFieldListFilter):
+    """Section filter whose labels (page - section) need no query per section"""
+    def field_choices(self, field, request, model_admin):
+        return [(section.pk, str(section)) for section in Section.objects.select_related('page')]
 
 class ElementInline(admin.TabularInline):
     model = Element
@@ -8,6 +13,7 @@ class ElementInline(admin.TabularInline):
 class SectionAdmin(admin.ModelAdmin):
     list_display = ('name', 'page', 'type', 'order')
     list_filter = ('page', 'type')
+    list_select_related = ('page',)
     search_fields = ('name', 'page__name')
     inlines = [ElementInline]
 
@@ -23,17 +29,39 @@ class PageAdmin(admin.ModelAdmin):
     inlines = [SectionInline]
 
 class ElementAdmin(admin.ModelAdmin):
-    list_display = ('id', 'section', 'title', 'order')
-    list_filter = ('section__page', 'section')
+    list_display = ('id', 'section', 'title', 'json_type', 'order')
+    list_filter = ('section__page', ('section', SectionListFilter), 'json_type')
+    list_select_related = ('section__page',)
     search_fields = ('title', 'description', 'section__name')
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'section':
+            kwargs['queryset'] = Section.objects.select_related('page')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
 class EditHistoryAdmin(admin.ModelAdmin):
     list_display = ('user', 'element', 'field_name', 'timestamp')
     list_filter = ('user', 'field_name', 'timestamp')
+    list_select_related = ('user', 'element__section__page')
     search_fields = ('user__username', 'element__title', 'field_name')
     readonly_fields = ('user', 'element', 'field_name', 'previous_value', 'new_value', 'timestamp')
 
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'attempts', 'element', 'run_after', 'updated_at')
+    list_filter = ('status', 'kind')
+    list_select_related = ('element__section__page',)
+    readonly_fields = ('locked_by', 'locked_at', 'last_error', 'result', 'created_at', 'updated_at')
+
+class MediaFileAdmin(admin.ModelAdmin):
+    list_display = ('original_name', 'path', 'content_type', 'size', 'uploaded_by', 'created_at')
+    list_filter = ('content_type',)
+    list_select_related = ('uploaded_by',)
+    search_fields = ('original_name', 'sha256')
+    readonly_fields = ('sha256', 'path', 'size', 'created_at')
+
 admin.site.register(Page, PageAdmin)
 admin.site.register(Section, SectionAdmin)
 admin.site.register(Element, ElementAdmin)
 admin.site.register(EditHistory, EditHistoryAdmin)
+admin.site.register(Job, JobAdmin)
+admin.site.register(MediaFile, MediaFileAdmin)
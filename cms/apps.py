@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class CmsConfig(AppConfig):
+    name = 'cms'
+
+    def ready(self):
+        # Connect cache invalidation handlers
+        from . import signals  # noqa: F401
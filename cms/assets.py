@@ -0,0 +1,290 @@
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import subprocess
+import tempfile
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+# Bundles (settings.CMS_ASSET_BUNDLES) are built by `manage.py build_assets`
+# into static/bundles/<name>.<hash>.<ext>, next to .gz and .br copies, and
+# listed in static/bundles/manifest.json. Fingerprinted names (bundles and
+# the icon font, see cms/icons.py) never change content, so they are served
+# with immutable caching.
+BUNDLE_DIR = 'bundles'
+FINGERPRINTED_PATH = re.compile(r'^(bundles|icons)/[\w.-]+\.[0-9a-f]{12}\.(css|js|woff2?)(\.gz|\.br)?$')
+
+CSS_STRINGS_AND_COMMENTS = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/''', re.S)
+CSS_URL = re.compile(r'''url\(\s*(["']?)([^"')]+)\1\s*\)''')
+CSS_IMPORT = re.compile(r'@(?:import|charset)\s[^;]+;')
+
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^}')
+REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void',
+                  'throw', 'instanceof', 'yield', 'await'}
+
+
+def is_fingerprinted(path):
+    """True for built bundle and icon font paths (relative to STATIC_URL), which can be cached for good"""
+    return bool(FINGERPRINTED_PATH.match(path))
+
+
+def bundle_dir():
+    return os.path.join(settings.CMS_ASSET_BUILD_DIR, BUNDLE_DIR)
+
+
+def manifest_path():
+    return os.path.join(bundle_dir(), 'manifest.json')
+
+
+def minify_css(text):
+    """Drop comments and the whitespace CSS doesn't need; strings are left alone"""
+    parts = []
+    position = 0
+    for match in CSS_STRINGS_AND_COMMENTS.finditer(text):
+        parts.append(_squeeze_css(text[position:match.start()] + ('' if match.group(1) else ' ')))
+        if match.group(1):
+            parts.append(match.group(1))
+        position = match.end()
+    parts.append(_squeeze_css(text[position:]))
+    return ''.join(parts).strip()
+
+
+def _squeeze_css(text):
+    text = re.sub(r'\s+', ' ', text)
+    # Not around + > ~ or inside values: calc(1px + 2px) needs its spaces
+    text = re.sub(r' ?([{};,]) ?', r'\1', text)
+    text = re.sub(r': ', ':', text)
+    return text.replace(';}', '}')
+
+
+def _is_word_char(char):
+    return char.isalnum() or char in '_$\\' or ord(char) > 127
+
+
+def minify_js(source):
+    """
+    Drop comments, indentation and blank lines. Line breaks that could end a
+    statement are kept, so automatic semicolon insertion works as before;
+    strings, template literals and regular expressions are copied verbatim.
+    """
+    out = []
+    pending = ''       # whitespace skipped since the last token: '', ' ' or '\n'
+    templates = []     # open braces inside each ${...} we are in
+    previous = ''      # the last token, to tell a regex from a division
+    i, length = 0, len(source)
+
+    def emit(token):
+        nonlocal pending
+        if pending and out:
+            last = out[-1][-1]
+            if pending == '\n' and last not in '{;,([' and token[0] not in '})],;':
+                out.append('\n')
+            elif ((_is_word_char(last) and _is_word_char(token[0]))
+                  or (last in '+-' and token[0] in '+-') or (last == '/' and token[0] == '/')):
+                out.append(' ')
+        pending = ''
+        out.append(token)
+
+    while i < length:
+        char = source[i]
+        if char.isspace():
+            end = i
+            while end < length and source[end].isspace():
+                end += 1
+            pending = '\n' if pending == '\n' or '\n' in source[i:end] else ' '
+            i = end
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = length if end == -1 else end
+            pending = '\n'
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = length if end == -1 else end + 2
+            pending = '\n' if pending == '\n' or '\n' in source[i:end] else ' '
+            i = end
+        elif char in '\'"':
+            end = i + 1
+            while end < length and source[end] != char:
+                end += 2 if source[end] == '\\' else 1
+            emit(source[i:end + 1])
+            previous = char
+            i = end + 1
+        elif char == '`' or (char == '}' and templates and templates[-1] == 0):
+            # A template literal, or its continuation after a ${...} expression
+            if char == '}':
+                templates.pop()
+            end = i + 1
+            while end < length and source[end] != '`' and not source.startswith('${', end):
+                end += 2 if source[end] == '\\' else 1
+            if source.startswith('${', end):
+                templates.append(0)
+                emit(source[i:end + 2])
+                previous = '{'
+                i = end + 2
+            else:
+                emit(source[i:end + 1])
+                previous = '`'
+                i = end + 1
+        elif char == '/' and (previous in REGEX_PRECEDERS or previous in REGEX_KEYWORDS or not previous):
+            end = i + 1
+            in_class = False
+            while end < length and source[end] != '\n':
+                if source[end] == '\\':
+                    end += 2
+                    continue
+                if source[end] == '[':
+                    in_class = True
+                elif source[end] == ']':
+                    in_class = False
+                elif source[end] == '/' and not in_class:
+                    break
+                end += 1
+            end += 1
+            while end < length and source[end].isalpha():
+                end += 1
+            emit(source[i:end])
+            previous = '/regex/'
+            i = end
+        elif _is_word_char(char):
+            end = i
+            while end < length and _is_word_char(source[end]):
+                end += 2 if source[end] == '\\' else 1
+            previous = source[i:end]
+            emit(previous)
+            i = end
+        else:
+            if char == '{' and templates:
+                templates[-1] += 1
+            elif char == '}' and templates:
+                templates[-1] -= 1
+            emit(char)
+            previous = char
+            i += 1
+    return ''.join(out)
+
+
+def rewrite_css_urls(text, source_url):
+    """Relative url()s in a stylesheet at source_url, made absolute so they still work from the bundle"""
+    def absolute(match):
+        quote, url = match.groups()
+        url = url.strip()
+        if url.startswith(('/', 'data:', 'http:', 'https:', '#')) or '://' in url:
+            return match.group(0)
+        url = posixpath.normpath(posixpath.join(posixpath.dirname(source_url), url))
+        return f'url({quote}{url}{quote})'
+    return CSS_URL.sub(absolute, text)
+
+
+def bundle_sources(name):
+    """Files on disk for the bundle's sources, in order; ValueError names any that is missing"""
+    paths = []
+    for source in settings.CMS_ASSET_BUNDLES[name]:
+        path = finders.find(source)
+        if not path:
+            raise ValueError(f'{name}: static file {source!r} not found')
+        paths.append(path)
+    return paths
+
+
+def build_bundle(name, minify=True):
+    """The bundle's contents: its sources concatenated (and minified), as bytes"""
+    is_css = name.endswith('.css')
+    parts = []
+    imports = []
+    for source, path in zip(settings.CMS_ASSET_BUNDLES[name], bundle_sources(name)):
+        with open(path, encoding='utf-8') as source_file:
+            text = source_file.read()
+        if is_css:
+            text = rewrite_css_urls(text, settings.STATIC_URL + source)
+            # @import is only valid at the top of a stylesheet
+            imports.extend(rule for rule in CSS_IMPORT.findall(text) if not rule.startswith('@charset'))
+            text = CSS_IMPORT.sub('', text)
+        parts.append((minify_css if is_css else minify_js)(text) if minify else text.strip())
+    if is_css:
+        return '\n'.join(imports + parts).encode('utf-8') + b'\n'
+    # A file that ends without a semicolon must not run into the next one
+    return ';\n'.join(parts).encode('utf-8') + b'\n'
+
+
+def fingerprinted_name(name, content):
+    stem, extension = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}'
+
+
+def _brotli_compress(data):
+    """Brotli with the brotli package, else the brotli command line tool; None if neither is installed"""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    if brotli is not None:
+        return brotli.compress(data, quality=11)
+    if shutil.which('brotli'):
+        return subprocess.run(['brotli', '-c', '-q', '11'], input=data, stdout=subprocess.PIPE,
+                              check=True).stdout
+    return None
+
+
+def write_atomic(path, data):
+    """Write to a temporary file in the same directory, then rename it into place"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def compress(data):
+    """{'.gz': bytes, '.br': bytes} for the encodings available that make the file smaller"""
+    compressed = {'.gz': gzip.compress(data, compresslevel=9, mtime=0), '.br': _brotli_compress(data)}
+    return {suffix: value for suffix, value in compressed.items() if value is not None and len(value) < len(data)}
+
+
+_manifests = {}
+
+
+def read_manifest(path):
+    """A build manifest (JSON), re-read only when the file changes; {} before the first build"""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    cached = _manifests.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, encoding='utf-8') as manifest_file:
+            cached = _manifests[path] = (mtime, json.load(manifest_file))
+    return cached[1]
+
+
+def load_manifest():
+    """The built bundles from manifest.json, or {} before a build"""
+    return read_manifest(manifest_path()).get('bundles', {})
+
+
+def bundle_urls(name):
+    """
+    URLs to load for a bundle: the built file, or its sources one by one when
+    it hasn't been built (or, in DEBUG, when a source changed since the build).
+    """
+    if name not in settings.CMS_ASSET_BUNDLES:
+        raise ValueError(f'Unknown asset bundle {name!r}')
+    built = load_manifest().get(name)
+    if built is not None and settings.DEBUG:
+        try:
+            if built['sources'] != settings.CMS_ASSET_BUNDLES[name] or any(
+                    os.path.getmtime(path) > built['built_at'] for path in bundle_sources(name)):
+                built = None
+        except (OSError, ValueError):
+            built = None
+    if built is not None:
+        return [settings.STATIC_URL + built['path']]
+    return [settings.STATIC_URL + source for source in settings.CMS_ASSET_BUNDLES[name]]
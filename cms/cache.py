@@ -0,0 +1,215 @@
+import time
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from .compression import encode_content
+from .models import Page
+
+# Cache keys carry version numbers: one for the whole site, one per page and
+# one for the site chrome (navbar, navbar logo, footer). Invalidating just
+# bumps a number, so stale entries are never read again and expire on their
+# own. This works with any cache backend (local-memory, file-based,
+# memcached) because no key listing is needed.
+SITE_VERSION_KEY = 'cms:version:site'
+PAGE_VERSION_KEY = 'cms:version:page:{slug}'
+CHROME_VERSION_KEY = 'cms:version:chrome'
+PAGE_CACHE_KEY = 'cms:page:{view}:{slug}:{mode}:{site}:{page}'
+CHROME_FRAGMENT_KEY = 'cms:chrome:{template}:{mode}:{chrome}'
+CONTENT_VERSION_KEY = 'cms:content-version:{slug}:{type}:{site}:{page}'
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a lost version key can never revive old entries
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        _get_version(key)
+
+
+def invalidate_page(slug):
+    """Drop every cached response for one page"""
+    if slug:
+        _bump_version(PAGE_VERSION_KEY.format(slug=slug))
+
+
+def invalidate_site():
+    """Drop every cached page (used when the navbar or footer changes)"""
+    _bump_version(SITE_VERSION_KEY)
+
+
+def invalidate_chrome():
+    """Drop the cached navbar and footer fragments and every cached page"""
+    _bump_version(CHROME_VERSION_KEY)
+    invalidate_site()
+
+
+def chrome_version():
+    return _get_version(CHROME_VERSION_KEY)
+
+
+def chrome_fragment_key(template_name, edit_mode=False):
+    return CHROME_FRAGMENT_KEY.format(
+        template=template_name,
+        mode='edit' if edit_mode else 'public',
+        chrome=chrome_version(),
+    )
+
+
+def page_cache_key(view_name, slug, edit_mode=False):
+    return PAGE_CACHE_KEY.format(
+        view=view_name,
+        slug=slug,
+        mode='edit' if edit_mode else 'public',
+        site=_get_version(SITE_VERSION_KEY),
+        page=_get_version(PAGE_VERSION_KEY.format(slug=slug)),
+    )
+
+
+def cache_public_page(view_name):
+    """
+    Serve a stored copy of a public page to visitors who are not in edit mode.
+    Works on both sync and async views.
+
+    Usage:
+    @cache_public_page('theme_page')
+    def theme_page(request, slug): ...
+    """
+    def lookup(request, kwargs):
+        """Cache key to use for this request, or None to bypass the cache"""
+        timeout = getattr(settings, 'CMS_PAGE_CACHE_TIMEOUT', 60 * 60 * 24)
+        edit_mode = getattr(request, 'edit_mode', False)
+        if not timeout or edit_mode or request.method not in ('GET', 'HEAD'):
+            return None, None
+        key = page_cache_key(view_name, kwargs.get('slug', 'index'), edit_mode)
+        return key, cache.get(key)
+
+    def store(key, response):
+        timeout = getattr(settings, 'CMS_PAGE_CACHE_TIMEOUT', 60 * 60 * 24)
+        if response.status_code == 200 and not response.streaming:
+            # Compressed once here; CompressionMiddleware picks the copy the client accepts
+            response.encoded_content = encode_content(response.content, response['Content-Type'])
+            cache.set(key, {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'encoded': response.encoded_content,
+            }, timeout)
+
+    def cached_response(cached):
+        response = HttpResponse(cached['content'], content_type=cached['content_type'])
+        response.encoded_content = cached.get('encoded')
+        return response
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                # Session and cache backends are sync; keep them off the event loop
+                key, cached = await sync_to_async(lookup)(request, kwargs)
+                if cached is not None:
+                    return cached_response(cached)
+                response = await view_func(request, *args, **kwargs)
+                if key:
+                    await sync_to_async(store)(key, response)
+                return response
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key, cached = lookup(request, kwargs)
+            if cached is not None:
+                return cached_response(cached)
+            response = view_func(request, *args, **kwargs)
+            if key:
+                store(key, response)
+            return response
+        return wrapper
+    return decorator
+
+
+def page_content_version(slug, page_type=None):
+    """
+    Last edit time of everything a page renders (Page.updated_at), or None if
+    the page doesn't exist. Cached under the page and site versions, so a
+    warm lookup needs no query and any edit is seen immediately.
+    """
+    key = CONTENT_VERSION_KEY.format(
+        slug=slug,
+        type=page_type or 'any',
+        site=_get_version(SITE_VERSION_KEY),
+        page=_get_version(PAGE_VERSION_KEY.format(slug=slug)),
+    )
+    updated_at = cache.get(key)
+    if updated_at is None:
+        pages = Page.objects.filter(slug=slug)
+        if page_type:
+            pages = pages.filter(type=page_type)
+        # False marks a missing page so it isn't looked up again
+        updated_at = pages.values_list('updated_at', flat=True).first() or False
+        cache.set(key, updated_at, None)
+    return updated_at or None
+
+
+def conditional_page(page_type=None):
+    """
+    Answer If-None-Match and If-Modified-Since with 304 from the page's
+    content version, before any rendering, and send Cache-Control: no-cache
+    so clients always ask. Skipped in edit mode. Works on both sync and
+    async views.
+
+    Usage:
+    @conditional_page(page_type='theme')
+    def theme_page(request, slug): ...
+    """
+    def validators(request, kwargs):
+        """(etag, last_modified timestamp) for the page, or (None, None)"""
+        if request.method not in ('GET', 'HEAD') or getattr(request, 'edit_mode', False):
+            return None, None
+        slug = kwargs.get('slug', 'index')
+        updated_at = page_content_version(slug, page_type)
+        if updated_at is None:
+            return None, None
+        return quote_etag(f'{slug}-{int(updated_at.timestamp() * 1000000)}'), int(updated_at.timestamp())
+
+    def add_headers(response, etag, last_modified):
+        if etag:
+            response.headers.setdefault('ETag', etag)
+            # Revalidate every time: without it browsers and proxies cache the
+            # page heuristically from Last-Modified and miss editors' changes
+            response.headers.setdefault('Cache-Control', 'no-cache')
+        if last_modified and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                etag, last_modified = await sync_to_async(validators)(request, kwargs)
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                return add_headers(response, etag, last_modified)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            etag, last_modified = validators(request, kwargs)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            return add_headers(response, etag, last_modified)
+        return wrapper
+    return decorator
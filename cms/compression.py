@@ -0,0 +1,121 @@
+import gzip
+import importlib
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from .serving import accepted_encodings
+
+# Response compression for HTML and JSON (see CompressionMiddleware). Bodies
+# the page cache stores are compressed once, when stored, and the encoded
+# copies kept next to the plain one, so a cache hit does no compression work.
+# Codings, in order of preference when the client accepts several.
+CODINGS = ('br', 'gzip')
+DEFAULT_LEVELS = {'br': 5, 'gzip': 6}
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_TYPES = ('text/html', 'application/json')
+
+_brotli_module = None
+
+
+def _brotli():
+    """The brotli (or brotlicffi) module, or None when neither is installed"""
+    global _brotli_module
+    if _brotli_module is None:
+        for name in ('brotli', 'brotlicffi'):
+            try:
+                _brotli_module = importlib.import_module(name)
+                break
+            except ImportError:
+                continue
+        else:
+            _brotli_module = False
+    return _brotli_module or None
+
+
+def compression_levels():
+    """{coding: level} for the codings that are configured and available"""
+    levels = getattr(settings, 'CMS_COMPRESSION_LEVELS', DEFAULT_LEVELS)
+    return {coding: levels[coding] for coding in CODINGS
+            if coding in levels and (coding != 'br' or _brotli() is not None)}
+
+
+def compress_body(data, coding, level):
+    if coding == 'br':
+        return _brotli().compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def is_compressible(content_type, size):
+    """True for a body of a configured type (HTML and JSON) at least CMS_COMPRESSION_MIN_SIZE bytes long"""
+    if size < getattr(settings, 'CMS_COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE):
+        return False
+    media_type = content_type.split(';')[0].strip().lower()
+    return media_type in getattr(settings, 'CMS_COMPRESSION_TYPES', DEFAULT_TYPES)
+
+
+def encode_content(content, content_type):
+    """
+    {coding: compressed bytes} for every available coding, or {} when the
+    body isn't worth compressing. Used to store encoded copies in a cache.
+    """
+    if not is_compressible(content_type, len(content)):
+        return {}
+    encoded = {}
+    for coding, level in compression_levels().items():
+        data = compress_body(content, coding, level)
+        if len(data) < len(content):
+            encoded[coding] = data
+    return encoded
+
+
+def may_hold_secrets(request):
+    """
+    True when the body may hold a secret an attacker could recover from the
+    compressed size (BREACH): a CSRF token was rendered into it, or the
+    request comes with a session (logged-in editors, the dashboard).
+    """
+    return bool(request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+                or settings.SESSION_COOKIE_NAME in request.COOKIES)
+
+
+def compress_response(request, response):
+    """
+    Compress the response body with the best coding the client accepts,
+    using the copy in response.encoded_content ({coding: bytes}) when one
+    was stored with a cached page. Streaming responses, responses that
+    already have a Content-Encoding (precompressed static files) and
+    responses that may hold secrets are left alone.
+    """
+    if response.streaming or response.has_header('Content-Encoding'):
+        return response
+    if may_hold_secrets(request):
+        return response
+    if 'no-transform' in response.get('Cache-Control', '').lower():
+        return response
+    content_type = response.get('Content-Type', '')
+    if not is_compressible(content_type, len(response.content)):
+        return response
+
+    # The body differs with Accept-Encoding even when it isn't compressed for this client
+    patch_vary_headers(response, ('Accept-Encoding',))
+    accepted = accepted_encodings(request)
+    encoded = getattr(response, 'encoded_content', None) or {}
+    levels = compression_levels()
+    for coding in CODINGS:
+        if coding not in accepted:
+            continue
+        data = encoded.get(coding)
+        if data is None and coding in levels:
+            data = compress_body(response.content, coding, levels[coding])
+            if len(data) >= len(response.content):
+                continue
+        if data is None:
+            continue
+        response.content = data
+        response['Content-Length'] = str(len(data))
+        response['Content-Encoding'] = coding
+        # A compressed body is a different representation of the same resource
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        break
+    return response
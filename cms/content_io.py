@@ -0,0 +1,89 @@
+import gzip
+import hashlib
+import io
+import sys
+
+# Content export format: one JSON object per line. A header line, then every
+# page, section, element and (optionally) edit history row in that order, so
+# rows only ever refer back to rows already read, then a footer with the row
+# counts and a SHA-256 of every line before it.
+FORMAT_VERSION = 1
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+
+
+def guess_compression(path):
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        return 'zstd'
+    return 'none'
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError('zstd compression needs the zstandard package (pip install zstandard)')
+    return zstandard
+
+
+class _ClosingGzipFile(gzip.GzipFile):
+    """GzipFile that also closes the file it wraps"""
+    def close(self):
+        fileobj = self.fileobj
+        try:
+            super().close()
+        finally:
+            if fileobj is not None:
+                fileobj.close()
+
+
+def open_stream(path, mode, compression):
+    """
+    Open `path` ('-' for stdin/stdout) as a text stream of lines, compressed
+    with gzip or zstd on the fly. `mode` is 'r' or 'w'.
+    """
+    if path == '-':
+        # Closing the stream must not close the process's stdin/stdout
+        stdio = sys.stdin if mode == 'r' else sys.stdout
+        stdio.flush()
+        raw = open(stdio.fileno(), mode + 'b', closefd=False)
+    else:
+        raw = open(path, mode + 'b')
+
+    if compression == 'gzip':
+        binary = _ClosingGzipFile(fileobj=raw, mode=mode + 'b')
+    elif compression == 'zstd':
+        zstandard = _zstandard()
+        if mode == 'r':
+            binary = zstandard.ZstdDecompressor().stream_reader(raw)
+        else:
+            binary = zstandard.ZstdCompressor(level=10).stream_writer(raw)
+    else:
+        binary = raw
+    return io.TextIOWrapper(binary, encoding='utf-8', newline='\n')
+
+
+class LineHasher:
+    """SHA-256 over the exact lines written or read, footer excluded"""
+    def __init__(self):
+        self.digest = hashlib.sha256()
+
+    def update(self, line):
+        self.digest.update(line.encode('utf-8'))
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
+
+
+def read_lines(stream):
+    """Lines of an open_stream(); a damaged or truncated file raises ValueError"""
+    errors = (EOFError, OSError, UnicodeDecodeError)
+    try:
+        errors += (_zstandard().ZstdError,)
+    except ValueError:
+        pass
+    try:
+        yield from stream
+    except errors as error:
+        raise ValueError(f'The file is truncated or corrupt ({error})')
@@ -0,0 +1,35 @@
+from django.db import models, transaction
+from .media import discard_chunks
+from .models import ChunkedUpload
+
+
+def bulk_delete(queryset):
+    """
+    Delete the rows of a queryset and the rows that depend on them, children
+    first, in a few DELETE statements. A normal delete() loads every row and
+    runs the cache signals once per row; callers invalidate the cache once
+    afterwards instead. Dependents are found from the models' relations, so a
+    new model pointing at Page, Section or Element needs no change here.
+    Returns the number of rows deleted from the queryset itself.
+    """
+    model = queryset.model
+    for relation in model._meta.related_objects:
+        if relation.many_to_many:
+            continue
+        field_name = relation.field.name
+        related = relation.related_model._base_manager.filter(**{f'{field_name}__in': queryset})
+        if relation.on_delete is models.CASCADE:
+            bulk_delete(related)
+        elif relation.on_delete is models.SET_NULL:
+            related.update(**{field_name: None})
+        elif relation.on_delete is not models.DO_NOTHING:
+            raise ValueError(f'bulk_delete() cannot apply {relation.on_delete.__name__} to {relation}')
+
+    if model is ChunkedUpload:
+        # Chunk files outlive their rows otherwise; drop them once the delete commits
+        upload_ids = list(queryset.values_list('id', flat=True))
+        transaction.on_commit(
+            lambda: [discard_chunks(ChunkedUpload(id=upload_id)) for upload_id in upload_ids],
+            using=queryset.db,
+        )
+    return queryset._raw_delete(queryset.db)
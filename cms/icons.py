@@ -0,0 +1,200 @@
+import importlib.util
+import io
+import json
+import os
+import re
+from django.conf import settings
+from .assets import BUNDLE_DIR, minify_css, read_manifest
+
+# A self-hosted Font Awesome 5 Free subset: `manage.py build_icon_font` looks
+# for the icon classes the site uses (templates, static JS/CSS, the template
+# tags and element content) and writes into CMS_ASSET_BUILD_DIR/icons/ a
+# stylesheet and fonts holding only those glyphs.
+ICON_DIR = 'icons'
+ICON_CLASS = re.compile(r'(?<![\w-])fa-([a-z0-9]+(?:-[a-z0-9]+)*)')
+STYLE_CLASS = re.compile(r'(?<![\w-])(fa[srb]|fa-solid|fa-regular|fa-brands)(?![\w-])')
+CSS_ICON_CONTENT = re.compile(r'''content:\s*["']\\(f[0-9a-f]{3})["']''', re.I)
+ICON_RULE = re.compile(r'((?:\.fa-[a-z0-9-]+:before,?)+)\{content:"\\([0-9a-f]+)"\}')
+FONT_FACE = re.compile(r'@font-face\{([^}]*)\}')
+FONT_FILE = re.compile(r'url\(\.\./webfonts/([\w-]+)\.woff2\)')
+LICENSE_COMMENT = re.compile(r'/\*!.*?\*/', re.S)
+SCANNED_EXTENSIONS = ('.html', '.js', '.css', '.py')
+
+# Templates also use the Font Awesome 6 style names; they map onto FA5's
+STYLE_ALIASES = {'fas': 'fa-solid', 'far': 'fa-regular', 'fab': 'fa-brands'}
+# The font each style class draws from (plain `fa` is solid)
+STYLE_FONTS = {'fas': 'fa-solid-900', 'far': 'fa-regular-400', 'fab': 'fa-brands-400'}
+
+
+def icon_dir():
+    return os.path.join(settings.CMS_ASSET_BUILD_DIR, ICON_DIR)
+
+
+def icon_manifest_path():
+    return os.path.join(icon_dir(), 'manifest.json')
+
+
+def icon_stylesheet_url():
+    """URL of the built icon stylesheet, or None before build_icon_font has run"""
+    path = read_manifest(icon_manifest_path()).get('css')
+    return settings.STATIC_URL + path if path else None
+
+
+def default_source():
+    """Font Awesome from the fontawesomefree package, when it is installed"""
+    configured = getattr(settings, 'CMS_ICON_FONT_SOURCE', None)
+    if configured:
+        return configured
+    spec = importlib.util.find_spec('fontawesomefree')
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    return os.path.join(list(spec.submodule_search_locations)[0], 'static', 'fontawesomefree')
+
+
+def _scanned_files():
+    """Template directories, static directories and the cms app (template tags write icons too)"""
+    roots = [directory for engine in settings.TEMPLATES for directory in engine.get('DIRS', [])]
+    roots += [root if isinstance(root, str) else root[1] for root in settings.STATICFILES_DIRS]
+    roots.append(os.path.dirname(os.path.abspath(__file__)))
+    generated = {os.path.join(settings.CMS_ASSET_BUILD_DIR, BUNDLE_DIR), icon_dir()}
+    for root in roots:
+        for directory, dirnames, filenames in os.walk(root):
+            dirnames[:] = [name for name in dirnames if name not in ('migrations', '__pycache__')
+                           and os.path.join(directory, name) not in generated]
+            for filename in filenames:
+                if filename.endswith(SCANNED_EXTENSIONS):
+                    yield os.path.join(directory, filename)
+
+
+def _content_texts():
+    from .models import Element
+    fields = Element.objects.values_list('title', 'description', 'json_content', 'src')
+    for title, description, json_content, src in fields.iterator():
+        if json_content is not None and not isinstance(json_content, str):
+            json_content = json.dumps(json_content)
+        yield ' '.join(value for value in (title, description, json_content, src) if value)
+
+
+def _built_icon_names():
+    """
+    Icon names templates build from content rather than spell out:
+    includes/footer.html renders a social_link as fa-{{ element.title|lower }}
+    """
+    from .models import Element
+    titles = Element.objects.filter(json_type='social_link').values_list('title', flat=True)
+    return {title.lower() for title in titles if title and ICON_CLASS.fullmatch(f'fa-{title.lower()}')}
+
+
+def find_used_icons():
+    """
+    (icon names, style classes, codepoints) used on the site: fa-* classes
+    and fas/far/fab (or fa-solid...) in files and element content, the
+    names of social links' icons, plus Font Awesome codepoints set with
+    CSS `content:`.
+    """
+    names, styles, codepoints = set(), set(), set()
+
+    def scan(text):
+        names.update(ICON_CLASS.findall(text))
+        styles.update(STYLE_CLASS.findall(text))
+        codepoints.update(int(codepoint, 16) for codepoint in CSS_ICON_CONTENT.findall(text))
+
+    for path in _scanned_files():
+        with open(path, encoding='utf-8', errors='replace') as scanned_file:
+            scan(scanned_file.read())
+    for text in _content_texts():
+        scan(text)
+    names.update(_built_icon_names())
+    aliases = {alias: style for style, alias in STYLE_ALIASES.items()}
+    return names, {aliases.get(style, style) for style in styles}, codepoints
+
+
+def read_fontawesome(source):
+    """(minified all.css, license comment, {icon name: codepoint}) from a Font Awesome 5 Free download"""
+    for name in ('all.min.css', 'all.css'):
+        path = os.path.join(source, 'css', name)
+        if os.path.isfile(path):
+            break
+    else:
+        raise ValueError(f'{source} has no css/all.css; expected a Font Awesome 5 Free download')
+    with open(path, encoding='utf-8') as css_file:
+        text = css_file.read()
+    license_comment = LICENSE_COMMENT.search(text)
+    css = minify_css(text)
+    icons = {}
+    for selectors, codepoint in ICON_RULE.findall(css):
+        for selector in filter(None, selectors.split(',')):
+            icons[selector[len('.fa-'):-len(':before')]] = int(codepoint, 16)
+    if not icons:
+        raise ValueError(f'No icons found in {path}')
+    return css, license_comment.group(0) if license_comment else '', icons
+
+
+def icon_css(css, used_names, font_urls):
+    """
+    Font Awesome's all.css cut down to the used icons, with @font-face rules
+    only for the fonts in font_urls ({font name: (url, format)}), and the
+    FA6 style class names as aliases.
+    """
+    def icon_rule(match):
+        kept = [selector for selector in match.group(1).split(',')
+                if selector and selector[len('.fa-'):-len(':before')] in used_names]
+        return f'{",".join(kept)}{{content:"\\{match.group(2)}"}}' if kept else ''
+
+    def font_face(match):
+        font = FONT_FILE.search(match.group(1))
+        if not font or font.group(1) not in font_urls:
+            return ''
+        url, font_format = font_urls[font.group(1)]
+        declarations = [declaration for declaration in match.group(1).split(';')
+                        if declaration and not declaration.startswith('src:')]
+        return '@font-face{%s;src:url(%s) format("%s")}' % (';'.join(declarations), url, font_format)
+
+    css = ICON_RULE.sub(icon_rule, css)
+    css = FONT_FACE.sub(font_face, css)
+    for style, alias in STYLE_ALIASES.items():
+        css = re.sub(r'\.%s(?=[,{])' % style, f'.{style},.{alias}', css)
+    return css
+
+
+def _fonttools():
+    try:
+        from fontTools import subset, ttLib
+    except ImportError:
+        raise ValueError('Building the icon font needs fontTools (pip install fonttools)')
+    return subset, ttLib
+
+
+def woff2_supported():
+    """fontTools writes WOFF2 with a brotli module; otherwise the fonts are WOFF"""
+    return any(importlib.util.find_spec(name) for name in ('brotli', 'brotlicffi'))
+
+
+def subset_font(source, font_name, codepoints):
+    """
+    The font cut down to codepoints, as (bytes, 'woff2' or 'woff'), or None
+    if it has none of them.
+    """
+    subset, ttLib = _fonttools()
+    for extension in ('.ttf', '.woff', '.woff2'):
+        path = os.path.join(source, 'webfonts', font_name + extension)
+        if os.path.isfile(path):
+            break
+    else:
+        raise ValueError(f'{font_name} not found in {os.path.join(source, "webfonts")}')
+    font = ttLib.TTFont(path)
+    cmap = font.getBestCmap()
+    wanted = sorted(codepoint for codepoint in codepoints if codepoint in cmap)
+    if not wanted:
+        return None
+    options = subset.Options()
+    options.flavor = 'woff2' if woff2_supported() else 'woff'
+    # FontForge's timestamp table; fontTools can't subset it
+    options.drop_tables.append('FFTM')
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=wanted)
+    subsetter.subset(font)
+    font.flavor = options.flavor
+    output = io.BytesIO()
+    font.save(output)
+    return output.getvalue(), options.flavor
@@ -0,0 +1,313 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow is optional at runtime; without it no variants are made
+    Image = None
+
+# Modern encodings written next to each source image as "<name>.<ext>.<format>"
+# (Agafay5.jpg -> Agafay5.jpg.avif), best first. A variant is only kept when
+# it is smaller than the original.
+IMAGE_FORMATS = [
+    ('avif', 'image/avif', 'AVIF', {'quality': 55, 'speed': 6}),
+    ('webp', 'image/webp', 'WEBP', {'quality': 80, 'method': 6}),
+]
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def available_formats():
+    """The IMAGE_FORMATS this Pillow build can encode"""
+    if Image is None:
+        return []
+    return [fmt for fmt in IMAGE_FORMATS if features.check(fmt[0])]
+
+
+def variant_path(path, extension):
+    return f'{path}.{extension}'
+
+
+@lru_cache(maxsize=4096)
+def resolve_image(url):
+    """Map a /static/ or /media/ image URL to its file, or None"""
+    if not url or not url.lower().endswith(SOURCE_EXTENSIONS):
+        return None
+    if url.startswith(settings.MEDIA_URL):
+        root = os.path.normpath(settings.MEDIA_ROOT)
+        path = os.path.normpath(os.path.join(root, url[len(settings.MEDIA_URL):]))
+        return path if path.startswith(root + os.sep) else None
+    if url.startswith(settings.STATIC_URL):
+        return finders.find(url[len(settings.STATIC_URL):])
+    return None
+
+
+def image_sources(url):
+    """
+    [(url, mime type)] of the up-to-date modern encodings of an image URL,
+    best first. Empty when there are none (or the image isn't local).
+    """
+    path = resolve_image(url)
+    if not path:
+        return []
+    try:
+        source_mtime = os.stat(path).st_mtime
+    except OSError:
+        return []
+    sources = []
+    for extension, mime_type, _, _ in IMAGE_FORMATS:
+        try:
+            if os.stat(variant_path(path, extension)).st_mtime >= source_mtime:
+                sources.append((variant_path(url, extension), mime_type))
+        except OSError:
+            continue
+    return sources
+
+
+def encode_variants(path, force=False):
+    """
+    Write the AVIF/WebP encodings of one image file. Returns a list of
+    (extension, bytes written or None when skipped/larger than the source).
+    """
+    if not path.lower().endswith(SOURCE_EXTENSIONS):
+        return []
+    results = []
+    source_stat = os.stat(path)
+    image = None
+    for extension, _, pillow_format, options in available_formats():
+        target = variant_path(path, extension)
+        if not force and os.path.exists(target) and os.stat(target).st_mtime >= source_stat.st_mtime:
+            results.append((extension, None))
+            continue
+        if image is None:
+            with Image.open(path) as opened:
+                image = ImageOps.exif_transpose(opened)
+                image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                image.save(tmp_file, pillow_format, **options)
+            size = os.path.getsize(tmp_path)
+            if size >= source_stat.st_size:
+                # No gain; drop the variant so the original is served
+                os.unlink(tmp_path)
+                if os.path.exists(target):
+                    os.unlink(target)
+                results.append((extension, None))
+                continue
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, target)
+            results.append((extension, size))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    return results
+
+
+# On-demand resizing: /img/<width>/<quality>/static/images/Agafay5.jpg, with
+# .webp/.avif appended for those encodings. Only the widths and qualities in
+# settings are served, and results live in a size-capped disk cache.
+RESIZE_URL_PREFIX = '/img/'
+FORMAT_MIME_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp', 'AVIF': 'image/avif'}
+_cache_lock = threading.Lock()
+_cache_size = None
+
+
+def resized_url(src, width, quality=None, extension=None):
+    quality = quality or settings.CMS_IMAGE_DEFAULT_QUALITY
+    url = f'{RESIZE_URL_PREFIX}{width}/{quality}{src}'
+    return variant_path(url, extension) if extension else url
+
+
+def resizable_path(url):
+    """The source file for a URL allowed through the resize endpoint, or None"""
+    if not url.startswith(tuple(settings.CMS_IMAGE_RESIZE_PREFIXES)):
+        return None
+    if posixpath.normpath(url) != url:
+        return None
+    return resolve_image(url)
+
+
+@lru_cache(maxsize=4096)
+def _image_width(path, mtime_ns):
+    with Image.open(path) as image:
+        width, height = image.size
+        # Rotated JPEGs are displayed (and resized) the other way round
+        if image.getexif().get(0x0112) in (5, 6, 7, 8):
+            width = height
+    return width
+
+
+def image_width(path):
+    """Displayed width of an image file in pixels (header read only, cached), or None"""
+    if Image is None:
+        return None
+    try:
+        return _image_width(path, os.stat(path).st_mtime_ns)
+    except (OSError, ValueError):
+        return None
+
+
+def parse_resized_path(path):
+    """
+    'static/images/a.jpg.webp' -> ('/static/images/a.jpg', source file, 'webp'),
+    or None if the path isn't served by the resize endpoint.
+    """
+    url = '/' + path
+    extension = None
+    for candidate, _, _, _ in available_formats():
+        if url.endswith('.' + candidate):
+            url, extension = url[:-len(candidate) - 1], candidate
+            break
+    source = resizable_path(url)
+    if not source or not os.path.isfile(source):
+        return None
+    return url, source, extension
+
+
+def resized_cache_key(source, width, quality, extension):
+    stat = os.stat(source)
+    raw = f'{source}:{stat.st_mtime_ns}:{stat.st_size}:{width}:{quality}:{extension or ""}'
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def resize_image(source, width, quality, extension=None):
+    """
+    (file path, mime type) of `source` scaled down to at most `width` pixels
+    wide and encoded at `quality`, from the disk cache when possible.
+    """
+    if extension:
+        pillow_format = next(fmt[2] for fmt in IMAGE_FORMATS if fmt[0] == extension)
+    else:
+        pillow_format = 'PNG' if source.lower().endswith('.png') else 'JPEG'
+    key = resized_cache_key(source, width, quality, extension)
+    path = os.path.join(settings.CMS_IMAGE_CACHE_DIR, key[:2], f'{key}.{pillow_format.lower()}')
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        pass
+    else:
+        # Recently used files are the last to be evicted; only touch now and then
+        if time.time() - stat.st_mtime > 60:
+            os.utime(path)
+        return path, FORMAT_MIME_TYPES[pillow_format]
+
+    with Image.open(source) as opened:
+        # JPEG can decode straight to a smaller scale, which is much faster
+        raw_width, raw_height = opened.size
+        if opened.getexif().get(0x0112) in (5, 6, 7, 8):
+            raw_width, raw_height = raw_height, raw_width
+        if raw_width > width:
+            opened.draft(None, (width, max(1, raw_height * width // raw_width)))
+        image = ImageOps.exif_transpose(opened)
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        if pillow_format == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGB' if pillow_format == 'JPEG' else 'RGBA')
+
+        options = {'quality': quality}
+        if pillow_format == 'JPEG':
+            options.update(optimize=True, progressive=True)
+        elif pillow_format == 'PNG':
+            options = {'optimize': True}
+        elif extension:
+            # Quality is on the JPEG scale: at the default quality each format
+            # uses its own IMAGE_FORMATS setting, scaled in proportion otherwise
+            options = dict(next(fmt[3] for fmt in IMAGE_FORMATS if fmt[0] == extension))
+            options['quality'] = max(1, min(100, options['quality'] * quality // settings.CMS_IMAGE_DEFAULT_QUALITY))
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                image.save(tmp_file, pillow_format, **options)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    _cache_added(path)
+    return path, FORMAT_MIME_TYPES[pillow_format]
+
+
+def _cache_files():
+    for directory, _, filenames in os.walk(settings.CMS_IMAGE_CACHE_DIR):
+        for filename in filenames:
+            if filename.startswith('.tmp-'):
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                yield path, os.stat(path)
+            except OSError:
+                continue
+
+
+def _cache_added(new_path):
+    """Track the cache size; past the cap, delete least recently used files down to 90% of it"""
+    global _cache_size
+    with _cache_lock:
+        if _cache_size is None:
+            _cache_size = sum(stat.st_size for _, stat in _cache_files())
+        else:
+            _cache_size += os.path.getsize(new_path)
+        if _cache_size <= settings.CMS_IMAGE_CACHE_MAX_SIZE:
+            return
+        # Other processes share the directory, so re-measure before evicting
+        files = sorted(_cache_files(), key=lambda item: item[1].st_mtime)
+        _cache_size = sum(stat.st_size for _, stat in files)
+        target = settings.CMS_IMAGE_CACHE_MAX_SIZE * 0.9
+        for path, stat in files:
+            if _cache_size <= target:
+                break
+            if path == new_path:
+                # About to be served
+                continue
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            _cache_size -= stat.st_size
+
+
+def responsive_sources(src, size):
+    """
+    Markup pieces for showing `src` about `size` CSS pixels wide:
+    {'src', 'srcset', 'sizes', 'sources': [(srcset, mime type)]}, or None when
+    the image can't go through the resize endpoint.
+    """
+    path = resizable_path(src) if Image is not None else None
+    original_width = image_width(path) if path else None
+    if not original_width:
+        return None
+    # Widths up to the first one that fills `size` on a 2x screen. The
+    # endpoint never upscales, so wider ones are the original width.
+    widths = {}
+    for width in settings.CMS_IMAGE_WIDTHS:
+        widths.setdefault(min(width, original_width), width)
+        if width >= size * 2:
+            break
+    if not widths:
+        return None
+
+    def srcset(extension=None):
+        return ', '.join(f'{resized_url(src, width, extension=extension)} {shown}w'
+                         for shown, width in sorted(widths.items()))
+
+    default_width = next((width for shown, width in sorted(widths.items()) if shown >= size), max(widths.values()))
+    return {
+        'src': resized_url(src, default_width),
+        'srcset': srcset(),
+        'sizes': f'(max-width: {size}px) 100vw, {size}px',
+        'sources': [(srcset(extension), mime_type) for extension, mime_type, _, _ in available_formats()],
+    }
@@ -0,0 +1,116 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Timings for the request being handled. A ContextVar follows the request
+# through sync_to_async threads and asyncio tasks, so async views and the
+# async ORM are measured too.
+_current = ContextVar('cms_request_timings', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised instead of logging a warning when CMS_QUERY_BUDGET_STRICT is on"""
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        # name -> [calls, seconds]
+        self.spans = {}
+
+    def add(self, name, seconds):
+        span = self.spans.setdefault(name, [0, 0.0])
+        span[0] += 1
+        span[1] += seconds
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total() * 1000, 2),
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'spans': {
+                name: {'calls': calls, 'ms': round(seconds * 1000, 2)}
+                for name, (calls, seconds) in self.spans.items()
+            },
+        }
+
+    def server_timing(self):
+        """Value for the Server-Timing response header"""
+        metrics = [f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"']
+        for name, (calls, seconds) in self.spans.items():
+            metrics.append(f'{name};dur={seconds * 1000:.1f};desc="{calls} calls"')
+        metrics.append(f'total;dur={self.total() * 1000:.1f}')
+        return ', '.join(metrics)
+
+
+def start_request():
+    """Begin collecting timings for a request; returns (timings, token for end_request)"""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the time spent in a block to the current request's timings.
+
+    Usage:
+    with timed('render'):
+        ...
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def timed_tag(func):
+    """Time a template tag or filter under 'tag-<name>'"""
+    name = f'tag-{func.__name__}'
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with timed(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db_time += time.perf_counter() - started
+
+
+def _install_query_wrapper(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install():
+    """Count queries on every database connection, including future ones"""
+    connection_created.connect(_install_query_wrapper, dispatch_uid='cms_instrumentation')
+    for connection in connections.all(initialized_only=True):
+        _install_query_wrapper(connection)
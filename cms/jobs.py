@@ -0,0 +1,170 @@
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Count, F
+from django.urls import reverse
+from django.utils import timezone
+from .models import Job
+
+logger = logging.getLogger('cms.jobs')
+
+# Job kind -> function(job) returning a JSON-serialisable result. Register
+# with the @handler('kind') decorator below.
+HANDLERS = {}
+
+
+def handler(kind):
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, payload, element=None, max_attempts=3):
+    """
+    Queue a job for the run_jobs worker and return it. With CMS_JOBS_EAGER
+    (handy in development, when no worker is running) it runs right away.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f'Unknown job kind {kind!r}')
+    job = Job.objects.create(kind=kind, payload=payload, element=element,
+                             max_attempts=max_attempts, run_after=timezone.now())
+    if getattr(settings, 'CMS_JOBS_EAGER', False):
+        if claim(job.pk, 'eager'):
+            run(Job.objects.get(pk=job.pk))
+            job.refresh_from_db()
+    return job
+
+
+def status(job):
+    """What the status endpoint and upload responses report about a job"""
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'error': job.last_error.strip().splitlines()[-1] if job.status == Job.FAILED and job.last_error else '',
+        'result': job.result,
+        'status_url': reverse('job_status', args=[job.id]),
+    }
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(job_id, worker):
+    """
+    Mark one queued job as running. The UPDATE only matches while the job is
+    still queued, so when several workers race for it exactly one wins.
+    """
+    now = timezone.now()
+    return Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+        status=Job.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1, updated_at=now,
+    ) == 1
+
+
+def release(job_id, worker):
+    """Undo claim(): put the job back in the queue without counting the attempt"""
+    Job.objects.filter(pk=job_id, status=Job.RUNNING, locked_by=worker).update(
+        status=Job.QUEUED, locked_by='', locked_at=None, attempts=F('attempts') - 1, updated_at=timezone.now(),
+    )
+
+
+def claim_next(worker, limit, kinds=None):
+    """
+    Claim up to `limit` due jobs, oldest first, skipping kinds that already
+    have CMS_JOB_CONCURRENCY[kind] jobs running (across all workers).
+    Workers claiming at the same moment can overshoot a kind's limit, so
+    each claim is recounted once committed and given back if it went over;
+    the last claim to commit always sees the others.
+    """
+    concurrency = getattr(settings, 'CMS_JOB_CONCURRENCY', {})
+    running = dict(Job.objects.filter(status=Job.RUNNING).values_list('kind').annotate(count=Count('id')))
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=timezone.now())
+    if kinds:
+        due = due.filter(kind__in=kinds)
+
+    claimed = []
+    for job_id, kind in due.order_by('run_after', 'id').values_list('id', 'kind')[:limit * 10]:
+        if len(claimed) >= limit:
+            break
+        if kind in concurrency and running.get(kind, 0) >= concurrency[kind]:
+            continue
+        if not claim(job_id, worker):
+            continue
+        if kind in concurrency:
+            # Recount now that the claim is committed: another worker may
+            # have claimed this kind at the same time
+            running[kind] = Job.objects.filter(kind=kind, status=Job.RUNNING).count()
+            if running[kind] > concurrency[kind]:
+                release(job_id, worker)
+                continue
+        claimed.append(job_id)
+    return list(Job.objects.filter(pk__in=claimed).select_related('element'))
+
+
+def run(job):
+    """Run a claimed job and record the outcome: done, queued for a retry, or failed"""
+    func = HANDLERS.get(job.kind)
+    try:
+        if func is None:
+            raise ValueError(f'Unknown job kind {job.kind!r}')
+        result = func(job)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            # Exponential back-off: 30s, 60s, 120s... with the default delay
+            delay = getattr(settings, 'CMS_JOB_RETRY_DELAY', 30) * 2 ** (job.attempts - 1)
+            Job.objects.filter(pk=job.pk).update(status=Job.QUEUED, last_error=error, locked_by='',
+                                                 locked_at=None, updated_at=timezone.now(),
+                                                 run_after=timezone.now() + timedelta(seconds=delay))
+            logger.warning('Job %s failed (attempt %s of %s), retrying in %ss',
+                           job, job.attempts, job.max_attempts, delay)
+        else:
+            Job.objects.filter(pk=job.pk).update(status=Job.FAILED, last_error=error, locked_by='',
+                                                 locked_at=None, updated_at=timezone.now())
+            logger.error('Job %s failed after %s attempts:\n%s', job, job.attempts, error)
+        return False
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE, result=result, last_error='', locked_by='',
+                                         locked_at=None, updated_at=timezone.now())
+    return True
+
+
+def requeue_stale():
+    """
+    Deal with jobs whose worker died or hung mid-run (locked longer than
+    CMS_JOB_TIMEOUT). The lost run counts as an attempt (claim() counted it),
+    so a job that keeps killing its worker fails after max_attempts instead
+    of being requeued for ever. Returns (requeued, failed) counts.
+    """
+    now = timezone.now()
+    timeout = getattr(settings, 'CMS_JOB_TIMEOUT', 600)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=timeout))
+    error = f'Timed out: still running after {timeout}s'
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, last_error=error, locked_by='', locked_at=None, updated_at=now,
+    )
+    requeued = stale.filter(attempts__lt=F('max_attempts')).update(
+        status=Job.QUEUED, last_error=error, locked_by='', locked_at=None, run_after=now, updated_at=now,
+    )
+    if failed:
+        logger.error('%s stale job(s) failed after their last attempt timed out', failed)
+    return requeued, failed
+
+
+@handler('image_variants')
+def image_variants(job):
+    """AVIF/WebP copies of an uploaded image, then refresh the pages that show it"""
+    from .images import encode_variants
+    from .signals import invalidate_section
+
+    path = os.path.join(settings.MEDIA_ROOT, job.payload['path'])
+    written = {extension: size for extension, size in encode_variants(path)}
+    if job.element is not None and any(written.values()):
+        # The rendered <picture> markup depends on the files on disk
+        invalidate_section(job.element.section)
+    return {'variants': written}
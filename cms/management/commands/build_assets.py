@@ -0,0 +1,77 @@
+import json
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from cms.assets import (bundle_dir, bundle_sources, build_bundle, compress, fingerprinted_name, load_manifest,
+                        manifest_path, write_atomic)
+from cms.cache import invalidate_site
+from cms.models import Page
+
+class Command(BaseCommand):
+    help = 'Concatenate and minify the CSS/JS bundles in CMS_ASSET_BUNDLES into fingerprinted, precompressed files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-minify', action='store_true',
+                            help='Concatenate the sources without minifying them (for debugging)')
+
+    def handle(self, *args, **options):
+        os.makedirs(bundle_dir(), exist_ok=True)
+        previous = load_manifest()
+        bundles = {}
+        started = time.monotonic()
+        warned = False
+
+        for name in settings.CMS_ASSET_BUNDLES:
+            try:
+                sources = bundle_sources(name)
+                content = build_bundle(name, minify=not options['no_minify'])
+            except (ValueError, UnicodeDecodeError) as error:
+                raise CommandError(str(error))
+            path = f'bundles/{fingerprinted_name(name, content)}'
+            compressed = compress(content)
+            if '.br' not in compressed and not warned:
+                self.stdout.write(self.style.WARNING(
+                    'No brotli encoder (pip install brotli, or the brotli command); writing gzip only'))
+                warned = True
+
+            target = os.path.join(settings.CMS_ASSET_BUILD_DIR, path)
+            write_atomic(target, content)
+            for suffix, data in compressed.items():
+                write_atomic(target + suffix, data)
+            bundles[name] = {
+                'path': path,
+                'sources': settings.CMS_ASSET_BUNDLES[name],
+                'size': len(content),
+                'encodings': {suffix: len(data) for suffix, data in compressed.items()},
+                'built_at': time.time(),
+            }
+
+            original = sum(os.path.getsize(source) for source in sources)
+            encoded = ', '.join(f'{suffix[1:]} {len(data) / 1024:.1f} KB' for suffix, data in compressed.items())
+            self.stdout.write(f'  {path}: {len(sources)} file(s), {original / 1024:.1f} KB -> '
+                              f'{len(content) / 1024:.1f} KB' + (f' ({encoded})' if encoded else ''))
+
+        write_atomic(manifest_path(), json.dumps({'bundles': bundles}, indent=2).encode('utf-8'))
+        removed = self.remove_stale(bundles, previous)
+
+        # Pages reference bundles by file name: move the ETags on and drop the cached HTML
+        if {name: bundle['path'] for name, bundle in bundles.items()} != \
+                {name: bundle['path'] for name, bundle in previous.items()}:
+            Page.objects.update(updated_at=timezone.now())
+            invalidate_site()
+        self.stdout.write(self.style.SUCCESS(
+            f'Built {len(bundles)} bundle(s) in {time.monotonic() - started:.1f}s'
+            + (f', removed {removed} old file(s)' if removed else '')))
+
+    def remove_stale(self, bundles, previous):
+        """Delete files from older builds, keeping the previous build for pages cached before this one"""
+        keep = {os.path.basename(bundle['path']) for bundle in list(bundles.values()) + list(previous.values())}
+        removed = 0
+        for filename in os.listdir(bundle_dir()):
+            base = filename[:-3] if filename.endswith(('.gz', '.br')) else filename
+            if filename != 'manifest.json' and base not in keep:
+                os.unlink(os.path.join(bundle_dir(), filename))
+                removed += 1
+        return removed
@@ -0,0 +1,92 @@
+import json
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from cms.assets import compress, fingerprinted_name, read_manifest, write_atomic
+from cms.cache import invalidate_site
+from cms.icons import (ICON_DIR, STYLE_FONTS, default_source, find_used_icons, icon_css, icon_dir,
+                       icon_manifest_path, read_fontawesome, subset_font, woff2_supported)
+from cms.models import Page
+
+class Command(BaseCommand):
+    help = ('Write a Font Awesome subset holding only the icons the site uses (templates, static files, '
+            'element content) for {% icon_stylesheet %}. Run it again after adding icons.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source',
+                            help='Font Awesome 5 Free download (the folder with css/ and webfonts/); defaults to '
+                                 'CMS_ICON_FONT_SOURCE or the fontawesomefree package')
+        parser.add_argument('--list', action='store_true',
+                            help='Only print the icons in use')
+
+    def handle(self, *args, **options):
+        source = options['source'] or default_source()
+        if not source:
+            raise CommandError('No Font Awesome source: pass --source, set CMS_ICON_FONT_SOURCE '
+                               'or pip install fontawesomefree')
+        started = time.monotonic()
+        try:
+            css, license_comment, icons = read_fontawesome(source)
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+
+        names, styles, extra_codepoints = find_used_icons()
+        used = sorted(name for name in names if name in icons)
+        if options['list']:
+            for name in used:
+                self.stdout.write(f'  fa-{name}')
+            self.stdout.write(f'{len(used)} icon(s), styles: {", ".join(sorted(styles)) or "fa"}')
+            return
+
+        codepoints = {icons[name] for name in used} | extra_codepoints
+        fonts = [STYLE_FONTS['fas']] + [STYLE_FONTS[style] for style in ('far', 'fab') if style in styles]
+        if not woff2_supported():
+            self.stdout.write(self.style.WARNING('No brotli module for WOFF2 (pip install brotli); writing WOFF'))
+
+        os.makedirs(icon_dir(), exist_ok=True)
+        previous = read_manifest(icon_manifest_path())
+        written = []
+        font_urls = {}
+        for font_name in fonts:
+            try:
+                result = subset_font(source, font_name, codepoints)
+            except (OSError, ValueError) as error:
+                raise CommandError(str(error))
+            if result is None:
+                continue
+            data, font_format = result
+            filename = fingerprinted_name(f'{font_name}.{font_format}', data)
+            write_atomic(os.path.join(icon_dir(), filename), data)
+            font_urls[font_name] = (filename, font_format)
+            written.append(filename)
+            self.stdout.write(f'  {ICON_DIR}/{filename}: {len(data) / 1024:.1f} KB')
+
+        stylesheet = (license_comment + '\n' + icon_css(css, set(used), font_urls) + '\n').encode('utf-8')
+        filename = fingerprinted_name('icons.css', stylesheet)
+        target = os.path.join(icon_dir(), filename)
+        write_atomic(target, stylesheet)
+        for suffix, data in compress(stylesheet).items():
+            write_atomic(target + suffix, data)
+        written.append(filename)
+        self.stdout.write(f'  {ICON_DIR}/{filename}: {len(stylesheet) / 1024:.1f} KB')
+
+        write_atomic(icon_manifest_path(), json.dumps({
+            'css': f'{ICON_DIR}/{filename}',
+            'files': written,
+            'icons': used,
+            'built_at': time.time(),
+        }, indent=2).encode('utf-8'))
+
+        # Keep the previous build's files for pages cached before this one
+        keep = set(written) | set(previous.get('files', []))
+        for name in os.listdir(icon_dir()):
+            base = name[:-3] if name.endswith(('.gz', '.br')) else name
+            if name != 'manifest.json' and base not in keep:
+                os.unlink(os.path.join(icon_dir(), name))
+
+        if previous.get('css') != f'{ICON_DIR}/{filename}':
+            Page.objects.update(updated_at=timezone.now())
+            invalidate_site()
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(used)} icon(s) in {len(font_urls)} font(s), {time.monotonic() - started:.1f}s'))
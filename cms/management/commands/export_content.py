@@ -0,0 +1,67 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from cms.content_io import COMPRESSIONS, FORMAT_VERSION, LineHasher, guess_compression, open_stream
+from cms.models import Page, Section, Element, EditHistory
+
+# Exported columns. Primary keys are kept so rows can refer to each other;
+# updated_at is left out because the importing site sets its own.
+EXPORTS = [
+    ('page', Page, ('id', 'name', 'slug', 'type')),
+    ('section', Section, ('id', 'page_id', 'name', 'type', 'order')),
+    ('element', Element, ('id', 'section_id', 'title', 'description', 'json_content', 'src', 'order')),
+]
+HISTORY_EXPORT = ('history', EditHistory, ('id', 'user__username', 'element_id', 'timestamp',
+                                           'previous_value', 'new_value', 'field_name'))
+
+class Command(BaseCommand):
+    help = 'Stream all pages, sections and elements (and optionally edit history) to a JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="File to write, or '-' for stdout")
+        parser.add_argument('--compression', choices=COMPRESSIONS,
+                            help='Defaults to gzip for .gz, zstd for .zst, otherwise none')
+        parser.add_argument('--history', action='store_true',
+                            help='Include EditHistory (users are matched by username on import)')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows fetched from the database at a time')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        compression = options['compression'] or guess_compression(output)
+        exports = EXPORTS + ([HISTORY_EXPORT] if options['history'] else [])
+        # Progress goes to stderr when the export itself goes to stdout
+        log = self.stderr if output == '-' else self.stdout
+
+        hasher = LineHasher()
+        counts = {}
+        try:
+            stream = open_stream(output, 'w', compression)
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+
+        with stream:
+            def write(record):
+                line = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str) + '\n'
+                stream.write(line)
+                return line
+
+            hasher.update(write({
+                'kind': 'header',
+                'format': FORMAT_VERSION,
+                'created': timezone.now().isoformat(),
+                'kinds': [kind for kind, _, _ in exports],
+            }))
+            for kind, model, fields in exports:
+                counts[kind] = 0
+                rows = model.objects.order_by('id').values(*fields).iterator(chunk_size=options['chunk_size'])
+                for row in rows:
+                    row['kind'] = kind
+                    if kind == 'history':
+                        row['user'] = row.pop('user__username')
+                    hasher.update(write(row))
+                    counts[kind] += 1
+                log.write(f'  {counts[kind]} {kind} row(s)')
+            write({'kind': 'footer', 'counts': counts, 'sha256': hasher.hexdigest()})
+
+        log.write(self.style.SUCCESS(f'Exported {sum(counts.values())} rows to {output} ({compression})'))
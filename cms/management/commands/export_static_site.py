@@ -0,0 +1,352 @@
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+
+from cms.assets import manifest_path as bundle_manifest_path
+from cms.icons import icon_manifest_path
+from cms.images import IMAGE_FORMATS, RESIZE_URL_PREFIX, parse_resized_path, resize_image
+from cms.models import Page, Section, Element
+from cms.services import CHROME_PAGE_SLUG, CHROME_SECTION_NAMES
+
+MANIFEST_NAME = '.export-manifest.json'
+
+ASSET_PATTERN = re.compile(r'''(?:src|href)=["'](/(?:static|media|img)/[^"'?#]+)|url\(\s*["']?([^"')?#]+)''')
+SRCSET_PATTERN = re.compile(r'''srcset=["']([^"']+)''')
+
+
+def page_url(page):
+    if page.slug == 'index':
+        return '/'
+    if page.type == 'theme':
+        return f'/theme/{page.slug}/'
+    return f'/page/{page.slug}/'
+
+
+def output_path(output_dir, url):
+    """'/theme/imlil/' -> <output>/theme/imlil/index.html"""
+    return os.path.join(output_dir, url.strip('/'), 'index.html')
+
+
+def write_atomic(path, data):
+    """Write to a temporary file in the same directory, then rename it into place"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def copy_atomic(source, path):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    os.close(fd)
+    try:
+        shutil.copyfile(source, tmp_path)
+        shutil.copystat(source, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def resized_asset(url):
+    """The resize endpoint's file for an /img/<width>/<quality>/... URL, or None"""
+    try:
+        width, quality, path = url[len(RESIZE_URL_PREFIX):].split('/', 2)
+        width, quality = int(width), int(quality)
+    except ValueError:
+        return None
+    parsed = parse_resized_path(path)
+    if (parsed is None or width not in settings.CMS_IMAGE_WIDTHS
+            or quality not in settings.CMS_IMAGE_QUALITIES):
+        return None
+    _, source, extension = parsed
+    return resize_image(source, width, quality, extension)[0]
+
+
+def find_asset(url):
+    """Map a /static/, /media/ or /img/ URL to a file on disk, or None"""
+    if url.startswith(RESIZE_URL_PREFIX):
+        return resized_asset(url)
+    if url.startswith(settings.STATIC_URL):
+        relative = url[len(settings.STATIC_URL):]
+        found = finders.find(relative)
+        if found:
+            return found
+        root = settings.STATIC_ROOT
+    elif url.startswith(settings.MEDIA_URL):
+        relative = url[len(settings.MEDIA_URL):]
+        root = settings.MEDIA_ROOT
+    else:
+        return None
+    if not root:
+        return None
+    path = os.path.normpath(os.path.join(root, relative))
+    if not path.startswith(os.path.normpath(root) + os.sep) or not os.path.isfile(path):
+        return None
+    return path
+
+
+def asset_references(text, base_url=None):
+    """/static/, /media/ and /img/ URLs referenced from HTML, or relative url()s from CSS at base_url"""
+    urls = set()
+    candidates = [attr_url or css_url.strip() for attr_url, css_url in ASSET_PATTERN.findall(text)]
+    for srcset in SRCSET_PATTERN.findall(text):
+        candidates.extend(candidate.split()[0] for candidate in srcset.split(',') if candidate.strip())
+    for url in candidates:
+        if not url or url.startswith(('data:', 'http:', 'https:', '//', '#')):
+            continue
+        if not url.startswith('/'):
+            if not base_url:
+                continue
+            url = posixpath.normpath(posixpath.join(posixpath.dirname(base_url), url))
+        url = unquote(url)
+        if url.startswith((settings.STATIC_URL, settings.MEDIA_URL, RESIZE_URL_PREFIX)):
+            urls.add(url)
+    return urls
+
+
+def export_host():
+    """A concrete host name the site accepts, used for the rendering requests"""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+def _init_worker():
+    # Forked workers must not share the parent's database connections
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def render_page(slug, url, path):
+    """
+    Render one page through its view and write it atomically (runs in a
+    worker). Returns (slug, error or None, referenced asset URLs).
+    """
+    from django.test import Client
+
+    # Errors come back as text: an exception may not pickle back from a worker,
+    # and one bad page shouldn't stop the export
+    try:
+        client = Client(HTTP_HOST=export_host(), raise_request_exception=False)
+        with override_settings(CMS_PAGE_CACHE_TIMEOUT=0):
+            response = client.get(url)
+        if response.status_code != 200:
+            exc_info = getattr(response, 'exc_info', None)
+            reason = f': {exc_info[1]!r}' if exc_info else ''
+            return slug, f'HTTP {response.status_code}{reason}', []
+        write_atomic(path, response.content)
+        return slug, None, sorted(asset_references(response.content.decode('utf-8', 'replace')))
+    except Exception as exc:
+        return slug, repr(exc), []
+
+
+class Command(BaseCommand):
+    help = 'Render every page to static HTML files and copy the assets they reference'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=os.path.join(settings.BASE_DIR, 'static_site'),
+                            help='Directory to write the site to')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes used to render pages')
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild every page, ignoring the previous export')
+
+    def handle(self, *args, **options):
+        output_dir = os.path.abspath(options['output'])
+        workers = max(1, options['workers'])
+        os.makedirs(output_dir, exist_ok=True)
+        started = time.monotonic()
+
+        manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        manifest = {'pages': {}}
+        if os.path.exists(manifest_path) and not options['full']:
+            with open(manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+        previous_pages = manifest.get('pages', {})
+
+        pages = list(Page.objects.order_by('id'))
+        if not pages:
+            raise CommandError('There are no pages to export.')
+        digests = self.page_digests(pages)
+
+        # Decide which pages changed since the last export
+        jobs = []
+        for page in pages:
+            url = page_url(page)
+            path = output_path(output_dir, url)
+            previous = previous_pages.get(page.slug)
+            if previous and previous['digest'] == digests[page.slug] and os.path.exists(path):
+                continue
+            jobs.append((page.slug, url, path))
+
+        self.stdout.write(f'{len(jobs)} of {len(pages)} page(s) changed; rendering with {workers} worker(s)')
+
+        results = []
+        if jobs:
+            if workers == 1:
+                results = [render_page(*job) for job in jobs]
+            else:
+                connections.close_all()
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                    results = list(executor.map(render_page, *zip(*jobs)))
+
+        new_pages = {slug: previous_pages[slug] for slug in digests if slug in previous_pages}
+        failed = 0
+        for slug, error, assets in results:
+            if error:
+                failed += 1
+                new_pages.pop(slug, None)
+                self.stdout.write(self.style.ERROR(f'  {slug}: {error}, not written'))
+                continue
+            new_pages[slug] = {'digest': digests[slug], 'assets': assets}
+            self.stdout.write(f'  {slug}')
+
+        # Remove pages that no longer exist
+        for slug, entry in previous_pages.items():
+            if slug not in digests:
+                stale = output_path(output_dir, entry.get('url', ''))
+                if entry.get('url') and os.path.exists(stale):
+                    os.unlink(stale)
+        for page in pages:
+            if page.slug in new_pages:
+                new_pages[page.slug]['url'] = page_url(page)
+
+        copied = self.copy_assets(output_dir, new_pages)
+
+        write_atomic(manifest_path, json.dumps({'pages': new_pages}, indent=2, sort_keys=True).encode())
+
+        elapsed = time.monotonic() - started
+        message = (f'Exported {len(results) - failed} page(s), copied {copied} asset(s) '
+                   f'to {output_dir} in {elapsed:.1f}s')
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{message}; {failed} page(s) failed'))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
+
+    def page_digests(self, pages):
+        """
+        Hash each page's own rows, the site chrome rows, the templates and the
+        built assets (bundle and icon manifests, image variants), so a page is
+        rebuilt whenever anything it renders from changes.
+        """
+        sections = list(Section.objects.values().order_by('id'))
+        elements_by_section = {}
+        for element in Element.objects.values().order_by('id'):
+            elements_by_section.setdefault(element['section_id'], []).append(element)
+
+        pages_by_id = {page.id: page for page in pages}
+        sections_by_page = {}
+        chrome = []
+        for section in sections:
+            entry = [section, elements_by_section.get(section['id'], [])]
+            sections_by_page.setdefault(section['page_id'], []).append(entry)
+            page = pages_by_id.get(section['page_id'])
+            if page and page.slug == CHROME_PAGE_SLUG and section['name'] in CHROME_SECTION_NAMES:
+                chrome.append(entry)
+
+        shared = hashlib.sha256()
+        shared.update(self.templates_digest().encode())
+        shared.update(self.assets_digest().encode())
+        shared.update(json.dumps(chrome, sort_keys=True, default=str).encode())
+        shared = shared.hexdigest()
+
+        digests = {}
+        for page in pages:
+            digest = hashlib.sha256(shared.encode())
+            digest.update(json.dumps(
+                [page.slug, page.name, page.type, page.updated_at, sections_by_page.get(page.id, [])],
+                sort_keys=True, default=str,
+            ).encode())
+            digests[page.slug] = digest.hexdigest()
+        return digests
+
+    def templates_digest(self):
+        digest = hashlib.sha256()
+        for template_dir in settings.TEMPLATES[0]['DIRS']:
+            for root, _, files in sorted(os.walk(template_dir)):
+                for name in sorted(files):
+                    stat = os.stat(os.path.join(root, name))
+                    digest.update(f'{root}/{name}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+        return digest.hexdigest()
+
+    def assets_digest(self):
+        """
+        Hash the bundle and icon manifests (their names change with every
+        build) and the AVIF/WebP variants on disk, which decide whether an
+        image renders as a <picture>.
+        """
+        digest = hashlib.sha256()
+        for path in (bundle_manifest_path(), icon_manifest_path()):
+            if os.path.exists(path):
+                with open(path, 'rb') as manifest_file:
+                    digest.update(path.encode() + b':' + manifest_file.read())
+
+        variant_suffixes = tuple(f'.{extension}' for extension, _, _, _ in IMAGE_FORMATS)
+        roots = [root if isinstance(root, str) else root[1] for root in settings.STATICFILES_DIRS]
+        roots.append(settings.MEDIA_ROOT)
+        for root in roots:
+            for directory, _, files in sorted(os.walk(root)):
+                for name in sorted(files):
+                    if name.lower().endswith(variant_suffixes) and not name.startswith('.tmp-'):
+                        stat = os.stat(os.path.join(directory, name))
+                        digest.update(f'{directory}/{name}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+        return digest.hexdigest()
+
+    def copy_assets(self, output_dir, pages):
+        """Copy every referenced asset (and what its CSS references) that is new or changed"""
+        pending = set()
+        for entry in pages.values():
+            pending.update(entry['assets'])
+
+        seen = set()
+        copied = 0
+        while pending:
+            url = pending.pop()
+            if url in seen:
+                continue
+            seen.add(url)
+
+            source = find_asset(url)
+            if not source:
+                self.stdout.write(self.style.WARNING(f'  missing asset {url}'))
+                continue
+            if source.endswith('.css'):
+                with open(source, encoding='utf-8', errors='replace') as css_file:
+                    pending.update(asset_references(css_file.read(), base_url=url) - seen)
+
+            target = os.path.join(output_dir, url.lstrip('/'))
+            source_stat = os.stat(source)
+            if os.path.exists(target):
+                target_stat = os.stat(target)
+                if (target_stat.st_size == source_stat.st_size
+                        and int(target_stat.st_mtime) == int(source_stat.st_mtime)):
+                    continue
+            copy_atomic(source, target)
+            copied += 1
+        return copied
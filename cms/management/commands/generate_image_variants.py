@@ -0,0 +1,82 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from cms.cache import invalidate_chrome
+from cms.images import SOURCE_EXTENSIONS, available_formats, resolve_image, encode_variants
+from cms.models import Page, Element
+
+def encode_file(path, force):
+    """encode_variants for one file, with errors returned instead of raised (runs in a worker)"""
+    try:
+        return path, encode_variants(path, force), None
+    except Exception as error:
+        return path, [], str(error)
+
+class Command(BaseCommand):
+    help = 'Write AVIF and WebP copies of the images used by elements, for editable_image to serve in <picture>'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Every image under STATICFILES_DIRS and MEDIA_ROOT, not only those elements use')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-encode images whose copies are already up to date')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes used to encode')
+
+    def handle(self, *args, **options):
+        formats = [extension for extension, _, _, _ in available_formats()]
+        if not formats:
+            raise CommandError('This Pillow build can encode neither AVIF nor WebP.')
+
+        paths = self.image_paths(options['all'])
+        workers = max(1, options['workers'])
+        self.stdout.write(f'{len(paths)} image(s); writing {", ".join(formats)} with {workers} worker(s)')
+        started = time.monotonic()
+
+        jobs = [(path, options['force']) for path in sorted(paths)]
+        if workers == 1:
+            results = [encode_file(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(encode_file, *zip(*jobs))) if jobs else []
+
+        written = failed = 0
+        saved = 0
+        for path, variants, error in results:
+            if error:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'  {path}: {error}'))
+                continue
+            original = os.path.getsize(path)
+            for extension, size in variants:
+                if size is not None:
+                    written += 1
+                    saved += original - size
+
+        # Pages render <picture> from the files on disk: move the ETags on
+        # and drop the cached HTML
+        if written:
+            Page.objects.update(updated_at=timezone.now())
+            invalidate_chrome()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} file(s) in {elapsed:.1f}s, {saved / 1024 / 1024:.1f} MB smaller than the originals'
+            + (f'; {failed} image(s) failed' if failed else '')))
+
+    def image_paths(self, include_all):
+        if not include_all:
+            srcs = Element.objects.exclude(src='').exclude(src__isnull=True).values_list('src', flat=True).distinct()
+            return {path for path in map(resolve_image, srcs) if path}
+
+        roots = [root if isinstance(root, str) else root[1] for root in settings.STATICFILES_DIRS]
+        roots.append(settings.MEDIA_ROOT)
+        paths = set()
+        for root in roots:
+            for directory, _, filenames in os.walk(root):
+                for filename in filenames:
+                    if filename.lower().endswith(SOURCE_EXTENSIONS) and not filename.startswith('.tmp-'):
+                        paths.add(os.path.join(directory, filename))
+        return paths
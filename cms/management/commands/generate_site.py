@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from cms.cache import invalidate_chrome
+from cms.deletion import bulk_delete
+from cms.models import Page
+from cms.seeders.site import SiteGenerator
+
+class Command(BaseCommand):
+    help = 'Generate a large synthetic site (home page plus theme pages) with bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=100,
+                            help='Number of pages, including the home page')
+        parser.add_argument('--gallery-size', type=int, default=12,
+                            help='Gallery images per theme page')
+        parser.add_argument('--sections', type=int, default=5,
+                            help='Sections per theme page; beyond the standard five they are generic')
+        parser.add_argument('--elements', type=int, default=3,
+                            help='Elements in each generic section')
+        parser.add_argument('--payload', type=int, default=512,
+                            help='Approximate bytes of highlights JSON per element')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed; the same seed gives the same site')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows per INSERT and pages per transaction')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete all existing pages, sections and elements first')
+
+    def handle(self, *args, **options):
+        if options['pages'] < 1:
+            raise CommandError('--pages must be at least 1 (the home page).')
+
+        if Page.objects.exists():
+            if not options['clear']:
+                raise CommandError('The database already has pages; use --clear to replace them.')
+            with transaction.atomic():
+                bulk_delete(Page.objects.all())
+            invalidate_chrome()
+
+        generator = SiteGenerator(
+            pages=options['pages'],
+            gallery_size=options['gallery_size'],
+            sections=options['sections'],
+            elements=options['elements'],
+            payload_size=options['payload'],
+            seed=options['seed'],
+            batch_size=max(1, options['batch_size']),
+        )
+        rows, seconds = generator.generate(log=self.stdout.write)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {options["pages"]} page(s), {rows} rows in {seconds:.2f}s '
+            f'({rows / seconds if seconds else rows:.0f} rows/s)'
+        ))
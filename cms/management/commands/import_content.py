@@ -0,0 +1,158 @@
+import json
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+from cms.cache import invalidate_chrome
+from cms.content_io import COMPRESSIONS, FORMAT_VERSION, LineHasher, guess_compression, open_stream, read_lines
+from cms.deletion import bulk_delete
+from cms.models import Page, Section, Element, EditHistory, validate_json_content
+
+MODELS = {'page': Page, 'section': Section, 'element': Element, 'history': EditHistory}
+
+class Command(BaseCommand):
+    help = 'Replace all pages, sections, elements and edit history with the contents of an export_content file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="File to read, or '-' for stdin")
+        parser.add_argument('--compression', choices=COMPRESSIONS,
+                            help='Defaults to gzip for .gz, zstd for .zst, otherwise none')
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete the existing content first (required if there is any)')
+        parser.add_argument('--verify-only', action='store_true',
+                            help='Check the file is complete and its checksum matches, without importing')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        self.batch_size = max(1, options['batch_size'])
+        self.verify_only = options['verify_only']
+        self.users = {}
+        self.skipped_history = 0
+
+        if not self.verify_only and Page.objects.exists() and not options['replace']:
+            raise CommandError('The database already has content; use --replace to overwrite it.')
+
+        source = options['input']
+        try:
+            stream = open_stream(source, 'r', options['compression'] or guess_compression(source))
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+
+        with stream:
+            try:
+                if self.verify_only:
+                    counts = self.read(read_lines(stream))
+                else:
+                    # Everything happens in one transaction, so a truncated or
+                    # corrupt file leaves the database as it was
+                    with transaction.atomic():
+                        self.delete_content()
+                        counts = self.read(read_lines(stream))
+                        self.reset_sequences()
+                    invalidate_chrome()
+            except ValueError as error:
+                raise CommandError(f'{error}; nothing was imported')
+
+        summary = ', '.join(f'{count} {kind}' for kind, count in counts.items())
+        if self.verify_only:
+            self.stdout.write(self.style.SUCCESS(f'{source} is complete and its checksum matches ({summary})'))
+            return
+        if self.skipped_history:
+            self.stdout.write(self.style.WARNING(
+                f'Skipped {self.skipped_history} history row(s) whose user does not exist here'))
+        self.stdout.write(self.style.SUCCESS(f'Imported {summary}'))
+
+    def read(self, lines):
+        """Insert (or just check) every row; returns the row counts once the footer checks out"""
+        hasher = LineHasher()
+        counts = {}
+        batch_kind = None
+        batch = []
+        footer = None
+
+        for number, line in enumerate(lines, start=1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise CommandError(f'Line {number} is not valid JSON')
+            kind = record.pop('kind', None)
+
+            if number == 1:
+                if kind != 'header' or record.get('format') != FORMAT_VERSION:
+                    raise CommandError('Not an export_content file (or an unsupported format version)')
+                hasher.update(line)
+                continue
+            if kind == 'footer':
+                footer = record
+                break
+            if kind not in MODELS:
+                raise CommandError(f'Line {number} has unknown kind {kind!r}')
+
+            hasher.update(line)
+            counts[kind] = counts.get(kind, 0) + 1
+            if self.verify_only:
+                continue
+            if kind != batch_kind or len(batch) >= self.batch_size:
+                self.flush(batch_kind, batch)
+                batch_kind, batch = kind, []
+            obj = self.build(kind, record)
+            if obj is not None:
+                batch.append(obj)
+
+        if footer is None:
+            raise CommandError('The file ends early (no footer); nothing was imported')
+        if footer.get('sha256') != hasher.hexdigest():
+            raise CommandError('Checksum mismatch; the file is corrupt and nothing was imported')
+        expected = footer.get('counts', {})
+        if {kind: counts.get(kind, 0) for kind in expected} != expected or set(counts) - set(expected):
+            raise CommandError(f'Row counts {counts} do not match the footer {footer.get("counts")}')
+        self.flush(batch_kind, batch)
+        return footer['counts']
+
+    def build(self, kind, record):
+        if kind == 'history':
+            user_id = self.user_id(record.pop('user'))
+            if user_id is None:
+                self.skipped_history += 1
+                return None
+            record['user_id'] = user_id
+            timestamp = parse_datetime(record.pop('timestamp'))
+            history = EditHistory(**record)
+            history.imported_timestamp = timestamp
+            return history
+        if kind == 'element':
+            try:
+                validate_json_content(record.get('json_content'))
+            except ValidationError as error:
+                raise CommandError(f'Element {record.get("id")}: {error.messages[0]}')
+        return MODELS[kind](**record)
+
+    def user_id(self, username):
+        if username not in self.users:
+            self.users[username] = User.objects.filter(username=username).values_list('id', flat=True).first()
+        return self.users[username]
+
+    def flush(self, kind, batch):
+        if not batch:
+            return
+        MODELS[kind].objects.bulk_create(batch, batch_size=self.batch_size)
+        if kind == 'history':
+            # auto_now_add sets the insert time; put the original edit times back
+            for history in batch:
+                history.timestamp = history.imported_timestamp
+            EditHistory.objects.bulk_update(batch, ['timestamp'], batch_size=self.batch_size)
+
+    def delete_content(self):
+        # Queued jobs keep running, detached from their elements
+        bulk_delete(Page.objects.all())
+
+    def reset_sequences(self):
+        # Rows were inserted with explicit ids; PostgreSQL needs its sequences moved past them
+        statements = connection.ops.sequence_reset_sql(no_style(), [Page, Section, Element, EditHistory])
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
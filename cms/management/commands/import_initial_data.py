@@ -1,83 +1,57 @@
 import os
-import json
 from django.core.management.base import BaseCommand
 from django.utils.text import slugify
-from cms.models import Page, Section, Element
+from cms.seeders.upsert import UpsertPlan
 
 class Command(BaseCommand):
     help = 'Import initial data from HTML files'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--sync', action='store_true',
+                            help='Update existing pages to match the initial data, not just create missing ones')
+        parser.add_argument('--prune', action='store_true',
+                            help='With --sync, also delete sections of these pages that are not in the initial data')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only print what would change')
+
     def handle(self, *args, **options):
         self.stdout.write('Importing initial data...')
         
-        # Create base pages
+        # Build the desired page tree, then diff it against the database
+        self.pages = []
         self.create_base_pages()
-        
-        # Create theme pages
         self.create_theme_pages()
         
-        self.stdout.write(self.style.SUCCESS('Successfully imported initial data'))
+        plan = UpsertPlan(self.pages, prune=options['prune'], only_new=not options['sync'])
+        for line in plan.summary():
+            self.stdout.write(f'  {line}')
+        
+        if not plan.has_changes():
+            self.stdout.write(self.style.SUCCESS('Initial data is already up to date'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run, nothing was written'))
+        else:
+            plan.apply()
+            self.stdout.write(self.style.SUCCESS('Successfully imported initial data'))
+    
+    def add_page(self, slug, name, page_type):
+        page = {'slug': slug, 'name': name, 'type': page_type, 'sections': []}
+        self.pages.append(page)
+        return page
+    
+    def add_section(self, page, name, type, order):
+        section = {'name': name, 'type': type, 'order': order, 'elements': []}
+        page['sections'].append(section)
+        return section
+    
+    def add_element(self, section, **fields):
+        section['elements'].append(fields)
     
     def create_base_pages(self):
-        # Create Home page
-        home_page, created = Page.objects.get_or_create(
-            slug='index',
-            defaults={
-                'name': 'Home',
-                'type': 'base'
-            }
-        )
-        
-        if created:
-            self.stdout.write(f'Created Home page')
-            
-            # Create sections for Home page
-            self.create_home_page_sections(home_page)
-        
-        # Create About page
-        about_page, created = Page.objects.get_or_create(
-            slug='about',
-            defaults={
-                'name': 'Services',
-                'type': 'base'
-            }
-        )
-        
-        if created:
-            self.stdout.write(f'Created Services page')
-            
-            # Create sections for About page
-            self.create_about_page_sections(about_page)
-        
-        # Create Gallery page
-        gallery_page, created = Page.objects.get_or_create(
-            slug='gallery',
-            defaults={
-                'name': 'Gallery',
-                'type': 'base'
-            }
-        )
-        
-        if created:
-            self.stdout.write(f'Created Gallery page')
-            
-            # Create sections for Gallery page
-            self.create_gallery_page_sections(gallery_page)
-        
-        # Create Contact page
-        contact_page, created = Page.objects.get_or_create(
-            slug='contact',
-            defaults={
-                'name': 'Contact',
-                'type': 'base'
-            }
-        )
-        
-        if created:
-            self.stdout.write(f'Created Contact page')
-            
-            # Create sections for Contact page
-            self.create_contact_page_sections(contact_page)
+        self.create_home_page_sections(self.add_page('index', 'Home', 'base'))
+        self.create_about_page_sections(self.add_page('about', 'Services', 'base'))
+        self.create_gallery_page_sections(self.add_page('gallery', 'Gallery', 'base'))
+        self.create_contact_page_sections(self.add_page('contact', 'Contact', 'base'))
     
     def create_theme_pages(self):
         # Create theme pages
@@ -87,24 +61,12 @@ class Command(BaseCommand):
         ]
         
         for page_name in theme_pages:
-            slug = slugify(page_name)
-            page, created = Page.objects.get_or_create(
-                slug=slug,
-                defaults={
-                    'name': page_name,
-                    'type': 'theme'
-                }
-            )
-            
-            if created:
-                self.stdout.write(f'Created Theme page: {page_name}')
-                
-                # Create sections for theme page
-                self.create_theme_page_sections(page)
+            page = self.add_page(slugify(page_name), page_name, 'theme')
+            self.create_theme_page_sections(page)
     
     def create_home_page_sections(self, page):
         # Create Header section
-        header_section = Section.objects.create(
+        header_section = self.add_section(
             page=page,
             name='header',
             type='text',
@@ -112,7 +74,7 @@ class Command(BaseCommand):
         )
         
         # Create Header elements
-        Element.objects.create(
+        self.add_element(
             section=header_section,
             title='Leave Your Footprints',
             description='Discover the magic of Morocco, a land of breathtaking landscapes, rich culture, and unforgettable adventures. From the golden dunes of the Sahara to the vibrant souks of Marrakech, explore ancient medinas, majestic mountains, and stunning coastal towns. Experience the warmth of Moroccan hospitality, savor traditional cuisine, and embark on a journey full of history, adventure, and beauty.',
@@ -120,7 +82,7 @@ class Command(BaseCommand):
         )
         
         # Create Featured section
-        featured_section = Section.objects.create(
+        featured_section = self.add_section(
             page=page,
             name='featured',
             type='image',
@@ -162,7 +124,7 @@ class Command(BaseCommand):
         ]
         
         for item in featured_items:
-            Element.objects.create(
+            self.add_element(
                 section=featured_section,
                 title=item['title'],
                 src=item['src'],
@@ -170,7 +132,7 @@ class Command(BaseCommand):
             )
         
         # Create Services section
-        services_section = Section.objects.create(
+        services_section = self.add_section(
             page=page,
             name='services',
             type='text',
@@ -200,7 +162,7 @@ class Command(BaseCommand):
         ]
         
         for item in services_items:
-            Element.objects.create(
+            self.add_element(
                 section=services_section,
                 title=item['title'],
                 description=item['description'],
@@ -209,7 +171,7 @@ class Command(BaseCommand):
             )
         
         # Create Testimonials section
-        testimonials_section = Section.objects.create(
+        testimonials_section = self.add_section(
             page=page,
             name='testimonials',
             type='text',
@@ -239,7 +201,7 @@ class Command(BaseCommand):
         ]
         
         for item in testimonials_items:
-            Element.objects.create(
+            self.add_element(
                 section=testimonials_section,
                 title=item['title'],
                 description=item['description'],
@@ -248,7 +210,7 @@ class Command(BaseCommand):
             )
         
         # Create Video section
-        video_section = Section.objects.create(
+        video_section = self.add_section(
             page=page,
             name='video',
             type='video',
@@ -256,7 +218,7 @@ class Command(BaseCommand):
         )
         
         # Create Video element
-        Element.objects.create(
+        self.add_element(
             section=video_section,
             src='/static/videos/video-section.mp4',
             order=0
@@ -264,7 +226,7 @@ class Command(BaseCommand):
     
     def create_about_page_sections(self, page):
         # Create Header section
-        header_section = Section.objects.create(
+        header_section = self.add_section(
             page=page,
             name='header',
             type='text',
@@ -272,7 +234,7 @@ class Command(BaseCommand):
         )
         
         # Create Header elements
-        Element.objects.create(
+        self.add_element(
             section=header_section,
             title='Services',
             description='Escape to the stunning Agafay Desert, a hidden gem near Marrakech. Experience breathtaking landscapes, luxury desert camps, and unforgettable adventures under the starry sky. Discover the magic of Agafay today!',
@@ -280,7 +242,7 @@ class Command(BaseCommand):
         )
         
         # Create About section
-        about_section = Section.objects.create(
+        about_section = self.add_section(
             page=page,
             name='about',
             type='image',
@@ -369,7 +331,7 @@ class Command(BaseCommand):
         ]
         
         for item in about_items:
-            Element.objects.create(
+            self.add_element(
                 section=about_section,
                 title=item['title'],
                 description=item['description'],
@@ -379,7 +341,7 @@ class Command(BaseCommand):
             )
         
         # Create Facts section
-        facts_section = Section.objects.create(
+        facts_section = self.add_section(
             page=page,
             name='facts',
             type='json',
@@ -412,15 +374,15 @@ class Command(BaseCommand):
             ]
         }
         
-        Element.objects.create(
+        self.add_element(
             section=facts_section,
-            json_content=json.dumps(facts_json),
+            json_content=facts_json,
             order=0
         )
     
     def create_gallery_page_sections(self, page):
         # Create Header section
-        header_section = Section.objects.create(
+        header_section = self.add_section(
             page=page,
             name='header',
             type='text',
@@ -428,7 +390,7 @@ class Command(BaseCommand):
         )
         
         # Create Header elements
-        Element.objects.create(
+        self.add_element(
             section=header_section,
             title='Gallery',
             description='Discover the magic of Morocco, a land of breathtaking landscapes, rich culture, and unforgettable adventures. From the golden dunes of the Sahara to the vibrant souks of Marrakech, explore ancient medinas, majestic mountains, and stunning coastal towns. Experience the warmth of Moroccan hospitality, savor traditional cuisine, and embark on a journey full of history, adventure, and beauty.',
@@ -436,7 +398,7 @@ class Command(BaseCommand):
         )
         
         # Create Gallery section
-        gallery_section = Section.objects.create(
+        gallery_section = self.add_section(
             page=page,
             name='gallery',
             type='image',
@@ -460,7 +422,7 @@ class Command(BaseCommand):
         ]
         
         for item in gallery_items:
-            Element.objects.create(
+            self.add_element(
                 section=gallery_section,
                 src=item['src'],
                 order=item['order']
@@ -468,7 +430,7 @@ class Command(BaseCommand):
     
     def create_contact_page_sections(self, page):
         # Create Header section
-        header_section = Section.objects.create(
+        header_section = self.add_section(
             page=page,
             name='header',
             type='text',
@@ -476,7 +438,7 @@ class Command(BaseCommand):
         )
         
         # Create Header elements
-        Element.objects.create(
+        self.add_element(
             section=header_section,
             title='Contact',
             description='Get in touch with us! We\'d love to hear from you. Whether you have questions, feedback, or need assistance, please reach out, and our team will be happy to help you.',
@@ -484,7 +446,7 @@ class Command(BaseCommand):
         )
         
         # Create Contact section
-        contact_section = Section.objects.create(
+        contact_section = self.add_section(
             page=page,
             name='contact',
             type='form',
@@ -522,15 +484,15 @@ class Command(BaseCommand):
             ]
         }
         
-        Element.objects.create(
+        self.add_element(
             section=contact_section,
-            json_content=json.dumps(contact_json),
+            json_content=contact_json,
             order=0
         )
     
     def create_theme_page_sections(self, page):
         # Create Header section
-        header_section = Section.objects.create(
+        header_section = self.add_section(
             page=page,
             name='header',
             type='image',
@@ -538,16 +500,16 @@ class Command(BaseCommand):
         )
         
         # Create Header elements
-        Element.objects.create(
+        self.add_element(
             section=header_section,
-            title=page.name,
-            description=f'Experience the beauty of {page.name}, one of Morocco\'s most enchanting destinations.',
-            src=f'/static/images/{page.slug.lower()}1.jpg',
+            title=page['name'],
+            description=f'Experience the beauty of {page["name"]}, one of Morocco\'s most enchanting destinations.',
+            src=f'/static/images/{page["slug"].lower()}1.jpg',
             order=0
         )
         
         # Create Description section
-        description_section = Section.objects.create(
+        description_section = self.add_section(
             page=page,
             name='description',
             type='text',
@@ -555,15 +517,15 @@ class Command(BaseCommand):
         )
         
         # Create Description elements
-        Element.objects.create(
+        self.add_element(
             section=description_section,
-            title=f'{page.name} Experience',
-            description=f'Discover the enchanting beauty of {page.name}, a breathtaking destination in Morocco known for its stunning landscapes and vibrant culture.',
+            title=f'{page["name"]} Experience',
+            description=f'Discover the enchanting beauty of {page["name"]}, a breathtaking destination in Morocco known for its stunning landscapes and vibrant culture.',
             order=0
         )
         
         # Create Booking section
-        booking_section = Section.objects.create(
+        booking_section = self.add_section(
             page=page,
             name='booking',
             type='form',
@@ -587,8 +549,8 @@ class Command(BaseCommand):
             'price': '90€ per person'
         }
         
-        Element.objects.create(
+        self.add_element(
             section=booking_section,
-            json_content=json.dumps(booking_json),
+            json_content=booking_json,
             order=0
         )
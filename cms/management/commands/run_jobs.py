@@ -0,0 +1,81 @@
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from cms import jobs
+
+def run_in_thread(job):
+    # Each worker thread has its own connection; don't leave it open between jobs
+    try:
+        return jobs.run(job)
+    finally:
+        connections.close_all()
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (image variants and other media processing)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2,
+                            help='Jobs run at the same time by this worker (threads)')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--kind', action='append', dest='kinds',
+                            help='Only run jobs of this kind (repeatable)')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when no job is due instead of waiting for more')
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        worker = jobs.worker_name()
+        stopping = threading.Event()
+
+        def stop(signum, frame):
+            # Finish the running jobs, claim nothing new
+            self.stdout.write('Stopping after the running jobs finish...')
+            stopping.set()
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f'Worker {worker} running up to {concurrency} job(s) at a time')
+        running = set()
+        done = failed = 0
+        last_stale_check = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while not stopping.is_set():
+                close_old_connections()
+                if time.monotonic() - last_stale_check > 60:
+                    requeued, timed_out = jobs.requeue_stale()
+                    if requeued:
+                        self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale job(s)'))
+                    if timed_out:
+                        self.stdout.write(self.style.ERROR(f'{timed_out} stale job(s) out of attempts, failed'))
+                    last_stale_check = time.monotonic()
+
+                for future in [future for future in running if future.done()]:
+                    running.discard(future)
+                    if future.result():
+                        done += 1
+                    else:
+                        failed += 1
+
+                claimed = []
+                if len(running) < concurrency:
+                    claimed = jobs.claim_next(worker, concurrency - len(running), options['kinds'])
+                for job in claimed:
+                    self.stdout.write(f'  {job}')
+                    running.add(executor.submit(run_in_thread, job))
+
+                if not claimed:
+                    if options['once'] and not running:
+                        break
+                    stopping.wait(options['poll_interval'] if not running else 0.2)
+
+            for future in running:
+                if future.result():
+                    done += 1
+                else:
+                    failed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{done} job(s) done, {failed} failed or retrying'))
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from django.conf import settings
+from .models import MediaFile
+
+# Uploads are stored by content: <directory>/<2 hex>/<2 hex>/<sha256><.ext>,
+# so a URL always names the same bytes and can be cached forever. Derived
+# files next to them (hash.jpg.avif) are immutable too.
+HASHED_PATH = re.compile(r'^[a-z]+/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]{1,10})*$')
+INCOMING_DIR = '.incoming'
+
+
+def is_immutable(path):
+    """True for content-addressed media paths (relative to MEDIA_ROOT)"""
+    return bool(HASHED_PATH.match(path))
+
+
+def hashed_path(directory, digest, original_name):
+    extension = os.path.splitext(original_name)[1].lower()
+    if not re.fullmatch(r'\.[a-z0-9]{1,10}', extension):
+        extension = ''
+    return f'{directory}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def store_upload(uploaded_file, directory, user=None):
+    """
+    Stream an UploadedFile to disk, hashing it on the way, and return its
+    MediaFile. Bytes that were uploaded before are not stored again.
+    """
+    return store_chunks(uploaded_file.chunks(), uploaded_file.name, uploaded_file.content_type,
+                        directory, user)
+
+
+def store_chunks(chunks, name, content_type, directory, user=None, expected_sha256=None):
+    """
+    store_upload() for any iterable of byte strings. With expected_sha256,
+    raises ValueError (and keeps nothing) if the bytes hash to something else.
+    """
+    incoming = os.path.join(settings.MEDIA_ROOT, INCOMING_DIR)
+    os.makedirs(incoming, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=incoming, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as destination:
+            for chunk in chunks:
+                digest.update(chunk)
+                destination.write(chunk)
+                size += len(chunk)
+        digest = digest.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != digest:
+            raise ValueError('File checksum does not match')
+
+        existing = MediaFile.objects.filter(sha256=digest).first()
+        if existing is not None and os.path.exists(os.path.join(settings.MEDIA_ROOT, existing.path)):
+            os.unlink(tmp_path)
+            return existing
+
+        path = existing.path if existing else hashed_path(directory, digest, name)
+        target = os.path.join(settings.MEDIA_ROOT, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    if existing is not None:
+        return existing
+    media_file, _ = MediaFile.objects.get_or_create(sha256=digest, defaults={
+        'path': path,
+        'original_name': name[:255],
+        'content_type': (content_type or '')[:100],
+        'size': size,
+        'uploaded_by': user if user is not None and user.is_authenticated else None,
+    })
+    return media_file
+
+
+# Chunked uploads: chunk N of upload <id> is media/.incoming/<id>/<N>.part,
+# written under a temporary name and renamed once its checksum matches.
+CHUNK_READ_SIZE = 64 * 1024
+
+
+def chunk_dir(upload):
+    return os.path.join(settings.MEDIA_ROOT, INCOMING_DIR, str(upload.id))
+
+
+def received_chunks(upload):
+    """Indexes of the chunks already stored for an upload"""
+    try:
+        names = os.listdir(chunk_dir(upload))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[:-5]) for name in names if name.endswith('.part') and name[:-5].isdigit())
+
+
+def write_chunk(upload, index, stream, length, sha256):
+    """
+    Copy `length` bytes of one chunk from `stream` to disk, checking them
+    against the client's SHA-256. Raises ValueError (and keeps nothing) if the
+    size or checksum is wrong.
+    """
+    directory = chunk_dir(upload)
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    received = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as destination:
+            while received < length:
+                data = stream.read(min(CHUNK_READ_SIZE, length - received))
+                if not data:
+                    break
+                digest.update(data)
+                destination.write(data)
+                received += len(data)
+        if received != length:
+            raise ValueError(f'Chunk {index} ended after {received} of {length} bytes')
+        if digest.hexdigest() != sha256.lower():
+            raise ValueError(f'Chunk {index} checksum does not match')
+        os.replace(tmp_path, os.path.join(directory, f'{index}.part'))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def read_chunks(upload):
+    """The uploaded bytes in order, a block at a time, so nothing is held in memory"""
+    directory = chunk_dir(upload)
+    for index in range(upload.chunk_count):
+        with open(os.path.join(directory, f'{index}.part'), 'rb') as part:
+            while True:
+                data = part.read(1024 * 1024)
+                if not data:
+                    break
+                yield data
+
+
+def discard_chunks(upload):
+    shutil.rmtree(chunk_dir(upload), ignore_errors=True)
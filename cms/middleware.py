@@ -1,13 +1,125 @@
+import json
+import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from . import instrumentation
+from .compression import compress_response
+
+logger = logging.getLogger('cms.performance')
+
+
 class EditModeMiddleware:
+    # Runs natively under both WSGI and ASGI, so async views aren't pushed
+    # back onto a thread by a sync-only middleware
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        # Check if user is authenticated and has edit mode enabled
-        if request.user.is_authenticated and request.session.get('edit_mode', False):
-            request.edit_mode = True
-        else:
-            request.edit_mode = False
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.edit_mode = self.is_edit_mode(request)
         
         response = self.get_response(request)
         return response
+
+    async def __acall__(self, request):
+        # request.user and the session load lazily from the database
+        request.edit_mode = await sync_to_async(self.is_edit_mode)(request)
+        
+        response = await self.get_response(request)
+        return response
+
+    def is_edit_mode(self, request):
+        # Check if user is authenticated and has edit mode enabled
+        return bool(request.user.is_authenticated and request.session.get('edit_mode', False))
+
+
+class CompressionMiddleware:
+    """
+    gzip or brotli for HTML and JSON responses of at least
+    CMS_COMPRESSION_MIN_SIZE bytes, at CMS_COMPRESSION_LEVELS. Cached pages
+    carry their compressed copies, so serving them compresses nothing.
+    Responses that may hold a CSRF token or session data are sent
+    uncompressed (see compression.may_hold_secrets). Goes below the session
+    middleware and above anything that reads or writes the body.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return compress_response(request, await self.get_response(request))
+
+
+class PerformanceMiddleware:
+    """
+    Record SQL query count and time, template render time and time spent in
+    cms_tags for each request. Adds a Server-Timing header when
+    CMS_SERVER_TIMING is on, logs one JSON line per request to
+    'cms.performance' when CMS_PERFORMANCE_LOG is on, and checks the query
+    count against CMS_QUERY_BUDGETS (keyed by URL name).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrumentation.install()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = instrumentation.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.end_request(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings, token = instrumentation.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.end_request(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        if getattr(settings, 'CMS_SERVER_TIMING', settings.DEBUG):
+            response['Server-Timing'] = timings.server_timing()
+
+        match = request.resolver_match
+        view_name = match.url_name if match else None
+        if getattr(settings, 'CMS_PERFORMANCE_LOG', False):
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': view_name,
+                'status': response.status_code,
+                **timings.as_dict(),
+            }))
+
+        budget = getattr(settings, 'CMS_QUERY_BUDGETS', {}).get(view_name)
+        if budget is not None and timings.queries > budget:
+            message = (f'{view_name} ran {timings.queries} queries for {request.path}, '
+                       f'over its budget of {budget}')
+            if getattr(settings, 'CMS_QUERY_BUDGET_STRICT', False):
+                raise instrumentation.QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
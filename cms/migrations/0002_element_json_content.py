@@ -0,0 +1,99 @@
+import json
+import sys
+
+import django.db.models.fields.json
+from django.db import migrations, models
+
+
+BATCH_SIZE = 500
+
+
+def text_to_json(apps, schema_editor):
+    """
+    Copy json_content text into the native JSON column. Rows that are not
+    valid JSON are kept as JSON strings and reported, never dropped.
+    """
+    Element = apps.get_model('cms', 'Element')
+    invalid_ids = []
+    batch = []
+
+    for element in Element.objects.only('id', 'json_content').iterator(chunk_size=BATCH_SIZE):
+        text = element.json_content
+        if text is None or not text.strip():
+            element.json_data = None
+        else:
+            try:
+                element.json_data = json.loads(text)
+            except ValueError:
+                element.json_data = text
+                invalid_ids.append(element.id)
+        batch.append(element)
+        if len(batch) >= BATCH_SIZE:
+            Element.objects.bulk_update(batch, ['json_data'])
+            batch = []
+    if batch:
+        Element.objects.bulk_update(batch, ['json_data'])
+
+    if invalid_ids:
+        sys.stdout.write(
+            f'\n  {len(invalid_ids)} element(s) had json_content that is not valid JSON; '
+            f'kept as JSON strings: ids {invalid_ids}\n'
+        )
+
+
+def json_to_text(apps, schema_editor):
+    Element = apps.get_model('cms', 'Element')
+    batch = []
+
+    for element in Element.objects.only('id', 'json_data').iterator(chunk_size=BATCH_SIZE):
+        value = element.json_data
+        if value is None or isinstance(value, str):
+            element.json_content = value
+        else:
+            element.json_content = json.dumps(value, ensure_ascii=False)
+        batch.append(element)
+        if len(batch) >= BATCH_SIZE:
+            Element.objects.bulk_update(batch, ['json_content'])
+            batch = []
+    if batch:
+        Element.objects.bulk_update(batch, ['json_content'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='element',
+            name='json_data',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(text_to_json, json_to_text),
+        migrations.RemoveField(
+            model_name='element',
+            name='json_content',
+        ),
+        migrations.RenameField(
+            model_name='element',
+            old_name='json_data',
+            new_name='json_content',
+        ),
+        migrations.AddField(
+            model_name='element',
+            name='json_type',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.fields.json.KeyTextTransform('type', 'json_content'), output_field=models.CharField(max_length=50, null=True)),
+        ),
+        migrations.AddField(
+            model_name='element',
+            name='has_form',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=models.Q(('json_content__has_key', 'form')), output_field=models.BooleanField(null=True)),
+        ),
+        migrations.AddField(
+            model_name='element',
+            name='has_highlights',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=models.Q(('json_content__has_key', 'highlights')), output_field=models.BooleanField(null=True)),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.14 on 2026-10-18 16:46
+
+import cms.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0006_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='element',
+            name='has_form',
+        ),
+        migrations.RemoveField(
+            model_name='element',
+            name='has_highlights',
+        ),
+        migrations.AlterField(
+            model_name='element',
+            name='json_content',
+            field=models.JSONField(blank=True, null=True, validators=[cms.models.validate_json_content]),
+        ),
+    ]
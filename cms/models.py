@@ -1,6 +1,10 @@
+import json
+import uuid
 from django.db import models
+from django.db.models.fields.json import KT
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.utils.text import slugify
 
 class Page(models.Model):
@@ -12,6 +16,8 @@ class Page(models.Model):
     type = models.CharField(max_length=10, choices=TYPE_CHOICES)
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True)
+    # Last change to anything the page renders, including the navbar and footer
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
@@ -39,6 +45,7 @@ class Section(models.Model):
     name = models.CharField(max_length=100)
     type = models.CharField(max_length=10, choices=SECTION_TYPES)
     order = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['order']
@@ -46,19 +53,65 @@ class Section(models.Model):
     def __str__(self):
         return f"{self.page.name} - {self.name}"
 
+# Longest json_content "type" value; it is copied into the indexed json_type column
+JSON_TYPE_MAX_LENGTH = 50
+
+def validate_json_content(value):
+    """The "type" key must fit the json_type column (strict MySQL rejects the row otherwise)"""
+    if isinstance(value, dict) and value.get('type') is not None:
+        json_type = value['type'] if isinstance(value['type'], str) else json.dumps(value['type'])
+        if len(json_type) > JSON_TYPE_MAX_LENGTH:
+            raise ValidationError(f'"type" must be at most {JSON_TYPE_MAX_LENGTH} characters')
+
+def json_from_text(text):
+    """
+    The json_content value for JSON text from the editor, a form or a seed
+    file: blank text is None and text that is not valid JSON is kept as a
+    string. Values already in Python form are stored as they are.
+    """
+    if text is None or not text.strip():
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
 class Element(models.Model):
     section = models.ForeignKey(Section, related_name='elements', on_delete=models.CASCADE)
     title = models.CharField(max_length=255, null=True, blank=True)
     description = models.TextField(null=True, blank=True)
-    json_content = models.TextField(null=True, blank=True)
+    json_content = models.JSONField(null=True, blank=True, validators=[validate_json_content])
     src = models.CharField(max_length=255, null=True, blank=True)
     order = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    # json_content's "type" key as an indexed column, for grouping and the admin filter
+    json_type = models.GeneratedField(
+        expression=KT('json_content__type'),
+        output_field=models.CharField(max_length=JSON_TYPE_MAX_LENGTH, null=True),
+        db_persist=True,
+        db_index=True,
+    )
     
     class Meta:
         ordering = ['order']
     
     def __str__(self):
         return f"{self.section.name} - {self.title or 'Element ' + str(self.id)}"
+    
+    @property
+    def parsed_json(self):
+        """json_content as Python data: the stored object or list, else {}"""
+        value = self.json_content
+        return value if isinstance(value, (dict, list)) else {}
+    
+    @property
+    def json_text(self):
+        """json_content as JSON text, the format the editor API exchanges"""
+        value = self.json_content
+        if value is None or isinstance(value, str):
+            return value
+        return json.dumps(value, ensure_ascii=False)
 
 class EditHistory(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -74,3 +127,89 @@ class EditHistory(models.Model):
     
     def __str__(self):
         return f"{self.user.username} edited {self.element} on {self.timestamp}"
+
+class Job(models.Model):
+    """
+    Background work queued by the dashboard (image variants etc.) and run by
+    the run_jobs command. The table is the queue, so no broker is needed.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+    
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    element = models.ForeignKey(Element, related_name='jobs', null=True, blank=True, on_delete=models.SET_NULL)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    # Not picked up before this time (used for retry back-off)
+    run_after = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['status', 'run_after'])]
+    
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+class MediaFile(models.Model):
+    """
+    An uploaded file, stored once under its content hash
+    (media/uploads/ab/cd/abcd...jpg) whatever it was called or how often
+    it was uploaded. The name it was first uploaded with is kept here.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    path = models.CharField(max_length=255)
+    original_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField()
+    uploaded_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.original_name} ({self.sha256[:12]})"
+    
+    @property
+    def url(self):
+        return f"/media/{self.path}"
+
+class ChunkedUpload(models.Model):
+    """
+    A video upload sent in numbered chunks (see the *_upload views). Chunks
+    are kept in media/.incoming/<id>/ until the upload is completed, so an
+    interrupted upload can resume with the chunks it is missing.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    element = models.ForeignKey(Element, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.filename} ({self.size} bytes)"
+    
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.size // self.chunk_size))
+    
+    def expected_chunk_size(self, index):
+        if index < self.chunk_count - 1:
+            return self.chunk_size
+        return self.size - self.chunk_size * (self.chunk_count - 1)
@@ -1,4 +1,3 @@
-import json
 from django.db import transaction
 from cms.models import Page, Section, Element
 
@@ -53,21 +52,21 @@ def seed_navbar():
         navbar_element = Element.objects.filter(
             section=navbar_section,
             json_content__isnull=False
-        ).exclude(json_content='').first()
+        ).first()
         
         if not navbar_element:
             # Create the navbar element with JSON content
             Element.objects.create(
                 section=navbar_section,
                 title='Navigation Menu',
-                json_content=json.dumps(default_navbar_items),
+                json_content=default_navbar_items,
                 order=0
             )
             print("Created navbar element with default items")
         else:
             # Update the existing navbar with corrected URLs
             try:
-                existing_items = json.loads(navbar_element.json_content)
+                existing_items = navbar_element.json_content
                 for item in existing_items:
                     if item['title'] == 'Gallery':
                         item['src'] = '/page/gallery/'
@@ -76,7 +75,7 @@ def seed_navbar():
                     elif item['title'] == 'Contact':
                         item['src'] = '/page/contact/'
                 
-                navbar_element.json_content = json.dumps(existing_items)
+                navbar_element.json_content = existing_items
                 navbar_element.save()
                 print("Updated navbar element URLs")
             except:
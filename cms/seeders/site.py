@@ -0,0 +1,195 @@
+import random
+import time
+from django.db import transaction
+from cms.cache import invalidate_chrome
+from cms.models import Page, Section, Element
+from cms.seeders.upsert import load_bulk_pks
+
+PLACES = [
+    'Agafay', 'Imlil', 'Ourika', 'Ouzoud', 'Merzouga', 'Essaouira', 'Palmeraie', 'Ouarzazate',
+    'Chefchaouen', 'Todra', 'Dades', 'Atlas', 'Zagora', 'Tafraoute', 'Asilah', 'Ifrane',
+]
+ACTIVITIES = [
+    'Desert Camp', 'Trek', 'Valley Tour', 'Waterfalls', 'Camel Ride', 'Surf Trip', 'Quad Ride',
+    'Air Balloon', 'Paragliding', 'Cooking Class', 'Kasbah Tour', 'Sunset Dinner',
+]
+PHRASES = [
+    'Discover the charm of this destination.',
+    'Explore the cultural and spiritual heart of Morocco.',
+    'Enjoy excursions through breathtaking landscapes.',
+    'Experience local traditions and visit historical landmarks.',
+    'Shop in lively souks and visit museums.',
+    'Share mint tea with a Berber family.',
+    'Watch the sun set over the dunes.',
+]
+BOOKING_FORM = {
+    'fields': [
+        {'name': 'name', 'type': 'text', 'label': 'Full Name', 'required': True},
+        {'name': 'email', 'type': 'email', 'label': 'Email', 'required': True},
+        {'name': 'phone', 'type': 'tel', 'label': 'Phone Number', 'required': True},
+        {'name': 'date', 'type': 'date', 'label': 'Trip Date', 'required': True},
+        {'name': 'guests', 'type': 'select', 'label': 'Number of Guests', 'options': ['1', '2', '3', '4', '5+'], 'required': True},
+        {'name': 'message', 'type': 'textarea', 'label': 'Special Requests', 'required': False},
+    ],
+    'submit_text': 'Book Now',
+    'whatsapp_number': '212643562320',
+}
+# Sections of a theme page, in the order theme_page.html expects them
+THEME_SECTIONS = [('header', 'image'), ('description', 'text'), ('about_trip', 'text'),
+                  ('gallery', 'image'), ('booking', 'form')]
+
+
+class SiteGenerator:
+    """
+    Build a synthetic site (home page with navbar and footer, plus theme
+    pages) with bulk_create. The same seed always gives the same content.
+    """
+    def __init__(self, pages, gallery_size=12, sections=5, elements=3, payload_size=512,
+                 seed=0, batch_size=1000):
+        self.pages = pages
+        self.gallery_size = gallery_size
+        self.sections = sections
+        self.elements = elements
+        self.payload_size = payload_size
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.rows = 0
+
+    def generate(self, log=None):
+        """Insert everything; returns (rows inserted, seconds taken)"""
+        started = time.perf_counter()
+        tours = self.tour_pages()
+
+        with transaction.atomic():
+            home = Page.objects.create(name='Home', slug='index', type='base')
+            self.rows += 1
+            self.create_home(home, tours)
+
+        # One transaction per chunk of pages keeps memory flat on big sites
+        for start in range(0, len(tours), self.batch_size):
+            with transaction.atomic():
+                self.create_theme_pages(tours[start:start + self.batch_size])
+            if log:
+                log(f'  {min(start + self.batch_size, len(tours))} of {len(tours)} theme pages')
+
+        # bulk_create sends no signals
+        invalidate_chrome()
+        return self.rows, time.perf_counter() - started
+
+    def tour_pages(self):
+        tours = []
+        for number in range(1, self.pages):
+            name = f'{self.random.choice(PLACES)} {self.random.choice(ACTIVITIES)}'
+            tours.append(Page(name=name, slug=f'tour-{number}', type='theme'))
+        return tours
+
+    def highlights(self, size):
+        highlights = []
+        length = 20
+        while length < size or not highlights:
+            phrase = self.random.choice(PHRASES)
+            highlights.append(phrase)
+            length += len(phrase) + 4
+        return highlights
+
+    def bulk(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.rows += len(created)
+        return created
+
+    def create_home(self, home, tours):
+        sections = self.bulk(Section, [
+            Section(page=home, name=name, type=section_type, order=order)
+            for order, (name, section_type) in enumerate([
+                ('navbar', 'navbar'), ('navbar_logo', 'text'), ('header', 'text'), ('featured', 'image'),
+                ('services', 'text'), ('testimonials', 'text'), ('video', 'video'), ('footer', 'text'),
+            ])
+        ])
+        load_bulk_pks(Section, sections, ('page_id', 'order'))
+        by_name = {section.name: section for section in sections}
+        featured = tours[:6]
+
+        elements = [
+            Element(section=by_name['navbar'], title='Navigation Menu', order=0, json_content=[
+                {'title': 'Home', 'src': '/'},
+                *({'title': tour.name, 'src': f'/theme/{tour.slug}/'} for tour in tours[:5]),
+            ]),
+            Element(section=by_name['navbar_logo'], title='Marrakech<span>Activities</span><span>Portal</span>', order=0),
+            Element(section=by_name['header'], title='Leave Your Footprints', description=' '.join(PHRASES), order=0),
+            Element(section=by_name['header'], title="let's see our services", description='', order=1),
+            Element(section=by_name['featured'], title='featured places', json_content={'type': 'title'}, order=0),
+            Element(section=by_name['featured'], title='know about some places before your travel',
+                    json_content={'type': 'subtitle'}, order=1),
+            Element(section=by_name['services'], title='Our services', json_content={'type': 'title'}, order=0),
+            Element(section=by_name['testimonials'], title='testimonials', json_content={'type': 'title'}, order=0),
+            Element(section=by_name['video'], src='/static/videos/video-section.mp4', order=0),
+        ]
+        for order, tour in enumerate(featured, start=2):
+            elements.append(Element(section=by_name['featured'], title=tour.name, order=order,
+                                    description=self.random.choice(PHRASES),
+                                    src=f'/static/images/{tour.slug}-1.jpg'))
+        for order, icon in enumerate(['fas fa-hotel', 'fas fa-map-marked-alt', 'fas fa-money-bill'], start=1):
+            elements.append(Element(section=by_name['services'], title=f'Service {order}', order=order,
+                                    description=self.random.choice(PHRASES), json_content=icon))
+        for order in range(1, 4):
+            elements.append(Element(section=by_name['testimonials'], title=f'Guest {order}', order=order,
+                                    description=self.random.choice(PHRASES), src=f'/static/images/test-{order}.jpg',
+                                    json_content={'trip': f'Trip to {self.random.choice(PLACES)}'}))
+
+        footer = [
+            ('Marrakech<span>ActivitiesPortal</span>', ' '.join(PHRASES[:2]), '', 'logo'),
+            ('Follow us on:', '', '', 'social_title'),
+            ('facebook', '', 'https://www.facebook.com/', 'social_link'),
+            ('instagram', '', 'https://www.instagram.com/', 'social_link'),
+            ('Popular Places:', '', '', 'places_title'),
+            *((tour.name, '', f'/theme/{tour.slug}/', 'popular_place') for tour in tours[:9]),
+            ('Subscribe for Newsletter!', '', '', 'newsletter_title'),
+        ]
+        for order, (title, description, src, footer_type) in enumerate(footer):
+            elements.append(Element(section=by_name['footer'], title=title, description=description, src=src,
+                                    json_content={'type': footer_type}, order=order))
+        self.bulk(Element, elements)
+
+    def create_theme_pages(self, tours):
+        tours = load_bulk_pks(Page, self.bulk(Page, tours), ('slug',))
+
+        sections = []
+        for tour in tours:
+            for order in range(self.sections):
+                name, section_type = THEME_SECTIONS[order] if order < len(THEME_SECTIONS) else (f'section_{order}', 'text')
+                sections.append(Section(page=tour, name=name, type=section_type, order=order))
+        sections = load_bulk_pks(Section, self.bulk(Section, sections), ('page_id', 'order'))
+
+        elements = []
+        for section in sections:
+            elements.extend(self.theme_elements(section))
+        self.bulk(Element, elements)
+
+    def theme_elements(self, section):
+        page = section.page
+        if section.name == 'header':
+            return [Element(section=section, title=page.name, src=f'/static/images/{page.slug}-1.jpg', order=0,
+                            description=f'Experience the beauty of {page.name}, one of Morocco\'s most enchanting destinations.')]
+        if section.name == 'description':
+            return [Element(section=section, title=f'{page.name} Experience', order=0,
+                            description=' '.join(self.random.sample(PHRASES, 3)))]
+        if section.name == 'about_trip':
+            return [Element(section=section, title='About This Trip', order=0,
+                            description=self.random.choice(PHRASES),
+                            json_content={'highlights': self.highlights(self.payload_size)})]
+        if section.name == 'gallery':
+            return [
+                Element(section=section, title=f'{page.name} Image {number}', order=number - 1,
+                        src=f'/static/images/{page.slug}-{number}.jpg')
+                for number in range(1, self.gallery_size + 1)
+            ]
+        if section.name == 'booking':
+            price = self.random.randrange(40, 400, 10)
+            return [Element(section=section, title='Book This Trip', order=0,
+                            json_content={'form': BOOKING_FORM, 'price': f'{price}€ per person'})]
+        return [
+            Element(section=section, title=f'{section.name} {number}', order=number,
+                    description=self.random.choice(PHRASES),
+                    json_content={'type': 'item', 'highlights': self.highlights(self.payload_size)})
+            for number in range(self.elements)
+        ]
@@ -0,0 +1,204 @@
+from django.db import transaction
+from django.utils import timezone
+from cms.cache import invalidate_page, invalidate_chrome
+from cms.deletion import bulk_delete
+from cms.models import Page, Section, Element, json_from_text
+from cms.services import CHROME_PAGE_SLUG, CHROME_SECTION_NAMES
+
+PAGE_FIELDS = ('name', 'type')
+SECTION_FIELDS = ('type', 'order')
+ELEMENT_FIELDS = ('title', 'description', 'src', 'json_content', 'order')
+
+
+def load_bulk_pks(model, objects, key_fields, exclude_pks=()):
+    """
+    Fill in primary keys after bulk_create on backends that don't return
+    them (MySQL), matching rows on fields that are unique within the batch.
+    """
+    if not objects or objects[0].pk is not None:
+        return objects
+    lookup = {tuple(getattr(obj, field) for field in key_fields): obj for obj in objects}
+    rows = model.objects.filter(**{f'{key_fields[0]}__in': {key[0] for key in lookup}})
+    if exclude_pks:
+        rows = rows.exclude(pk__in=exclude_pks)
+    for row in rows.values_list(*key_fields, 'pk'):
+        obj = lookup.get(row[:-1])
+        if obj is not None:
+            obj.pk = row[-1]
+    return objects
+
+
+def is_chrome(page_slug, section_name):
+    return page_slug == CHROME_PAGE_SLUG and section_name in CHROME_SECTION_NAMES
+
+
+class UpsertPlan:
+    """
+    The inserts, updates and deletes that turn the database into a desired
+    page/section/element tree.
+
+    The tree is a list of pages:
+    {'slug', 'name', 'type', 'sections': [{'name', 'type', 'order',
+     'elements': [{'title', 'description', 'src', 'json_content', 'order'}]}]}
+
+    Pages match on slug, sections on name within their page, elements on
+    order within their section (then by position). Pages that are not in the
+    tree are never touched. Sections missing from the tree are only deleted
+    with prune=True, since seed_navbar and editors add sections of their own.
+    With only_new=True, pages that already exist are left as they are.
+    """
+    def __init__(self, tree, prune=False, only_new=False):
+        self.prune = prune
+        self.only_new = only_new
+        self.create = {Page: [], Section: [], Element: []}
+        self.update = {Page: [], Section: [], Element: []}
+        self.delete = {Section: [], Element: []}
+        self.changed_slugs = set()
+        self.chrome_changed = False
+        self.build(tree)
+
+    def build(self, tree):
+        slugs = [page['slug'] for page in tree]
+        pages = {page.slug: page for page in Page.objects.filter(slug__in=slugs)}
+        sections_by_page = {}
+        elements_by_section = {}
+        if pages and not self.only_new:
+            page_ids = [page.id for page in pages.values()]
+            for section in Section.objects.filter(page_id__in=page_ids).order_by('page_id', 'order', 'id'):
+                sections_by_page.setdefault(section.page_id, []).append(section)
+            for element in Element.objects.filter(section__page_id__in=page_ids).order_by('section_id', 'order', 'id'):
+                elements_by_section.setdefault(element.section_id, []).append(element)
+
+        for spec in tree:
+            page = pages.get(spec['slug'])
+            if page is None:
+                page = Page(slug=spec['slug'], name=spec['name'], type=spec['type'])
+                self.create[Page].append(page)
+                self.changed_slugs.add(page.slug)
+            elif self.only_new:
+                continue
+            elif self.assign(page, spec, PAGE_FIELDS):
+                self.update[Page].append(page)
+                self.changed_slugs.add(page.slug)
+            self.plan_sections(page, spec['sections'], sections_by_page.get(page.id, []), elements_by_section)
+
+    def plan_sections(self, page, specs, existing, elements_by_section):
+        # Pair sections that share a name, in order
+        unmatched = {}
+        for section in existing:
+            unmatched.setdefault(section.name, []).append(section)
+
+        for spec in specs:
+            candidates = unmatched.get(spec['name'])
+            if candidates:
+                section = candidates.pop(0)
+                if self.assign(section, spec, SECTION_FIELDS):
+                    self.update[Section].append(section)
+                    self.mark_changed(page, section.name)
+                self.plan_elements(page, section, spec['elements'], elements_by_section.get(section.id, []))
+            else:
+                section = Section(page=page, name=spec['name'], type=spec['type'], order=spec['order'])
+                self.create[Section].append(section)
+                self.mark_changed(page, section.name)
+                self.plan_elements(page, section, spec['elements'], [])
+
+        if self.prune:
+            for sections in unmatched.values():
+                for section in sections:
+                    self.delete[Section].append(section)
+                    self.delete[Element].extend(elements_by_section.get(section.id, []))
+                    self.mark_changed(page, section.name)
+
+    def plan_elements(self, page, section, specs, existing):
+        # Pair elements with the same order first, then the rest by position
+        by_order = {}
+        for element in existing:
+            by_order.setdefault(element.order, element)
+        pairs = []
+        unpaired = []
+        for spec in sorted(specs, key=lambda spec: spec.get('order') or 0):
+            values = {field: spec.get(field) for field in ELEMENT_FIELDS}
+            if isinstance(values['json_content'], str):
+                values['json_content'] = json_from_text(values['json_content'])
+            values['order'] = values['order'] or 0
+            element = by_order.pop(values['order'], None)
+            if element is None:
+                unpaired.append(values)
+            else:
+                pairs.append((element, values))
+        paired = {id(element) for element, _ in pairs}
+        leftover = [element for element in existing if id(element) not in paired]
+        pairs.extend(zip(leftover, unpaired))
+
+        for element, values in pairs:
+            if self.assign(element, values, ELEMENT_FIELDS):
+                self.update[Element].append(element)
+                self.mark_changed(page, section.name)
+        for values in unpaired[len(leftover):]:
+            self.create[Element].append(Element(section=section, **values))
+            self.mark_changed(page, section.name)
+        if len(leftover) > len(unpaired):
+            self.delete[Element].extend(leftover[len(unpaired):])
+            self.mark_changed(page, section.name)
+
+    def assign(self, obj, values, fields):
+        """Copy changed field values onto obj; True if anything changed"""
+        changed = False
+        for field in fields:
+            if getattr(obj, field) != values[field]:
+                setattr(obj, field, values[field])
+                changed = True
+        return changed
+
+    def mark_changed(self, page, section_name):
+        self.changed_slugs.add(page.slug)
+        if is_chrome(page.slug, section_name):
+            self.chrome_changed = True
+
+    def has_changes(self):
+        return any(self.create.values()) or any(self.update.values()) or any(self.delete.values())
+
+    def summary(self):
+        lines = []
+        for model in (Page, Section, Element):
+            name = model._meta.verbose_name_plural
+            lines.append(f'{name}: {len(self.create[model])} to create, {len(self.update[model])} to update, '
+                         f'{len(self.delete.get(model, []))} to delete')
+        return lines
+
+    def apply(self, batch_size=500):
+        """Write the plan in one transaction, then invalidate the affected pages"""
+        if not self.has_changes():
+            return
+        now = timezone.now()
+        with transaction.atomic():
+            pages = Page.objects.bulk_create(self.create[Page], batch_size=batch_size)
+            load_bulk_pks(Page, pages, ('slug',))
+            existing_section_ids = [section.id for section in self.update[Section]]
+            sections = Section.objects.bulk_create(self.create[Section], batch_size=batch_size)
+            for section in sections:
+                section.page_id = section.page.pk
+            load_bulk_pks(Section, sections, ('page_id', 'name', 'order'), exclude_pks=existing_section_ids)
+            Element.objects.bulk_create(self.create[Element], batch_size=batch_size)
+
+            for model, fields in ((Page, PAGE_FIELDS), (Section, SECTION_FIELDS), (Element, ELEMENT_FIELDS)):
+                for obj in self.update[model]:
+                    obj.updated_at = now
+                model.objects.bulk_update(self.update[model], [*fields, 'updated_at'], batch_size=batch_size)
+
+            # The caches are invalidated once below rather than per deleted row
+            element_ids = [element.id for element in self.delete[Element]]
+            section_ids = [section.id for section in self.delete[Section]]
+            if element_ids:
+                bulk_delete(Element.objects.filter(id__in=element_ids))
+            if section_ids:
+                bulk_delete(Section.objects.filter(id__in=section_ids))
+
+            # Content versions for conditional GET (bulk writes send no signals)
+            touched = Page.objects.all() if self.chrome_changed else Page.objects.filter(slug__in=self.changed_slugs)
+            touched.update(updated_at=now)
+
+        if self.chrome_changed:
+            invalidate_chrome()
+        for slug in self.changed_slugs:
+            invalidate_page(slug)
@@ -0,0 +1,192 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import Http404
+from .models import Page, Section, Element
+
+# Page whose sections hold the site-wide chrome (navbar, logo, footer)
+CHROME_PAGE_SLUG = 'index'
+CHROME_SECTION_NAMES = ('navbar', 'navbar_logo', 'footer')
+
+
+def _set_prefetched(instance, name, objects):
+    """Store an already-loaded list as if it came from prefetch_related()"""
+    queryset = getattr(instance, name).all()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    if not hasattr(instance, '_prefetched_objects_cache'):
+        instance._prefetched_objects_cache = {}
+    instance._prefetched_objects_cache[name] = queryset
+
+
+def group_by_json_type(elements):
+    """Group elements by the generated json_type column (json_content's "type" key)"""
+    groups = {}
+    for element in elements:
+        groups.setdefault(element.json_type, []).append(element)
+    return groups
+
+
+class PageContext:
+    """
+    A page with all of its sections and elements plus the site-wide
+    navbar, navbar logo and footer, loaded in a fixed number of queries.
+    """
+
+    def __init__(self, page, sections, chrome_sections, footer_sections=()):
+        self.page = page
+        self.sections = sections
+        self.chrome_sections = chrome_sections
+        self.footer_sections = footer_sections
+
+    def _chrome_section(self, name):
+        for section in self.chrome_sections:
+            if section.name == name:
+                return section
+        return None
+
+    def footer_section(self):
+        """The home page's footer, shared by every page, or else this page's own"""
+        return self._chrome_section('footer') or next(iter(self.footer_sections), None)
+
+    def footer_elements(self):
+        footer_section = self.footer_section()
+        return list(footer_section.elements.all()) if footer_section else []
+
+    def navbar_context(self):
+        """Navbar and navbar logo entries shared by every page"""
+        result = {}
+
+        navbar_section = self._chrome_section('navbar')
+        if navbar_section:
+            elements = list(navbar_section.elements.all())
+            # Prefer a JSON-based navbar element over individual elements
+            navbar_element = next((e for e in elements if e.json_content is not None), None)
+            if navbar_element:
+                result['navbar_element'] = navbar_element
+            elif elements:
+                result['navbar_elements'] = elements
+
+        logo_section = self._chrome_section('navbar_logo')
+        if logo_section:
+            logo_elements = list(logo_section.elements.all())
+            if logo_elements:
+                result['navbar_logo_element'] = logo_elements[0]
+
+        return result
+
+    def as_dict(self, edit_mode=False):
+        """Build the template context used by the public page views"""
+        context = {
+            'page': self.page,
+            'edit_mode': edit_mode,
+        }
+
+        # Add elements for each section to the context
+        for section in self.sections:
+            elements = list(section.elements.all())
+            if elements:
+                context[f'{section.name}_elements'] = elements
+                if len(elements) == 1:
+                    context[f'{section.name}_element'] = elements[0]
+
+        # Add footer and navbar elements to context
+        footer_elements = self.footer_elements()
+        context['footer_elements'] = footer_elements
+        context['footer_by_type'] = group_by_json_type(footer_elements)
+        # A page's own footer can't be served from the site-wide fragment cache
+        if footer_elements and self._chrome_section('footer') is None:
+            context['footer_from_page'] = True
+        context.update(self.navbar_context())
+
+        return context
+
+
+def _page_querysets(slug, page_type=None):
+    """
+    The section and element querysets for a page plus the site chrome. The
+    element query filters through the section join rather than on section
+    ids, so it doesn't wait on the section results.
+    """
+    page_filter = Q(page__slug=slug)
+    if page_type:
+        page_filter &= Q(page__type=page_type)
+    # The page's own footer, the fallback when the home page has none, is
+    # one of its sections already
+    chrome_filter = Q(page__slug=CHROME_PAGE_SLUG, name__in=CHROME_SECTION_NAMES)
+    section_filter = page_filter | chrome_filter
+
+    sections = Section.objects.select_related('page').filter(section_filter).order_by('order', 'id')
+    elements = Element.objects.filter(
+        section__in=Section.objects.filter(section_filter).values('id')
+    ).order_by('order', 'id')
+    return sections, elements
+
+
+def _page_lookup(slug, page_type=None):
+    lookup = {'slug': slug}
+    if page_type:
+        lookup['type'] = page_type
+    return Page.objects.filter(**lookup)
+
+
+def _assemble_page_context(slug, page_type, sections, elements):
+    """Wire loaded sections and elements together; page is None if it has no sections"""
+    elements_by_section = {section.id: [] for section in sections}
+    for element in elements:
+        elements_by_section[element.section_id].append(element)
+
+    page = None
+    page_sections = []
+    chrome_sections = []
+    footer_sections = []
+    for section in sections:
+        section_elements = elements_by_section[section.id]
+        for element in section_elements:
+            element.section = section
+        _set_prefetched(section, 'elements', section_elements)
+
+        if section.page.slug == slug and (not page_type or section.page.type == page_type):
+            page = page or section.page
+            section.page = page
+            page_sections.append(section)
+            if section.name == 'footer':
+                footer_sections.append(section)
+        if section.page.slug == CHROME_PAGE_SLUG and section.name in CHROME_SECTION_NAMES:
+            chrome_sections.append(section)
+
+    return PageContext(page, page_sections, chrome_sections, footer_sections)
+
+
+def _finish_page_context(page_context, page):
+    if page is None:
+        raise Http404('No Page matches the given query.')
+    page_context.page = page
+    _set_prefetched(page, 'sections', page_context.sections)
+    return page_context
+
+
+def load_page_context(slug, page_type=None):
+    """
+    Load a page, its sections and elements and the site chrome in two
+    queries: one for the sections (with their page) and one for the elements.
+
+    Raises Http404 if no matching page exists.
+    """
+    sections, elements = _page_querysets(slug, page_type)
+    page_context = _assemble_page_context(slug, page_type, list(sections), list(elements))
+
+    page = page_context.page
+    if page is None:
+        # The page exists but has no sections yet
+        page = _page_lookup(slug, page_type).first()
+    return _finish_page_context(page_context, page)
+
+
+async def aload_page_context(slug, page_type=None):
+    """
+    Async version of load_page_context(). Django's async ORM runs each query
+    through sync_to_async on one shared thread, so the queries can't overlap;
+    the whole load goes to that thread in a single hop instead of one per
+    query.
+    """
+    return await sync_to_async(load_page_context)(slug, page_type)
@@ -0,0 +1,176 @@
+import mimetypes
+import os
+import re
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+# Serving files from disk with Range/206, If-Range and conditional GET, for
+# /media/ and /static/. With CMS_FILE_OFFLOAD the web server sends the bytes
+# instead (and handles ranges itself):
+#   'x-accel'    nginx: X-Accel-Redirect to CMS_FILE_OFFLOAD_LOCATIONS[url prefix]
+#                (an internal location aliasing the same directory)
+#   'x-sendfile' Apache mod_xsendfile / lighttpd: X-Sendfile with the file path
+# Otherwise FileResponse streams the file; gunicorn's wsgi.file_wrapper then
+# uses sendfile(2) for it, ranges included.
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Precompressed copies written next to a file (see build_assets), preferred
+# in this order when the client accepts them
+PRECOMPRESSED = [('br', '.br'), ('gzip', '.gz')]
+
+# Not known to every Python's mimetypes table
+mimetypes.add_type('image/avif', '.avif')
+mimetypes.add_type('image/webp', '.webp')
+mimetypes.add_type('font/woff', '.woff')
+mimetypes.add_type('font/woff2', '.woff2')
+
+
+class _FileRange:
+    """
+    An open file limited to `length` bytes from its current position. It has
+    no seek() or name, so FileResponse leaves Content-Length to us, and
+    fileno() lets a WSGI server's sendfile start from the file's offset.
+    """
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def tell(self):
+        return self.file.tell()
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(stat):
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+
+def parse_range(header, size):
+    """
+    (start, end inclusive) for a single byte range, None to ignore the header
+    (absent, malformed or several ranges: the whole file is sent), or False
+    if it can't be satisfied.
+    """
+    match = RANGE_PATTERN.match(header.replace(' ', '')) if header else None
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes; an empty file has none to send
+        length = int(last)
+        if length == 0 or size == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    """A Range only applies if If-Range (when sent) still names this version of the file"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+def accepted_encodings(request):
+    """Content codings the client accepts (q=0 excluded)"""
+    accepted = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        if coding and not re.match(r'^\s*q\s*=\s*0(\.0*)?\s*$', params):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve_file(request, fullpath, url, cache_control, precompressed=False):
+    """
+    Response for one file on disk, with ranges, validators and optional
+    offload. With precompressed, a .br or .gz copy next to the file is sent
+    instead when the client accepts it.
+    """
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type if content_type and not encoding else 'application/octet-stream'
+    content_encoding = None
+    variants = [(coding, suffix) for coding, suffix in PRECOMPRESSED
+                if precompressed and os.path.isfile(fullpath + suffix)]
+    if variants:
+        accepted = accepted_encodings(request)
+        for coding, suffix in variants:
+            if coding in accepted:
+                content_encoding = coding
+                fullpath += suffix
+                url += suffix
+                break
+    try:
+        stat = os.stat(fullpath)
+    except OSError:
+        raise Http404('Not found')
+    etag = file_etag(stat)
+    last_modified = stat.st_mtime
+
+    def add_headers(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = cache_control
+        response['Accept-Ranges'] = 'bytes'
+        if variants:
+            response['Vary'] = 'Accept-Encoding'
+        if content_encoding and response.status_code != 304:
+            response['Content-Encoding'] = content_encoding
+        return response
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if conditional is not None:
+        return add_headers(conditional)
+
+    offload = getattr(settings, 'CMS_FILE_OFFLOAD', None)
+    if offload == 'x-accel':
+        for prefix, location in settings.CMS_FILE_OFFLOAD_LOCATIONS.items():
+            if url.startswith(prefix):
+                response = HttpResponse(content_type=content_type)
+                response['X-Accel-Redirect'] = location + url[len(prefix):]
+                return add_headers(response)
+    elif offload == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = fullpath
+        return add_headers(response)
+
+    byte_range = None
+    if request.method in ('GET', 'HEAD') and if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return add_headers(response)
+
+    file = open(fullpath, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(_FileRange(file, end - start + 1), content_type=content_type, status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = end - start + 1
+    return add_headers(response)
@@ -0,0 +1,104 @@
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .cache import invalidate_page, invalidate_chrome
+from .models import Page, Section, Element
+from .services import CHROME_PAGE_SLUG, CHROME_SECTION_NAMES
+
+
+def is_chrome_section(section):
+    """
+    The home page's navbar, navbar logo and footer appear on every page.
+    Another page's footer only shows on that page (see PageContext.footer_section).
+    """
+    return section.page.slug == CHROME_PAGE_SLUG and section.name in CHROME_SECTION_NAMES
+
+
+def invalidate_section(section):
+    """
+    Invalidate the page a section belongs to, or the whole site for chrome,
+    and record the edit time on the affected pages' content versions.
+    """
+    if section is None:
+        return
+    now = timezone.now()
+    if is_chrome_section(section):
+        Page.objects.update(updated_at=now)
+        invalidate_chrome()
+    else:
+        Page.objects.filter(pk=section.page_id).update(updated_at=now)
+        invalidate_page(section.page.slug)
+
+
+def _is_cascade(instance, origin):
+    # The object whose deletion cascaded here sends its own signal
+    if origin is None:
+        return False
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model is not type(instance)
+
+
+@receiver(pre_save, sender=Page)
+def remember_page_slug(sender, instance, **kwargs):
+    instance._previous_slug = None
+    if instance.pk:
+        instance._previous_slug = Page.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Page)
+def page_saved(sender, instance, **kwargs):
+    invalidate_page(instance.slug)
+    previous_slug = getattr(instance, '_previous_slug', None)
+    if previous_slug and previous_slug != instance.slug:
+        invalidate_page(previous_slug)
+
+
+@receiver(post_delete, sender=Page)
+def page_deleted(sender, instance, **kwargs):
+    invalidate_page(instance.slug)
+    if instance.slug == CHROME_PAGE_SLUG:
+        Page.objects.update(updated_at=timezone.now())
+        invalidate_chrome()
+
+
+@receiver(pre_save, sender=Section)
+def remember_section(sender, instance, **kwargs):
+    instance._previous_section = None
+    if instance.pk:
+        instance._previous_section = Section.objects.select_related('page').filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=Section)
+def section_saved(sender, instance, **kwargs):
+    invalidate_section(instance)
+    invalidate_section(getattr(instance, '_previous_section', None))
+
+
+@receiver(post_delete, sender=Section)
+def section_deleted(sender, instance, origin=None, **kwargs):
+    if _is_cascade(instance, origin):
+        return
+    invalidate_section(instance)
+
+
+@receiver(pre_save, sender=Element)
+def remember_element_section(sender, instance, **kwargs):
+    instance._previous_section_id = None
+    if instance.pk:
+        instance._previous_section_id = Element.objects.filter(pk=instance.pk).values_list('section_id', flat=True).first()
+
+
+@receiver(post_save, sender=Element)
+def element_saved(sender, instance, **kwargs):
+    invalidate_section(instance.section)
+    previous_section_id = getattr(instance, '_previous_section_id', None)
+    if previous_section_id and previous_section_id != instance.section_id:
+        invalidate_section(Section.objects.select_related('page').filter(pk=previous_section_id).first())
+
+
+@receiver(post_delete, sender=Element)
+def element_deleted(sender, instance, origin=None, **kwargs):
+    if _is_cascade(instance, origin):
+        return
+    invalidate_section(Section.objects.select_related('page').filter(pk=instance.section_id).first())
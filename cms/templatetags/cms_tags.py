@@ -1,10 +1,31 @@
+import json
 from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.html import escape
 from django.utils.safestring import mark_safe
-import json
+from django.utils.text import slugify
+from cms.assets import bundle_urls
+from cms.cache import chrome_fragment_key
+from cms.icons import icon_stylesheet_url
+from cms.images import image_sources, responsive_sources
+from cms.instrumentation import timed_tag
+from cms.models import Element
 
 register = template.Library()
 
+def _is_navbar_logo(context, element):
+    """Check the element's section role without a query when the page loader already knows it"""
+    if Element.section.is_cached(element):
+        return element.section.name == 'navbar_logo'
+    logo_element = context.get('navbar_logo_element')
+    if logo_element is not None and logo_element.pk == element.pk:
+        return True
+    return element.section.name == 'navbar_logo'
+
 @register.simple_tag(takes_context=True)
+@timed_tag
 def editable_text(context, element, field='description'):
     """
     Renders text content that can be edited in edit mode.
@@ -18,9 +39,10 @@ def editable_text(context, element, field='description'):
         return ''
     
     content = getattr(element, field, '')
+    navbar_logo = _is_navbar_logo(context, element)
     
     # Special handling for navbar logo
-    if element.section and element.section.name == 'navbar_logo':
+    if navbar_logo:
         # Add spans if not already present
         if '<span>' not in content:
             parts = content.split()
@@ -32,7 +54,7 @@ def editable_text(context, element, field='description'):
                 content = f"{parts[0]}<span>{parts[1]}</span>"
     
     if edit_mode:
-        if element.section and element.section.name == 'navbar_logo':
+        if navbar_logo:
             return mark_safe(
                 f'<div data-editable="logo" data-element-id="{element.id}" '
                 f'data-field="{field}">{content}</div>'
@@ -46,12 +68,16 @@ def editable_text(context, element, field='description'):
         return mark_safe(content)
 
 @register.simple_tag(takes_context=True)
-def editable_image(context, element, css_class=''):
+@timed_tag
+def editable_image(context, element, css_class='', size=None):
     """
     Renders an image that can be edited in edit mode.
+    With a size (the displayed width in CSS pixels) the image is served
+    through the resize endpoint with a srcset of whitelisted widths.
     
     Usage:
     {% editable_image element 'img-fluid' %}
+    {% editable_image element size=480 %}
     """
     edit_mode = context.get('edit_mode', False)
     
@@ -65,10 +91,26 @@ def editable_image(context, element, css_class=''):
         return mark_safe(f'<div data-editable="image" data-element-id="{element.id}" class="editable-image-container">'
                          f'<img src="{src}" alt="{alt}" class="{css_class}" style="max-width:100%;">'
                          f'</div>')
+    
+    responsive = responsive_sources(src, int(size)) if size else None
+    if responsive:
+        # data-original-src lets scripts such as the gallery zoom show the full image
+        img = (f'<img src="{responsive["src"]}" srcset="{responsive["srcset"]}" sizes="{responsive["sizes"]}" '
+               f'alt="{alt}" class="{css_class}" data-original-src="{src}">')
+        sources = responsive['sources']
     else:
-        return mark_safe(f'<img src="{src}" alt="{alt}" class="{css_class}">')
+        img = f'<img src="{src}" alt="{alt}" class="{css_class}">'
+        # AVIF/WebP copies made by generate_image_variants or on upload
+        sources = image_sources(src)
+    if not sources:
+        return mark_safe(img)
+    source_tags = ''.join(f'<source srcset="{srcset}" type="{mime_type}"'
+                          + (f' sizes="{responsive["sizes"]}">' if responsive else '>')
+                          for srcset, mime_type in sources)
+    return mark_safe(f'<picture>{source_tags}{img}</picture>')
 
 @register.simple_tag(takes_context=True)
+@timed_tag
 def editable_video(context, element, css_class=''):
     """
     Renders a video that can be edited in edit mode with upload capability.
@@ -97,6 +139,7 @@ def editable_video(context, element, css_class=''):
         return mark_safe(f'<video controls class="{css_class}"><source src="{src}" type="video/mp4">Your browser does not support the video tag.</video>')
 
 @register.simple_tag(takes_context=True)
+@timed_tag
 def editable_json(context, element, template_name=None):
     """
     Renders JSON content using a specified template.
@@ -109,12 +152,8 @@ def editable_json(context, element, template_name=None):
     if not element:
         return ''
     
-    json_content = element.json_content or '{}'
-    
-    try:
-        data = json.loads(json_content)
-    except json.JSONDecodeError:
-        data = {}
+    json_content = element.json_text or '{}'
+    data = element.parsed_json
     
     if template_name:
         from django.template.loader import render_to_string
@@ -128,16 +167,27 @@ def editable_json(context, element, template_name=None):
         return mark_safe(json_content)
 
 @register.filter
+def theme_url(link):
+    """
+    URL of the theme page a "Read more" link names: theme/<slug> as the
+    editor writes it, or an old <Name>.html file name from the initial data.
+    """
+    slug = slugify(str(link or '').removeprefix('theme/').removesuffix('.html'))
+    return reverse('theme_page', args=[slug]) if slug else '#'
+
+@register.filter
+@timed_tag
 def json_parse(value):
     """Parse JSON string into Python object"""
-    if not value:
+    if not value or not isinstance(value, str):
         return {}
     try:
         return json.loads(value)
-    except (ValueError, TypeError):
+    except ValueError:
         return {}
 
 @register.simple_tag(takes_context=True)
+@timed_tag
 def editable_highlights(context, element):
     """
     Renders trip highlights from JSON content that can be edited in edit mode.
@@ -151,9 +201,8 @@ def editable_highlights(context, element):
         return ''
     
     try:
-        data = json.loads(element.json_content or '{}')
-        highlights = data.get('highlights', [])
-    except (ValueError, TypeError):
+        highlights = element.parsed_json.get('highlights', [])
+    except AttributeError:
         highlights = []
     
     if not highlights:
@@ -178,6 +227,7 @@ def editable_highlights(context, element):
     return mark_safe(html)
 
 @register.simple_tag(takes_context=True)
+@timed_tag
 def editable_form(context, element):
     """
     Renders a form from JSON content that can be edited in edit mode.
@@ -191,12 +241,11 @@ def editable_form(context, element):
         return ''
     
     try:
-        data = json.loads(element.json_content or '{}')
-        form_data = data.get('form', {})
+        form_data = element.parsed_json.get('form', {})
         fields = form_data.get('fields', [])
         submit_text = form_data.get('submit_text', 'Submit')
         whatsapp_number = form_data.get('whatsapp_number', '212643562320')
-    except (ValueError, TypeError):
+    except AttributeError:
         fields = []
         submit_text = 'Submit'
         whatsapp_number = '212643562320'
@@ -263,6 +312,7 @@ def editable_form(context, element):
     return mark_safe(html)
 
 @register.simple_tag(takes_context=True)
+@timed_tag
 def editable_link(context, element, field='src', text_field='title', css_class=''):
     """
     Renders a link that can be edited in edit mode.
@@ -282,3 +332,69 @@ def editable_link(context, element, field='src', text_field='title', css_class='
         return mark_safe(f'<a href="{href}" class="{css_class}" data-editable="link" data-element-id="{element.id}" data-field="{field}" data-text-field="{text_field}">{text}</a>')
     else:
         return mark_safe(f'<a href="{href}" class="{css_class}">{text}</a>')
+
+@register.simple_tag(takes_context=True)
+@timed_tag
+def chrome_fragment(context, template_name):
+    """
+    Renders a site-wide include (navbar, footer) once per chrome version and
+    edit mode state, then serves the HTML from the cache.
+    
+    Usage:
+    {% chrome_fragment 'includes/footer.html' %}
+    """
+    edit_mode = context.get('edit_mode', False)
+    timeout = getattr(settings, 'CMS_FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+    
+    # A page-specific newsletter form or footer makes the footer differ per page
+    cacheable = (timeout and 'footer_newsletter_form_element' not in context
+                 and not context.get('footer_from_page'))
+    
+    key = chrome_fragment_key(template_name, edit_mode) if cacheable else None
+    html = cache.get(key) if key else None
+    
+    if html is None:
+        html = context.template.engine.get_template(template_name).render(context)
+        if key:
+            cache.set(key, str(html), timeout)
+    
+    return mark_safe(html)
+
+@register.simple_tag
+def asset_bundle(name, defer=False):
+    """
+    Renders the <link> or <script> tags for a bundle from CMS_ASSET_BUNDLES:
+    the fingerprinted file once build_assets has run, the sources before.
+    With defer the page doesn't wait for it: scripts get the defer attribute
+    and stylesheets are applied once loaded.
+    
+    Usage:
+    {% asset_bundle 'site.css' %}
+    {% asset_bundle 'editor.js' defer=True %}
+    """
+    if name.endswith('.css'):
+        tag = '<link rel="stylesheet" href="{url}">'
+        if defer:
+            tag = ('<link rel="stylesheet" href="{url}" media="print" onload="this.media=\'all\'">'
+                   '<noscript><link rel="stylesheet" href="{url}"></noscript>')
+    else:
+        tag = '<script src="{url}" defer></script>' if defer else '<script src="{url}"></script>'
+    return mark_safe('\n    '.join(tag.format(url=escape(url)) for url in bundle_urls(name)))
+
+@register.simple_tag
+def icon_stylesheet():
+    """
+    Renders the <link> for the icon font: the self-hosted subset once
+    build_icon_font has run, the Font Awesome CDN stylesheet before.
+    
+    Usage:
+    {% icon_stylesheet %}
+    """
+    url = icon_stylesheet_url()
+    if url:
+        return mark_safe(f'<link rel="stylesheet" href="{escape(url)}">')
+    fallback = settings.CMS_ICON_FALLBACK_STYLESHEET
+    return mark_safe(
+        f'<link rel="stylesheet" href="{escape(fallback["href"])}" integrity="{escape(fallback["integrity"])}" '
+        f'crossorigin="anonymous" referrerpolicy="no-referrer">'
+    )
@@ -0,0 +1,515 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipIf
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from . import compression, images, jobs
+from .compression import compress_response
+from .icons import find_used_icons
+from .deletion import bulk_delete
+from .media import chunk_dir, store_chunks, store_upload
+from .middleware import CompressionMiddleware
+from .serving import parse_range
+from .services import load_page_context
+from .signals import is_chrome_section
+from .models import Page, Section, Element, EditHistory, Job, ChunkedUpload, MediaFile
+
+# Sections + elements
+PAGE_QUERIES = 2
+# Plus the content version lookup for conditional GET
+PUBLIC_PAGE_QUERIES = PAGE_QUERIES + 1
+# Plus session and user lookups for the logged-in editor (no conditional GET)
+EDIT_PAGE_QUERIES = PAGE_QUERIES + 2
+DASHBOARD_QUERIES = {
+    'dashboard': 4,
+    'edit_page': 4,
+    'edit_section': 4,
+}
+
+
+def page_url(page):
+    if page.slug == 'index':
+        return '/'
+    if page.type == 'theme':
+        return f'/theme/{page.slug}/'
+    return f'/page/{page.slug}/'
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], CMS_PAGE_CACHE_TIMEOUT=0, CMS_FRAGMENT_CACHE_TIMEOUT=0)
+class QueryCountTests(TestCase):
+    """
+    Each view runs a fixed number of SQL queries on the initial data, with
+    the page and fragment caches off. A higher count usually means an N+1
+    lookup crept back into a template or tag.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        call_command('import_initial_data', stdout=StringIO())
+        cls.editor = User.objects.create_superuser('editor', password='unused')
+
+    def setUp(self):
+        # Content versions are cached between requests
+        cache.clear()
+        self.public = Client()
+        self.editing = Client()
+        self.editing.force_login(self.editor)
+        session = self.editing.session
+        session['edit_mode'] = True
+        session.save()
+
+    def assertQueries(self, client, url, expected):
+        with self.assertNumQueries(expected):
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200, f'{url} returned {response.status_code}')
+
+    def test_public_pages(self):
+        for page in Page.objects.order_by('id'):
+            with self.subTest(page=page.slug):
+                self.assertQueries(self.public, page_url(page), PUBLIC_PAGE_QUERIES)
+
+    def test_edit_mode_pages(self):
+        for page in Page.objects.order_by('id'):
+            with self.subTest(page=page.slug):
+                self.assertQueries(self.editing, page_url(page), EDIT_PAGE_QUERIES)
+
+    def test_dashboard(self):
+        self.assertQueries(self.editing, '/dashboard/', DASHBOARD_QUERIES['dashboard'])
+        page = Page.objects.order_by('id').first()
+        self.assertQueries(self.editing, f'/dashboard/page/{page.id}/', DASHBOARD_QUERIES['edit_page'])
+        section = Section.objects.order_by('id').first()
+        self.assertQueries(self.editing, f'/dashboard/section/{section.id}/', DASHBOARD_QUERIES['edit_section'])
+
+
+class BulkDeleteTests(TestCase):
+    def test_deletes_dependents_and_chunk_files(self):
+        user = User.objects.create_user('editor')
+        page = Page.objects.create(name='Imlil', slug='imlil', type='theme')
+        section = Section.objects.create(page=page, name='hero', type='hero', order=0)
+        element = Element.objects.create(section=section, title='Hero', order=0)
+        EditHistory.objects.create(user=user, element=element, field_name='title', previous_value='', new_value='Hero')
+        job = Job.objects.create(kind='image_variants', element=element, run_after=timezone.now())
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            upload = ChunkedUpload.objects.create(user=user, element=element, filename='clip.mp4',
+                                                  content_type='video/mp4', size=10, chunk_size=10)
+            os.makedirs(chunk_dir(upload))
+            with open(os.path.join(chunk_dir(upload), '0.part'), 'wb') as part:
+                part.write(b'0123456789')
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(bulk_delete(Page.objects.filter(pk=page.pk)), 1)
+            self.assertFalse(os.path.exists(chunk_dir(upload)))
+
+        for model in (Page, Section, Element, EditHistory, ChunkedUpload):
+            self.assertFalse(model.objects.exists(), model.__name__)
+        job.refresh_from_db()
+        self.assertIsNone(job.element_id)
+
+
+@override_settings(CMS_JOBS_EAGER=False)
+class RequeueStaleTests(TestCase):
+    def test_timeout_counts_as_an_attempt(self):
+        job = jobs.enqueue('image_variants', {'path': 'images/missing.jpg'}, max_attempts=2)
+        for expected in ((1, 0), (0, 1)):
+            self.assertTrue(jobs.claim(job.pk, 'test-worker'))
+            Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+            self.assertEqual(jobs.requeue_stale(), expected)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('Timed out', job.last_error)
+
+
+class StoreChunksTests(TestCase):
+    def test_checksum_mismatch_keeps_nothing(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            with self.assertRaises(ValueError):
+                store_chunks([b'012', b'345'], 'clip.mp4', 'video/mp4', 'videos', expected_sha256='0' * 64)
+            stored = [name for _, _, files in os.walk(media_root) for name in files]
+            self.assertEqual(stored, [])
+            self.assertFalse(MediaFile.objects.exists())
+
+
+class ParseRangeTests(TestCase):
+    def test_ranges(self):
+        cases = [
+            ('bytes=0-99', 1000, (0, 99)),
+            ('bytes=900-', 1000, (900, 999)),
+            ('bytes=-500', 1000, (500, 999)),
+            ('bytes=-5000', 1000, (0, 999)),
+            ('bytes=0-99,200-299', 1000, None),
+            ('', 1000, None),
+            ('bytes=1000-', 1000, False),
+            ('bytes=99-0', 1000, False),
+            ('bytes=-0', 1000, False),
+            ('bytes=-500', 0, False),
+            ('bytes=0-', 0, False),
+        ]
+        for header, size, expected in cases:
+            with self.subTest(header=header, size=size):
+                self.assertEqual(parse_range(header, size), expected)
+
+
+class UpdateElementsTests(TestCase):
+    def setUp(self):
+        page = Page.objects.create(name='Imlil', slug='imlil', type='theme')
+        section = Section.objects.create(page=page, name='hero', type='hero', order=0)
+        self.element = Element.objects.create(section=section, title='Hero', order=0)
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(User.objects.create_superuser('editor', password='unused'))
+        self.client.get('/dashboard/')
+        self.body = json.dumps({'changes': [{'id': self.element.id, 'field': 'title', 'value': 'Imlil'}]})
+
+    def post(self, content_type='application/json', **headers):
+        return self.client.post('/dashboard/elements/update/', self.body, content_type=content_type, **headers)
+
+    def test_requires_csrf_token(self):
+        self.assertEqual(self.post().status_code, 403)
+        response = self.post(HTTP_X_CSRFTOKEN=self.client.cookies['csrftoken'].value)
+        self.assertEqual(response.status_code, 200)
+        self.element.refresh_from_db()
+        self.assertEqual(self.element.title, 'Imlil')
+
+    def test_requires_json_body(self):
+        response = self.post(content_type='text/plain', HTTP_X_CSRFTOKEN=self.client.cookies['csrftoken'].value)
+        self.assertEqual(response.status_code, 415)
+
+
+class ChunkedUploadTests(TestCase):
+    data = b'0123456789'
+
+    def setUp(self):
+        page = Page.objects.create(name='Imlil', slug='imlil', type='theme')
+        section = Section.objects.create(page=page, name='hero', type='hero', order=0)
+        self.element = Element.objects.create(section=section, title='Hero', order=0)
+        self.user = User.objects.create_superuser('editor', password='unused')
+        self.upload = ChunkedUpload.objects.create(user=self.user, element=self.element, filename='clip.mp4',
+                                                   content_type='video/mp4', size=10, chunk_size=10)
+
+    def complete(self, sha256):
+        client = Client()
+        client.force_login(self.user)
+        chunk = client.put(f'/dashboard/uploads/{self.upload.id}/chunks/0/', self.data,
+                           content_type='application/octet-stream',
+                           HTTP_X_CHUNK_SHA256=hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(chunk.status_code, 200)
+        return client.post(f'/dashboard/uploads/{self.upload.id}/complete/', {'sha256': sha256})
+
+    def test_whole_file_checksum_mismatch(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            response = self.complete('0' * 64)
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(MediaFile.objects.exists())
+            self.assertFalse(ChunkedUpload.objects.exists())
+            self.assertEqual([name for _, _, files in os.walk(media_root) for name in files], [])
+        self.element.refresh_from_db()
+        self.assertNotIn('/media/', self.element.src or '')
+
+    def test_whole_file_checksum_match(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            response = self.complete(hashlib.sha256(self.data).hexdigest())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(MediaFile.objects.get().sha256, hashlib.sha256(self.data).hexdigest())
+
+    def test_endpoints_require_csrf_token(self):
+        element, upload = self.element, self.upload
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        requests = [
+            ('post', f'/dashboard/element/{element.id}/video-upload/'),
+            ('put', f'/dashboard/uploads/{upload.id}/chunks/0/'),
+            ('post', f'/dashboard/uploads/{upload.id}/complete/'),
+        ]
+        for method, url in requests:
+            with self.subTest(url=url):
+                self.assertEqual(getattr(client, method)(url).status_code, 403)
+
+
+@override_settings(CMS_COMPRESSION_LEVELS={'gzip': 6}, CMS_COMPRESSION_MIN_SIZE=100)
+class CompressionTests(TestCase):
+    body = b'<html>' + b'<p>Imlil valley tour</p>' * 200 + b'</html>'
+
+    def compress(self, request=None, response=None):
+        request = request or RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        return compress_response(request, response or HttpResponse(self.body))
+
+    def test_skips_responses_with_csrf_token(self):
+        request = RequestFactory().get('/dashboard/', HTTP_ACCEPT_ENCODING='gzip')
+        get_token(request)
+        self.assertFalse(self.compress(request).has_header('Content-Encoding'))
+
+    def test_skips_requests_with_session(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = 'abc'
+        self.assertFalse(self.compress(request).has_header('Content-Encoding'))
+
+    def test_gzip(self):
+        middleware = CompressionMiddleware(lambda request: HttpResponse(self.body))
+        response = middleware(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_prefers_brotli(self):
+        fake_brotli = mock.Mock(compress=lambda data, quality: b'br:' + gzip.compress(data))
+        with override_settings(CMS_COMPRESSION_LEVELS={'br': 5, 'gzip': 6}), \
+                mock.patch.object(compression, '_brotli', return_value=fake_brotli):
+            self.assertEqual(self.compress()['Content-Encoding'], 'br')
+            only_gzip = self.compress(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip;q=1, br;q=0'))
+            self.assertEqual(only_gzip['Content-Encoding'], 'gzip')
+
+    def test_identity_still_varies(self):
+        response = self.compress(RequestFactory().get('/'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, self.body)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_skips_streaming_and_encoded_responses(self):
+        streaming = self.compress(response=StreamingHttpResponse([self.body]))
+        self.assertFalse(streaming.has_header('Content-Encoding'))
+
+        encoded = HttpResponse(self.body)
+        encoded['Content-Encoding'] = 'br'
+        self.assertEqual(self.compress(response=encoded).content, self.body)
+
+    def test_reuses_cached_encoding(self):
+        response = HttpResponse(self.body)
+        response.encoded_content = {'gzip': b'stored copy'}
+        with mock.patch.object(compression, 'compress_body', side_effect=AssertionError('compressed again')):
+            response = self.compress(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip'), response)
+        self.assertEqual(response.content, b'stored copy')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+
+class FooterTests(TestCase):
+    def setUp(self):
+        self.footers = {}
+        for slug in ('index', 'imlil', 'ourika'):
+            page = Page.objects.create(name=slug.title(), slug=slug, type='theme' if slug != 'index' else 'base')
+            self.footers[slug] = Section.objects.create(page=page, name='footer', type='text', order=9)
+            Element.objects.create(section=self.footers[slug], title=f'{slug} footer', order=0)
+
+    def footer_titles(self, slug):
+        return [element.title for element in load_page_context(slug).footer_elements()]
+
+    def test_home_page_footer_is_shared(self):
+        self.assertEqual(self.footer_titles('imlil'), ['index footer'])
+        self.assertTrue(is_chrome_section(self.footers['index']))
+        self.assertFalse(is_chrome_section(self.footers['ourika']))
+
+    def test_falls_back_to_own_footer_only(self):
+        self.footers['index'].delete()
+        with self.assertNumQueries(2):
+            page_context = load_page_context('imlil')
+        self.assertEqual([element.title for element in page_context.footer_elements()], ['imlil footer'])
+        self.assertTrue(page_context.as_dict()['footer_from_page'])
+
+
+class IconScanTests(TestCase):
+    def test_social_link_titles_name_icons(self):
+        page = Page.objects.create(name='Home', slug='index', type='base')
+        footer = Section.objects.create(page=page, name='footer', type='text', order=0)
+        Element.objects.create(section=footer, title='Mastodon', src='https://mastodon.social/@tours', order=0,
+                               json_content={'type': 'social_link'})
+        # Not spelled out anywhere: footer.html builds fa-{{ element.title|lower }}
+        names, styles, _ = find_used_icons()
+        self.assertIn('mastodon', names)
+        self.assertIn('fab', styles)
+
+
+@override_settings(CMS_JOBS_EAGER=False, CMS_JOB_CONCURRENCY={'image_variants': 1})
+class ClaimNextTests(TestCase):
+    def test_concurrency_limit_holds_across_workers(self):
+        first = jobs.enqueue('image_variants', {'path': 'images/a.jpg'})
+        second = jobs.enqueue('image_variants', {'path': 'images/b.jpg'})
+        claim = jobs.claim
+
+        def racing_claim(job_id, worker):
+            # Another worker claims the other job between our count and our claim
+            if job_id == first.pk:
+                claim(second.pk, 'other-worker')
+            return claim(job_id, worker)
+
+        with mock.patch.object(jobs, 'claim', racing_claim):
+            self.assertEqual(jobs.claim_next('test-worker', limit=2), [])
+
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.attempts, first.locked_by), (Job.QUEUED, 0, ''))
+        self.assertEqual(Job.objects.filter(status=Job.RUNNING).count(), 1)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], CMS_COMPRESSION_MIN_SIZE=100)
+class ConditionalPageTests(TestCase):
+    """Pages revalidate with their content version: edits change the ETag, and the cached copy"""
+    @classmethod
+    def setUpTestData(cls):
+        call_command('import_initial_data', stdout=StringIO())
+
+    def setUp(self):
+        cache.clear()
+        self.theme_page = Page.objects.filter(type='theme').order_by('id').first()
+        self.url = page_url(self.theme_page)
+
+    def test_element_edit_changes_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        element = Element.objects.filter(section__page=self.theme_page).order_by('id').first()
+        element.title = 'Edited title'
+        element.save()
+        self.assertNotEqual(self.client.get(self.url)['ETag'], response['ETag'])
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # A compressed page carries the weak form of the same ETag
+        compressed = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(compressed['ETag'], 'W/' + etag)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=compressed['ETag'], HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 304)
+
+    def test_chrome_edit_invalidates_other_pages(self):
+        footer, _ = Section.objects.get_or_create(page=Page.objects.get(slug='index'), name='footer',
+                                                  defaults={'type': 'text', 'order': 99})
+        link = Element.objects.create(section=footer, title='Facebook', src='https://example.com/old-profile',
+                                      json_content={'type': 'social_link'}, order=0)
+        response = self.client.get(self.url)
+        self.assertContains(response, 'https://example.com/old-profile')
+        link.src = 'https://example.com/new-social-profile'
+        link.save()
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        self.assertContains(self.client.get(self.url), 'https://example.com/new-social-profile')
+
+
+class ServeMediaTests(TestCase):
+    data = bytes(range(256)) * 4
+
+    def setUp(self):
+        self.media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+        for name, data in (('clip.mp4', self.data), ('empty.mp4', b'')):
+            with open(os.path.join(self.media_root, name), 'wb') as media_file:
+                media_file.write(data)
+
+    def test_range(self):
+        response = self.client.get('/media/clip.mp4', HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.data)}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(b''.join(response.streaming_content), self.data[100:200])
+
+    def test_if_range_mismatch_sends_whole_file(self):
+        etag = self.client.get('/media/clip.mp4')['ETag']
+        self.assertEqual(self.client.get('/media/clip.mp4', HTTP_RANGE='bytes=0-9',
+                                         HTTP_IF_RANGE=etag).status_code, 206)
+        response = self.client.get('/media/clip.mp4', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"older-version"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+
+    def test_unsatisfiable_range(self):
+        for url, header in (('/media/empty.mp4', 'bytes=-500'), ('/media/clip.mp4', 'bytes=5000-')):
+            with self.subTest(url=url, range=header):
+                response = self.client.get(url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertTrue(response['Content-Range'].startswith('bytes */'))
+
+    def test_hidden_files_not_served(self):
+        self.assertEqual(self.client.get('/media/.incoming/clip.mp4').status_code, 404)
+
+    def test_offload(self):
+        with override_settings(CMS_FILE_OFFLOAD='x-accel', CMS_FILE_OFFLOAD_LOCATIONS={'/media/': '/protected/media/'}):
+            response = self.client.get('/media/clip.mp4')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/media/clip.mp4')
+        self.assertEqual(response.content, b'')
+
+        with override_settings(CMS_FILE_OFFLOAD='x-sendfile'):
+            response = self.client.get('/media/clip.mp4')
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root, 'clip.mp4'))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+
+class StoreUploadTests(TestCase):
+    def test_same_bytes_stored_once(self):
+        data = b'\xff\xd8 not really a jpeg'
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            first = store_upload(SimpleUploadedFile('Agafay5.jpg', data, 'image/jpeg'), 'images')
+            second = store_upload(SimpleUploadedFile('copy of Agafay5.JPG', data, 'image/jpeg'), 'images')
+            stored = [os.path.join(directory, name) for directory, _, files in os.walk(media_root)
+                      for name in files]
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(MediaFile.objects.count(), 1)
+        self.assertEqual(stored, [os.path.join(media_root, first.path)])
+        self.assertEqual(first.sha256, hashlib.sha256(data).hexdigest())
+        self.assertTrue(first.path.startswith('images/'))
+
+
+@skipIf(images.Image is None, 'Pillow is not installed')
+class ResizedImageTests(TestCase):
+    url = '/img/320/75/media/uploads/photo.jpg'
+
+    def setUp(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.cache_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, CMS_IMAGE_CACHE_DIR=self.cache_dir))
+        self.enterContext(mock.patch.object(images, '_cache_size', None))
+        images.resolve_image.cache_clear()
+        os.makedirs(os.path.join(media_root, 'uploads'))
+        self.source = os.path.join(media_root, 'uploads', 'photo.jpg')
+        # Noise, so each width encodes to a clearly different size
+        images.Image.frombytes('RGB', (1000, 500), os.urandom(1000 * 500 * 3)).save(self.source, 'JPEG')
+
+    def test_unsupported_sizes_rejected(self):
+        for url in ('/img/321/75/media/uploads/photo.jpg', '/img/320/74/media/uploads/photo.jpg',
+                    '/img/320/75/media/uploads/missing.jpg', '/img/320/75/media/../uploads/photo.jpg'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_second_request_served_from_cache(self):
+        with mock.patch.object(images.Image, 'open', wraps=images.Image.open) as image_open:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+
+        self.assertEqual(image_open.call_count, 1)
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        self.assertEqual(first['ETag'], second['ETag'])
+        body = b''.join(second.streaming_content)
+        self.assertEqual(body, b''.join(first.streaming_content))
+        with images.Image.open(BytesIO(body)) as resized:
+            self.assertEqual(resized.size, (320, 160))
+
+    def test_least_recently_used_evicted_over_budget(self):
+        old, recent = (images.resize_image(self.source, width, 75)[0] for width in (960, 160))
+        os.utime(old, (1, 1))
+        os.utime(recent, (2, 2))
+        images._cache_size = None
+        # Make the 320px file once to learn its size, then set the budget one byte short of all three
+        new = images.resize_image(self.source, 320, 75)[0]
+        budget = sum(os.path.getsize(path) for path in (old, recent, new)) - 1
+        os.unlink(new)
+        images._cache_size = None
+        with override_settings(CMS_IMAGE_CACHE_MAX_SIZE=budget):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(recent))
+        self.assertTrue(os.path.exists(new))
+        self.assertEqual(images._cache_size, os.path.getsize(recent) + os.path.getsize(new))
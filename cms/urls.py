@@ -6,6 +6,10 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('page/<slug:slug>/', views.page_detail, name='page_detail'),
     path('theme/<slug:slug>/', views.theme_page, name='theme_page'),
+    path('img/<int:width>/<int:quality>/<path:path>', views.resized_image, name='resized_image'),
+    # Uploaded media and static files, with Range support for video seeking
+    path('media/<path:path>', views.serve_media, name='media'),
+    path('static/<path:path>', views.serve_static, name='static'),
     
     # Dashboard URLs
     path('dashboard/', views.dashboard, name='dashboard'),
@@ -14,8 +18,14 @@ urlpatterns = [
     path('dashboard/page/<int:page_id>/', views.edit_page, name='edit_page'),
     path('dashboard/section/<int:section_id>/', views.edit_section, name='edit_section'),
     path('dashboard/element/<int:element_id>/update/', views.update_element, name='update_element'),
+    path('dashboard/elements/update/', views.update_elements, name='update_elements'),
     path('dashboard/element/<int:element_id>/upload-image/', views.upload_image, name='upload_image'),
     path('dashboard/element/<int:element_id>/get/', views.get_element, name='get_element'),
     path('dashboard/element/<int:element_id>/upload_video/', views.upload_video, name='upload_video'),
     path('dashboard/element/<int:element_id>/delete/', views.delete_element, name='delete_element'),
+    path('dashboard/jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('dashboard/element/<int:element_id>/video-upload/', views.start_upload, name='start_upload'),
+    path('dashboard/uploads/<uuid:upload_id>/', views.upload_status, name='upload_status'),
+    path('dashboard/uploads/<uuid:upload_id>/chunks/<int:index>/', views.upload_chunk, name='upload_chunk'),
+    path('dashboard/uploads/<uuid:upload_id>/complete/', views.complete_upload, name='complete_upload'),
 ]
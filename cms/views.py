@@ -1,106 +1,56 @@
 import json
 import os
+from datetime import timedelta
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, Http404
+from django.http import FileResponse, HttpResponseBadRequest, HttpResponseNotModified, JsonResponse, Http404
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.views import LoginView
 from django.urls import reverse_lazy
 from django.conf import settings
-from .models import Page, Section, Element, EditHistory
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.http import quote_etag
+from django.contrib.staticfiles import finders
+from django.utils._os import safe_join
+from .models import (Page, Section, Element, EditHistory, Job, ChunkedUpload, json_from_text,
+                     validate_json_content)
 from .forms import ElementForm
-
-# Add this function to your views.py file to get footer elements for all pages
-def get_footer_elements():
-    """Get footer elements to be used across all pages"""
-    try:
-        # Try to get the footer section from the home page first
-        home_page = Page.objects.get(slug='index')
-        footer_section = home_page.sections.filter(name='footer').first()
-        if footer_section:
-            return footer_section.elements.all()
-    except (Page.DoesNotExist, AttributeError):
-        pass
-    
-    # If not found, try to find any footer section
-    footer_section = Section.objects.filter(name='footer').first()
-    if footer_section:
-        return footer_section.elements.all()
-    
-    # Return empty queryset if no footer elements found
-    return Element.objects.none()
-
-# Add this function to get navbar elements for all pages
-def get_navbar_elements():
-    """Get navbar elements to be used across all pages"""
-    # Initialize result dictionary
-    result = {}
-    
-    try:
-        # Try to get the navbar section from the home page first
-        home_page = Page.objects.get(slug='index')
-        
-        # Get navbar section
-        navbar_section = home_page.sections.filter(name='navbar').first()
-        if navbar_section:
-            # First check for a JSON-based navbar element
-            navbar_element = navbar_section.elements.filter(
-                json_content__isnull=False
-            ).exclude(json_content='').first()
-            
-            if navbar_element:
-                result['navbar_element'] = navbar_element
-            else:
-                # If no JSON navbar, get individual elements
-                elements = navbar_section.elements.all().order_by('order')
-                if elements.exists():
-                    result['navbar_elements'] = elements
-        
-        # Always try to get the navbar logo element
-        logo_section = home_page.sections.filter(name='navbar_logo').first()
-        if logo_section:
-            logo_element = logo_section.elements.first()
-            if logo_element:
-                result['navbar_logo_element'] = logo_element
-        
-        return result
-    
-    except (Page.DoesNotExist, AttributeError):
-        pass
-    
-    # Return empty dict if nothing found
-    return {}
+from .services import aload_page_context
+from .cache import cache_public_page, conditional_page
+from .assets import is_fingerprinted
+from .images import SOURCE_EXTENSIONS, parse_resized_path, resized_cache_key, resize_image
+from .instrumentation import timed
+from .serving import serve_file
+from .media import (is_immutable, store_upload, store_chunks, received_chunks, write_chunk,
+                    read_chunks, discard_chunks)
+from . import jobs
 
 # Frontend views
-def home(request):
-    page = get_object_or_404(Page, slug='index')
-    sections = page.sections.all().prefetch_related('elements')
-    
-    # Organize elements by section
-    context = {
-        'page': page,
-        'edit_mode': request.session.get('edit_mode', False),
-    }
-    
-    # Add elements for each section to the context
-    for section in sections:
-        elements = section.elements.all()
-        if elements:
-            context[f'{section.name}_elements'] = elements
-            if len(elements) == 1:
-                context[f'{section.name}_element'] = elements[0]
-    
-    # Add footer elements to context
-    context['footer_elements'] = get_footer_elements()
-    
-    # Add navbar elements to context
-    context.update(get_navbar_elements())
-    
-    return render(request, 'pages/index.html', context)
+# These are async so they run natively under ASGI. Django's ORM and template
+# rendering are sync-only underneath: both go through sync_to_async to one
+# shared thread (EditModeMiddleware has already read the session), so an
+# uncached page is no faster than under WSGI, and benchmarks/asgi_vs_wsgi.py
+# measures it somewhat slower. Serve the site with WSGI unless something
+# else needs ASGI.
+@conditional_page()
+@cache_public_page('home')
+async def home(request):
+    page_context = await aload_page_context('index')
+    # Set by EditModeMiddleware: only logged-in users get the editor
+    edit_mode = request.edit_mode
+    context = page_context.as_dict(edit_mode=edit_mode)
+    with timed('render'):
+        return await sync_to_async(render)(request, 'pages/index.html', context)
 
-def page_detail(request, slug):
-    page = get_object_or_404(Page, slug=slug)
-    sections = page.sections.all().prefetch_related('elements')
+@conditional_page()
+@cache_public_page('page_detail')
+async def page_detail(request, slug):
+    page_context = await aload_page_context(slug)
+    page = page_context.page
     
     # Determine template name
     if page.type == 'base':
@@ -108,68 +58,82 @@ def page_detail(request, slug):
     else:
         template_name = 'pages/theme_page.html'
     
-    # Organize elements by section
-    context = {
-        'page': page,
-        'edit_mode': request.session.get('edit_mode', False),
-    }
-    
-    # Add elements for each section to the context
-    for section in sections:
-        elements = section.elements.all()
-        if elements:
-            context[f'{section.name}_elements'] = elements
-            if len(elements) == 1:
-                context[f'{section.name}_element'] = elements[0]
-    
-    # Add footer elements to context
-    context['footer_elements'] = get_footer_elements()
-    
-    # Add navbar elements to context
-    context.update(get_navbar_elements())
-    
-    return render(request, template_name, context)
+    edit_mode = request.edit_mode
+    context = page_context.as_dict(edit_mode=edit_mode)
+    with timed('render'):
+        return await sync_to_async(render)(request, template_name, context)
 
-def theme_page(request, slug):
+@conditional_page(page_type='theme')
+@cache_public_page('theme_page')
+async def theme_page(request, slug):
     """View for theme pages"""
-    page = get_object_or_404(Page, slug=slug, type='theme')
-    sections = page.sections.all().prefetch_related('elements')
-    
-    # Organize elements by section
-    context = {
-        'page': page,
-        'edit_mode': request.session.get('edit_mode', False),
-    }
-    
-    # Add elements for each section to the context
-    for section in sections:
-        elements = section.elements.all()
-        if elements:
-            context[f'{section.name}_elements'] = elements
-            if len(elements) == 1:
-                context[f'{section.name}_element'] = elements[0]
-    
-    # Add footer elements to context
-    context['footer_elements'] = get_footer_elements()
-    
-    # Add navbar elements to context
-    context.update(get_navbar_elements())
-    
-    return render(request, 'pages/theme_page.html', context)
+    page_context = await aload_page_context(slug, page_type='theme')
+    edit_mode = request.edit_mode
+    context = page_context.as_dict(edit_mode=edit_mode)
+    with timed('render'):
+        return await sync_to_async(render)(request, 'pages/theme_page.html', context)
+
+def serve_media(request, path):
+    """Uploaded media; content-addressed files never change, so they are cached for good"""
+    if any(part.startswith('.') for part in path.split('/')):
+        # Uploads in progress (.incoming) and other hidden files
+        raise Http404('Not found')
+    fullpath = safe_join(settings.MEDIA_ROOT, path)
+    if not os.path.isfile(fullpath):
+        raise Http404('Not found')
+    cache_control = 'public, max-age=31536000, immutable' if is_immutable(path) else 'public, max-age=3600'
+    return serve_file(request, fullpath, settings.MEDIA_URL + path, cache_control)
+
+def serve_static(request, path):
+    """Static files, from the app directories in DEBUG and from STATIC_ROOT otherwise"""
+    fullpath = finders.find(path) if settings.DEBUG else None
+    if not fullpath and settings.STATIC_ROOT:
+        fullpath = safe_join(settings.STATIC_ROOT, path)
+    if not fullpath or not os.path.isfile(fullpath):
+        raise Http404('Not found')
+    cache_control = 'public, max-age=31536000, immutable' if is_fingerprinted(path) else 'public, max-age=3600'
+    return serve_file(request, fullpath, settings.STATIC_URL + path, cache_control, precompressed=True)
+
+def resized_image(request, width, quality, path):
+    """A /static/images or /media/uploads image scaled to a whitelisted width and quality"""
+    if width not in settings.CMS_IMAGE_WIDTHS or quality not in settings.CMS_IMAGE_QUALITIES:
+        raise Http404('Unsupported image size')
+    parsed = parse_resized_path(path)
+    if parsed is None:
+        raise Http404('Image not found')
+    url, source, extension = parsed
+    
+    etag = quote_etag(resized_cache_key(source, width, quality, extension))
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        with timed('resize'):
+            file_path, content_type = resize_image(source, width, quality, extension)
+        response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+    response['ETag'] = etag
+    if url.startswith(settings.MEDIA_URL) and is_immutable(url[len(settings.MEDIA_URL):]):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = 'public, max-age=86400'
+    return response
 
 # Dashboard views
+# Element fields the editor API may change
+EDITABLE_FIELDS = ('title', 'description', 'json_content', 'src')
+
 class AdminLoginView(LoginView):
     template_name = 'dashboard/login.html'
     success_url = reverse_lazy('dashboard')
 
 @login_required
 def dashboard(request):
-    pages = Page.objects.all()
-    recent_edits = EditHistory.objects.all()[:10]
-    return render(request, 'dashboard/dashboard.html', {
-        'pages': pages,
-        'recent_edits': recent_edits,
-    })
+    pages = Page.objects.annotate(section_count=Count('sections'))
+    recent_edits = EditHistory.objects.select_related('user', 'element__section__page')[:10]
+    with timed('render'):
+        return render(request, 'dashboard/dashboard.html', {
+            'pages': pages,
+            'recent_edits': recent_edits,
+        })
 
 @login_required
 def toggle_edit_mode(request):
@@ -180,7 +144,7 @@ def toggle_edit_mode(request):
 @login_required
 def edit_page(request, page_id):
     page = get_object_or_404(Page, id=page_id)
-    sections = page.sections.all().prefetch_related('elements')
+    sections = page.sections.annotate(element_count=Count('elements'))
     
     if request.method == 'POST':
         action = request.POST.get('action')
@@ -206,14 +170,15 @@ def edit_page(request, page_id):
             page.save()
             return redirect('edit_page', page_id=page.id)
     
-    return render(request, 'dashboard/edit_page.html', {
-        'page': page,
-        'sections': sections,
-    })
+    with timed('render'):
+        return render(request, 'dashboard/edit_page.html', {
+            'page': page,
+            'sections': sections,
+        })
 
 @login_required
 def edit_section(request, section_id):
-    section = get_object_or_404(Section, id=section_id)
+    section = get_object_or_404(Section.objects.select_related('page'), id=section_id)
     elements = section.elements.all()
     
     if request.method == 'POST':
@@ -223,26 +188,21 @@ def edit_section(request, section_id):
             # Create a new element
             title = request.POST.get('title', '')
             description = request.POST.get('description', '')
-            json_content = request.POST.get('json_content', '')
+            json_content = json_from_text(request.POST.get('json_content', ''))
             src = request.POST.get('src', '')
             order = request.POST.get('order', 0)
+            try:
+                validate_json_content(json_content)
+            except ValidationError as error:
+                return HttpResponseBadRequest(error.messages[0])
             
             # Handle file upload
             file = request.FILES.get('file')
             if file:
-                upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads')
-                os.makedirs(upload_dir, exist_ok=True)
-                
-                filename = f"uploads/{file.name}"
-                filepath = os.path.join(settings.MEDIA_ROOT, filename)
-                
-                with open(filepath, 'wb+') as destination:
-                    for chunk in file.chunks():
-                        destination.write(chunk)
-                
-                src = f"/media/{filename}"
+                media_file = store_upload(file, 'uploads', request.user)
+                src = media_file.url
             
-            Element.objects.create(
+            element = Element.objects.create(
                 section=section,
                 title=title,
                 description=description,
@@ -250,6 +210,8 @@ def edit_section(request, section_id):
                 src=src,
                 order=order
             )
+            if file and media_file.path.endswith(SOURCE_EXTENSIONS):
+                jobs.enqueue('image_variants', {'path': media_file.path}, element=element)
             return redirect('edit_section', section_id=section.id)
         else:
             # Update section details
@@ -259,10 +221,11 @@ def edit_section(request, section_id):
             section.save()
             return redirect('edit_section', section_id=section.id)
     
-    return render(request, 'dashboard/edit_section.html', {
-        'section': section,
-        'elements': elements,
-    })
+    with timed('render'):
+        return render(request, 'dashboard/edit_section.html', {
+            'section': section,
+            'elements': elements,
+        })
 
 @login_required
 @csrf_exempt
@@ -274,17 +237,27 @@ def update_element(request, element_id):
     
     # Get the field to update
     field = request.POST.get('field')
-    if field not in ['title', 'description', 'json_content', 'src']:
+    if field not in EDITABLE_FIELDS:
         return JsonResponse({'error': 'Invalid field'}, status=400)
     
     # Get the new value
     value = request.POST.get('value', '')
     
     # Save previous value for history
-    previous_value = getattr(element, field)
-    
-    # Update the element
-    setattr(element, field, value)
+    if field == 'json_content':
+        previous_value = element.json_text
+    else:
+        previous_value = getattr(element, field)
+    
+    # Update the element (the editor sends json_content as JSON text)
+    stored = value
+    if field == 'json_content':
+        stored = json_from_text(value)
+        try:
+            validate_json_content(stored)
+        except ValidationError as error:
+            return JsonResponse({'error': error.messages[0]}, status=400)
+    setattr(element, field, stored)
     element.save()
     
     # Record the edit history
@@ -298,6 +271,118 @@ def update_element(request, element_id):
     
     return JsonResponse({'success': True})
 
+def _parse_changes(body):
+    """The list of changes in a batch update body, or raise ValueError"""
+    try:
+        changes = json.loads(body).get('changes')
+    except (ValueError, AttributeError):
+        raise ValueError('Body must be a JSON object with a "changes" list')
+    if not isinstance(changes, list) or not changes:
+        raise ValueError('Body must be a JSON object with a "changes" list')
+    if len(changes) > settings.CMS_EDITOR_BATCH_MAX:
+        raise ValueError(f'At most {settings.CMS_EDITOR_BATCH_MAX} changes per request')
+    return changes
+
+def _change_error(change):
+    """Why one (element id, field, value) change can't be applied, or None"""
+    if not isinstance(change, dict) or not isinstance(change.get('id'), int):
+        return 'Each change needs an element id, a field and a value'
+    if change.get('field') not in EDITABLE_FIELDS:
+        return 'Invalid field'
+    value = change.get('value', '')
+    if not isinstance(value, str) and not (change['field'] == 'json_content' and isinstance(value, (dict, list))):
+        return 'Value must be a string'
+    return None
+
+@login_required
+def update_elements(request):
+    """
+    Apply many field changes in one request, in one transaction: a JSON body
+    {"changes": [{"id": element id, "field": ..., "value": ...}, ...]} in the
+    order they were made. Returns a result for each change; invalid ones are
+    skipped and the rest are saved.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method allowed'}, status=405)
+    if request.content_type != 'application/json':
+        return JsonResponse({'error': 'Expected an application/json body'}, status=415)
+    
+    try:
+        changes = _parse_changes(request.body)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    
+    results = [{'id': change.get('id') if isinstance(change, dict) else None} for change in changes]
+    for result, change in zip(results, changes):
+        error = _change_error(change)
+        if error:
+            result['error'] = error
+    
+    with transaction.atomic():
+        ids = {change['id'] for result, change in zip(results, changes) if 'error' not in result}
+        elements = Element.objects.select_related('section__page').in_bulk(ids)
+        
+        changed = {}
+        fields = set()
+        history = []
+        for result, change in zip(results, changes):
+            if 'error' in result:
+                continue
+            element = elements.get(change['id'])
+            if element is None:
+                result['error'] = 'Element not found'
+                continue
+            field, value = change['field'], change.get('value', '')
+            if field == 'json_content':
+                # JSON text from the editor, or the value itself
+                stored = json_from_text(value) if isinstance(value, str) else value
+                value = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+                try:
+                    validate_json_content(stored)
+                except ValidationError as error:
+                    result['error'] = error.messages[0]
+                    continue
+            else:
+                stored = value
+            
+            # Later changes to the same field see the earlier ones as their previous value
+            previous_value = element.json_text if field == 'json_content' else getattr(element, field)
+            setattr(element, field, stored)
+            changed[element.id] = element
+            fields.add(field)
+            history.append(EditHistory(
+                user=request.user,
+                element=element,
+                previous_value=previous_value,
+                new_value=value,
+                field_name=field,
+            ))
+            result['field'] = field
+            result['success'] = True
+        
+        if changed:
+            # bulk_update skips auto_now and the save signals
+            now = timezone.now()
+            for element in changed.values():
+                element.updated_at = now
+            Element.objects.bulk_update(changed.values(), [*sorted(fields), 'updated_at'])
+            EditHistory.objects.bulk_create(history)
+    
+    # What the post_save signal would do, but once per page instead of per change
+    if changed:
+        from .signals import invalidate_section, is_chrome_section
+        sections = {}
+        for element in changed.values():
+            key = 'chrome' if is_chrome_section(element.section) else element.section.page_id
+            sections.setdefault(key, element.section)
+        # Chrome invalidates every page anyway
+        for section in [sections['chrome']] if 'chrome' in sections else sections.values():
+            invalidate_section(section)
+    
+    for result in results:
+        result.setdefault('success', False)
+    return JsonResponse({'success': all(result['success'] for result in results), 'results': results})
+
 @login_required
 def get_element(request, element_id):
     """Get element data for editing"""
@@ -307,7 +392,7 @@ def get_element(request, element_id):
         'id': element.id,
         'title': element.title,
         'description': element.description,
-        'json_content': element.json_content,
+        'json_content': element.json_text,
         'src': element.src,
         'order': element.order
     })
@@ -323,21 +408,12 @@ def upload_image(request, element_id):
     # Handle file upload
     image = request.FILES['image']
     
-    # Create uploads directory if it doesn't exist
-    upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads')
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Save the file
-    filename = f"uploads/{image.name}"
-    filepath = os.path.join(settings.MEDIA_ROOT, filename)
-    
-    with open(filepath, 'wb+') as destination:
-        for chunk in image.chunks():
-            destination.write(chunk)
+    # Save the file under its content hash (identical uploads share one file)
+    media_file = store_upload(image, 'uploads', request.user)
     
     # Update the element's src field
     previous_src = element.src
-    element.src = f"/media/{filename}"
+    element.src = media_file.url
     element.save()
     
     # Record the edit history
@@ -349,7 +425,12 @@ def upload_image(request, element_id):
         field_name='src'
     )
     
-    return JsonResponse({'success': True, 'src': element.src})
+    # The original is served right away; AVIF/WebP copies are made by run_jobs
+    job = None
+    if media_file.path.endswith(SOURCE_EXTENSIONS):
+        job = jobs.status(jobs.enqueue('image_variants', {'path': media_file.path}, element=element))
+    
+    return JsonResponse({'success': True, 'src': element.src, 'job': job})
 
 @login_required
 @csrf_exempt
@@ -366,21 +447,129 @@ def upload_video(request, element_id):
     if not video.content_type.startswith('video/'):
         return JsonResponse({'error': 'File must be a video'}, status=400)
     
-    # Create uploads directory if it doesn't exist
-    upload_dir = os.path.join(settings.MEDIA_ROOT, 'videos')
-    os.makedirs(upload_dir, exist_ok=True)
+    # Save the file under its content hash (identical uploads share one file)
+    media_file = store_upload(video, 'videos', request.user)
+    
+    # Update the element's src field
+    previous_src = element.src
+    element.src = media_file.url
+    element.save()
     
-    # Save the file
-    filename = f"videos/{video.name}"
-    filepath = os.path.join(settings.MEDIA_ROOT, filename)
+    # Record the edit history
+    EditHistory.objects.create(
+        user=request.user,
+        element=element,
+        previous_value=previous_src,
+        new_value=element.src,
+        field_name='src'
+    )
+    
+    return JsonResponse({'success': True, 'src': element.src})
+
+@login_required
+def job_status(request, job_id):
+    """Progress of a background job, polled by the edit-mode JavaScript"""
+    job = get_object_or_404(Job, id=job_id)
+    return JsonResponse(jobs.status(job))
+
+# Chunked video uploads: start_upload, then upload_chunk for every chunk
+# (any order, retries allowed), then complete_upload. upload_status lists the
+# chunks received so far, so an interrupted upload only resends the rest.
+def _upload_status(upload):
+    return {
+        'upload_id': str(upload.id),
+        'chunk_size': upload.chunk_size,
+        'chunk_count': upload.chunk_count,
+        'received': received_chunks(upload),
+    }
+
+@login_required
+def start_upload(request, element_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method allowed'}, status=405)
+    
+    element = get_object_or_404(Element, id=element_id)
     
-    with open(filepath, 'wb+') as destination:
-        for chunk in video.chunks():
-            destination.write(chunk)
+    filename = request.POST.get('filename', '')
+    content_type = request.POST.get('content_type', '')
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    
+    # Validate video file
+    if not filename or not content_type.startswith('video/'):
+        return JsonResponse({'error': 'File must be a video'}, status=400)
+    if not 0 < size <= settings.CMS_VIDEO_MAX_SIZE:
+        return JsonResponse({'error': 'Video file is too large'}, status=400)
+    
+    # Forget uploads abandoned long ago
+    cutoff = timezone.now() - timedelta(seconds=settings.CMS_UPLOAD_EXPIRY)
+    for stale in ChunkedUpload.objects.filter(created_at__lt=cutoff):
+        discard_chunks(stale)
+        stale.delete()
+    
+    upload = ChunkedUpload.objects.create(
+        user=request.user,
+        element=element,
+        filename=filename[:255],
+        content_type=content_type[:100],
+        size=size,
+        chunk_size=settings.CMS_UPLOAD_CHUNK_SIZE,
+    )
+    return JsonResponse(_upload_status(upload), status=201)
+
+@login_required
+def upload_status(request, upload_id):
+    upload = get_object_or_404(ChunkedUpload, id=upload_id, user=request.user)
+    return JsonResponse(_upload_status(upload))
+
+@login_required
+def upload_chunk(request, upload_id, index):
+    """One chunk as the raw PUT body, with its SHA-256 in the X-Chunk-SHA256 header"""
+    if request.method != 'PUT':
+        return JsonResponse({'error': 'Only PUT method allowed'}, status=405)
+    
+    upload = get_object_or_404(ChunkedUpload, id=upload_id, user=request.user)
+    if index >= upload.chunk_count:
+        return JsonResponse({'error': 'No such chunk'}, status=400)
+    
+    length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if length != upload.expected_chunk_size(index):
+        return JsonResponse({'error': f'Chunk {index} must be {upload.expected_chunk_size(index)} bytes'}, status=400)
+    
+    # Streamed straight to disk; request.body would hold the chunk in memory
+    try:
+        write_chunk(upload, index, request, length, request.headers.get('X-Chunk-SHA256', ''))
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    
+    return JsonResponse({'success': True, 'index': index})
+
+@login_required
+def complete_upload(request, upload_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method allowed'}, status=405)
+    
+    upload = get_object_or_404(ChunkedUpload.objects.select_related('element'), id=upload_id, user=request.user)
+    missing = sorted(set(range(upload.chunk_count)) - set(received_chunks(upload)))
+    if missing:
+        return JsonResponse({'error': 'Upload is incomplete', 'missing': missing}, status=400)
+    
+    # Join the chunks into the content-addressed store, a block at a time.
+    # The whole file is checked before it is stored or recorded.
+    try:
+        media_file = store_chunks(read_chunks(upload), upload.filename, upload.content_type, 'videos',
+                                  request.user, expected_sha256=request.POST.get('sha256'))
+    except ValueError:
+        discard_chunks(upload)
+        upload.delete()
+        return JsonResponse({'error': 'File checksum does not match; please upload again'}, status=400)
     
     # Update the element's src field
+    element = upload.element
     previous_src = element.src
-    element.src = f"/media/{filename}"
+    element.src = media_file.url
     element.save()
     
     # Record the edit history
@@ -392,6 +581,8 @@ def upload_video(request, element_id):
         field_name='src'
     )
     
+    discard_chunks(upload)
+    upload.delete()
     return JsonResponse({'success': True, 'src': element.src})
 
 @login_required
@@ -15,16 +15,63 @@ document.addEventListener("DOMContentLoaded", () => {
 
   // Add edit mode toggle button
   addEditModeToggle()
-
-  // Add CSS for JSON editor if not already added
-  if (!document.querySelector('link[href="/static/admin/css/json-editor.css"]')) {
-    const link = document.createElement("link")
-    link.rel = "stylesheet"
-    link.href = "/static/admin/css/json-editor.css"
-    document.head.appendChild(link)
-  }
 })
 
+// Element field updates are queued for a moment and sent together to
+// /dashboard/elements/update/, so saving several fields (or the same field
+// again) costs one request. Each call resolves with its change's result,
+// {success: true} or {success: false, error}, and rejects if the request fails.
+const ELEMENT_UPDATE_DELAY = 50
+const pendingElementUpdates = new Map()
+let elementUpdateTimer = null
+
+function queueElementUpdate(elementId, fieldName, value) {
+  return new Promise((resolve, reject) => {
+    const key = `${elementId}:${fieldName}`
+    const pending = pendingElementUpdates.get(key)
+    // A newer value for a field replaces the queued one; both callers get the result
+    const callbacks = pending ? pending.callbacks : []
+    callbacks.push({ resolve, reject })
+    pendingElementUpdates.set(key, { id: Number(elementId), field: fieldName, value, callbacks })
+    if (!elementUpdateTimer) {
+      elementUpdateTimer = setTimeout(flushElementUpdates, ELEMENT_UPDATE_DELAY)
+    }
+  })
+}
+
+function flushElementUpdates(keepalive = false) {
+  clearTimeout(elementUpdateTimer)
+  elementUpdateTimer = null
+  if (!pendingElementUpdates.size) return Promise.resolve()
+
+  const batch = [...pendingElementUpdates.values()]
+  pendingElementUpdates.clear()
+  return fetch("/dashboard/elements/update/", {
+    method: "POST",
+    headers: { "Content-Type": "application/json", "X-CSRFToken": getCookie("csrftoken") },
+    body: JSON.stringify({ changes: batch.map(({ id, field, value }) => ({ id, field, value })) }),
+    keepalive,
+  })
+    .then((response) => {
+      if (!response.ok) {
+        throw new Error(`Server returned ${response.status}: ${response.statusText}`)
+      }
+      return response.json()
+    })
+    .then((data) => {
+      batch.forEach((change, index) => {
+        const result = data.results[index]
+        change.callbacks.forEach(({ resolve }) => resolve(result))
+      })
+    })
+    .catch((error) => {
+      batch.forEach((change) => change.callbacks.forEach(({ reject }) => reject(error)))
+    })
+}
+
+// Don't lose edits made just before leaving the page
+window.addEventListener("pagehide", () => flushElementUpdates(true))
+
 // Update the sendUpdate function to handle errors better and check if element exists
 function sendUpdate(elementId, fieldName, newValue, originalText, element) {
   // For JSON content, we need special handling to update only the specific part
@@ -65,20 +112,7 @@ function sendUpdate(elementId, fieldName, newValue, originalText, element) {
         }
 
         // Send the updated JSON to the server
-        const formData = new FormData()
-        formData.append("field", fieldName)
-        formData.append("value", JSON.stringify(jsonData))
-
-        fetch(`/dashboard/element/${elementId}/update/`, {
-          method: "POST",
-          body: formData,
-        })
-          .then((response) => {
-            if (!response.ok) {
-              throw new Error(`Server returned ${response.status}: ${response.statusText}`)
-            }
-            return response.json()
-          })
+        queueElementUpdate(elementId, fieldName, JSON.stringify(jsonData))
           .then((data) => {
             if (data.success) {
               // Update the element with new text if it's displayed
@@ -106,20 +140,7 @@ function sendUpdate(elementId, fieldName, newValue, originalText, element) {
       })
   } else {
     // Regular text update (non-JSON fields)
-    const formData = new FormData()
-    formData.append("field", fieldName)
-    formData.append("value", newValue)
-
-    fetch(`/dashboard/element/${elementId}/update/`, {
-      method: "POST",
-      body: formData,
-    })
-      .then((response) => {
-        if (!response.ok) {
-          throw new Error(`Server returned ${response.status}: ${response.statusText}`)
-        }
-        return response.json()
-      })
+    queueElementUpdate(elementId, fieldName, newValue)
       .then((data) => {
         if (data.success) {
           // Update the element with new text
@@ -209,6 +230,15 @@ function initEditableImages() {
                 img.style.cssText = originalStyles.cssText
 
                 showNotification("Image updated successfully")
+
+                // Smaller AVIF/WebP copies are made in the background
+                if (data.job) {
+                  pollJob(data.job).then((job) => {
+                    if (job.status === "failed") {
+                      showNotification("Optimized versions of the image could not be created", "error")
+                    }
+                  })
+                }
               } else {
                 showNotification("Error updating image", "error")
               }
@@ -544,27 +574,14 @@ async function saveJsonChanges(modal, elementId, jsonType) {
     }
 
     // Send update to server
-    const formData = new FormData();
-    formData.append("field", "json_content");
-    formData.append("value", JSON.stringify(jsonData));
-    
-    const response = await fetch(`/dashboard/element/${elementId}/update/`, {
-      method: "POST",
-      body: formData
-    });
-
-    if (!response.ok) {
-      throw new Error(`Server returned ${response.status}: ${response.statusText}`);
-    }
-
-    const data = await response.json();
+    const data = await queueElementUpdate(elementId, "json_content", JSON.stringify(jsonData));
 
     if (data.success) {
       showNotification("Content updated successfully");
       // Reload the page to reflect changes
       setTimeout(() => window.location.reload(), 1000);
     } else {
-      throw new Error("Server returned success: false");
+      throw new Error(data.error || "Server returned success: false");
     }
   } catch (error) {
     console.error("Error:", error);
@@ -2103,15 +2120,7 @@ function initEditableText() {
               }
 
               // Send the COMPLETE updated JSON to the server
-              const formData = new FormData()
-              formData.append("field", fieldName)
-              formData.append("value", JSON.stringify(jsonData))
-
-              fetch(`/dashboard/element/${elementId}/update/`, {
-                method: "POST",
-                body: formData,
-              })
-                .then((response) => response.json())
+              queueElementUpdate(elementId, fieldName, JSON.stringify(jsonData))
                 .then((data) => {
                   if (data.success) {
                     // Update the element with new text
@@ -2135,15 +2144,7 @@ function initEditableText() {
             })
         } else {
           // Regular text update
-          const formData = new FormData()
-          formData.append("field", fieldName)
-          formData.append("value", newText)
-
-          fetch(`/dashboard/element/${elementId}/update/`, {
-            method: "POST",
-            body: formData,
-          })
-            .then((response) => response.json())
+          queueElementUpdate(elementId, fieldName, newText)
             .then((data) => {
               if (data.success) {
                 // Update the element with new text
@@ -2307,15 +2308,7 @@ function initEditableHighlights() {
             }
 
             // Send the COMPLETE updated JSON to the server
-            const formData = new FormData()
-            formData.append("field", fieldName)
-            formData.append("value", JSON.stringify(jsonData))
-
-            fetch(`/dashboard/element/${elementId}/update/`, {
-              method: "POST",
-              body: formData,
-            })
-              .then((response) => response.json())
+            queueElementUpdate(elementId, fieldName, JSON.stringify(jsonData))
               .then((data) => {
                 if (data.success) {
                   // Update the element with new text
@@ -2419,36 +2412,17 @@ function initEditableLinks() {
         const newHref = urlInput.value
         const newText = textInput.value
 
-        // Update URL
-        const urlFormData = new FormData()
-        urlFormData.append("field", fieldName)
-        urlFormData.append("value", newHref)
-
-        fetch(`/dashboard/element/${elementId}/update/`, {
-          method: "POST",
-          body: urlFormData,
-        })
-          .then((response) => response.json())
-          .then((data) => {
-            if (data.success) {
-              element.setAttribute("href", newHref)
-
-              // Now update the text
-              const textFormData = new FormData()
-              textFormData.append("field", textField)
-              textFormData.append("value", newText)
-
-              return fetch(`/dashboard/element/${elementId}/update/`, {
-                method: "POST",
-                body: textFormData,
-              })
-            } else {
+        // Update URL and text (queued together, so one request)
+        Promise.all([
+          queueElementUpdate(elementId, fieldName, newHref),
+          queueElementUpdate(elementId, textField, newText),
+        ])
+          .then(([urlResult, textResult]) => {
+            if (!urlResult.success) {
               throw new Error("Failed to update URL")
             }
-          })
-          .then((response) => response.json())
-          .then((data) => {
-            if (data.success) {
+            element.setAttribute("href", newHref)
+            if (textResult.success) {
               element.innerText = newText
               showNotification("Link updated successfully")
             } else {
@@ -2500,6 +2474,30 @@ function addEditModeToggle() {
   })
 }
 
+// Poll a background job's status URL until it is done or failed, backing
+// off from 1 to 5 seconds. Resolves with the last status seen.
+function pollJob(job, timeout = 120000) {
+  const started = Date.now()
+  let delay = 1000
+
+  return new Promise((resolve) => {
+    const check = () => {
+      fetch(job.status_url)
+        .then((response) => response.json())
+        .then((status) => {
+          if (status.status === "done" || status.status === "failed" || Date.now() - started > timeout) {
+            resolve(status)
+          } else {
+            delay = Math.min(delay * 1.5, 5000)
+            setTimeout(check, delay)
+          }
+        })
+        .catch(() => resolve(job))
+    }
+    setTimeout(check, delay)
+  })
+}
+
 function showNotification(message, type = "success") {
   const notification = document.createElement("div")
   notification.classList.add("edit-notification", `edit-notification-${type}`)
@@ -2647,15 +2645,7 @@ function initLogoEditor() {
         }
 
         // Send update to server
-        const formData = new FormData()
-        formData.append("field", fieldName)
-        formData.append("value", formattedText)
-
-        fetch(`/dashboard/element/${elementId}/update/`, {
-          method: "POST",
-          body: formData,
-        })
-          .then((response) => response.json())
+        queueElementUpdate(elementId, fieldName, formattedText)
           .then((data) => {
             if (data.success) {
               element.innerHTML = formattedText
@@ -2812,10 +2802,10 @@ async function uploadVideo(event, elementId) {
         return;
     }
     
-    // Check file size (limit to 100MB for example)
-    const maxSize = 100 * 1024 * 1024; // 100MB
+    // Check file size (CMS_VIDEO_MAX_SIZE on the server)
+    const maxSize = 2 * 1024 * 1024 * 1024; // 2GB
     if (file.size > maxSize) {
-        showNotification('Video file is too large (max 100MB)', 'error');
+        showNotification('Video file is too large (max 2GB)', 'error');
         return;
     }
     
@@ -2838,86 +2828,259 @@ async function uploadVideo(event, elementId) {
     videoContainer.appendChild(progressContainer);
     videoContainer.appendChild(statusText);
     
+    const removeProgress = () => {
+        progressContainer.remove();
+        statusText.remove();
+    };
+    
+    const showProgress = (progress) => {
+        progressBar.style.width = `${progress}%`;
+        statusText.textContent = `Uploading: ${progress}%`;
+    };
+    
+    const updateVideo = (src) => {
+        const video = videoContainer.querySelector('video');
+        const source = video.querySelector('source');
+        
+        if (source) {
+            source.src = src;
+        } else {
+            const newSource = document.createElement('source');
+            newSource.src = src;
+            newSource.type = 'video/mp4';
+            video.appendChild(newSource);
+        }
+        
+        // Reload the video
+        video.load();
+        removeProgress();
+        showNotification('Video uploaded successfully');
+    };
+    
     try {
-        // Create form data
+        // Chunk checksums need crypto.subtle, which browsers only offer over HTTPS or on localhost
+        const response = window.crypto && window.crypto.subtle
+            ? await uploadVideoInChunks(file, elementId, showProgress)
+            : await uploadVideoInOneRequest(file, elementId, showProgress);
+        
+        if (response.success) {
+            statusText.textContent = 'Processing video...';
+            updateVideo(response.src);
+        } else {
+            showNotification(response.error || 'Error uploading video', 'error');
+            removeProgress();
+        }
+    } catch (error) {
+        console.error('Upload error:', error);
+        showNotification(error.message || 'Error uploading video', 'error');
+        removeProgress();
+    }
+}
+
+// Incremental SHA-256 for the whole-file checksum sent when an upload is
+// completed: crypto.subtle.digest only hashes one complete buffer, and a
+// video needn't fit in memory at once
+const SHA256_K = new Uint32Array([
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+]);
+
+class Sha256 {
+    constructor() {
+        this.state = new Uint32Array([
+            0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19,
+        ]);
+        this.words = new Uint32Array(64);
+        this.pending = new Uint8Array(64);
+        this.pendingLength = 0;
+        this.length = 0;
+    }
+    
+    update(bytes) {
+        this.length += bytes.length;
+        let offset = 0;
+        if (this.pendingLength) {
+            offset = Math.min(64 - this.pendingLength, bytes.length);
+            this.pending.set(bytes.subarray(0, offset), this.pendingLength);
+            this.pendingLength += offset;
+            if (this.pendingLength < 64) return;
+            this.block(this.pending, 0);
+            this.pendingLength = 0;
+        }
+        for (; offset + 64 <= bytes.length; offset += 64) {
+            this.block(bytes, offset);
+        }
+        this.pending.set(bytes.subarray(offset));
+        this.pendingLength = bytes.length - offset;
+    }
+    
+    block(bytes, offset) {
+        const w = this.words;
+        for (let i = 0; i < 16; i++) {
+            const j = offset + i * 4;
+            w[i] = (bytes[j] << 24) | (bytes[j + 1] << 16) | (bytes[j + 2] << 8) | bytes[j + 3];
+        }
+        for (let i = 16; i < 64; i++) {
+            const x = w[i - 15];
+            const y = w[i - 2];
+            const s0 = ((x >>> 7) | (x << 25)) ^ ((x >>> 18) | (x << 14)) ^ (x >>> 3);
+            const s1 = ((y >>> 17) | (y << 15)) ^ ((y >>> 19) | (y << 13)) ^ (y >>> 10);
+            w[i] = w[i - 16] + s0 + w[i - 7] + s1;
+        }
+        let [a, b, c, d, e, f, g, h] = this.state;
+        for (let i = 0; i < 64; i++) {
+            const S1 = ((e >>> 6) | (e << 26)) ^ ((e >>> 11) | (e << 21)) ^ ((e >>> 25) | (e << 7));
+            const t1 = (h + S1 + ((e & f) ^ (~e & g)) + SHA256_K[i] + w[i]) | 0;
+            const S0 = ((a >>> 2) | (a << 30)) ^ ((a >>> 13) | (a << 19)) ^ ((a >>> 22) | (a << 10));
+            const t2 = (S0 + ((a & b) ^ (a & c) ^ (b & c))) | 0;
+            h = g;
+            g = f;
+            f = e;
+            e = (d + t1) | 0;
+            d = c;
+            c = b;
+            b = a;
+            a = (t1 + t2) | 0;
+        }
+        const state = this.state;
+        state[0] += a;
+        state[1] += b;
+        state[2] += c;
+        state[3] += d;
+        state[4] += e;
+        state[5] += f;
+        state[6] += g;
+        state[7] += h;
+    }
+    
+    hexdigest() {
+        // Padding: 0x80, zeros, then the length in bits as a 64-bit big-endian number
+        const bits = this.length * 8;
+        const padding = new Uint8Array((this.pendingLength < 56 ? 64 : 128) - this.pendingLength);
+        padding[0] = 0x80;
+        const view = new DataView(padding.buffer);
+        view.setUint32(padding.length - 8, Math.floor(bits / 0x100000000));
+        view.setUint32(padding.length - 4, bits >>> 0);
+        this.update(padding);
+        return Array.from(this.state, (word) => word.toString(16).padStart(8, '0')).join('');
+    }
+}
+
+// Resumable upload: start (or resume) an upload, PUT each missing chunk with
+// its SHA-256, then complete it with the whole file's SHA-256, which the
+// server checks before storing anything. The upload id is kept in localStorage, so
+// picking the same file again after a dropped connection only sends the
+// chunks the server doesn't have yet.
+async function uploadVideoInChunks(file, elementId, onProgress) {
+    const resumeKey = `video-upload:${elementId}:${file.name}:${file.size}:${file.lastModified}`;
+    let upload = null;
+    
+    const savedId = localStorage.getItem(resumeKey);
+    if (savedId) {
+        const response = await fetch(`/dashboard/uploads/${savedId}/`);
+        if (response.ok) {
+            upload = await response.json();
+        }
+    }
+    
+    if (!upload) {
+        const formData = new FormData();
+        formData.append('filename', file.name);
+        formData.append('size', file.size);
+        formData.append('content_type', file.type);
+        
+        const response = await fetch(`/dashboard/element/${elementId}/video-upload/`, {
+            method: 'POST',
+            headers: { 'X-CSRFToken': getCookie('csrftoken') },
+            body: formData,
+        });
+        upload = await response.json();
+        if (!response.ok) {
+            throw new Error(upload.error || 'Error starting the upload');
+        }
+        localStorage.setItem(resumeKey, upload.upload_id);
+    }
+    
+    const received = new Set(upload.received);
+    let done = received.size;
+    onProgress(Math.round((done / upload.chunk_count) * 100));
+    
+    // Chunks the server already has are read too, for the whole-file checksum
+    const fileHash = new Sha256();
+    for (let index = 0; index < upload.chunk_count; index++) {
+        const chunk = file.slice(index * upload.chunk_size, (index + 1) * upload.chunk_size);
+        const buffer = await chunk.arrayBuffer();
+        fileHash.update(new Uint8Array(buffer));
+        if (received.has(index)) continue;
+        
+        const digest = await crypto.subtle.digest('SHA-256', buffer);
+        const sha256 = Array.from(new Uint8Array(digest), (byte) => byte.toString(16).padStart(2, '0')).join('');
+        
+        // Retry a failed chunk (network error or bad checksum) a few times,
+        // waiting a little longer each time
+        for (let attempt = 1; ; attempt++) {
+            const response = await fetch(`/dashboard/uploads/${upload.upload_id}/chunks/${index}/`, {
+                method: 'PUT',
+                headers: { 'X-Chunk-SHA256': sha256, 'X-CSRFToken': getCookie('csrftoken') },
+                body: buffer,
+            }).catch(() => null);
+            if (response && response.ok) break;
+            if (attempt >= 3) throw new Error(`Chunk ${index + 1} could not be uploaded; try again to resume`);
+            await new Promise((resolve) => setTimeout(resolve, 1000 * attempt));
+        }
+        
+        done++;
+        onProgress(Math.round((done / upload.chunk_count) * 100));
+    }
+    
+    const completeData = new FormData();
+    completeData.append('sha256', fileHash.hexdigest());
+    const response = await fetch(`/dashboard/uploads/${upload.upload_id}/complete/`, {
+        method: 'POST',
+        headers: { 'X-CSRFToken': getCookie('csrftoken') },
+        body: completeData,
+    });
+    if (response.ok) {
+        localStorage.removeItem(resumeKey);
+    }
+    return response.json();
+}
+
+// The original single-request upload, for browsers without crypto.subtle
+function uploadVideoInOneRequest(file, elementId, onProgress) {
+    return new Promise((resolve, reject) => {
         const formData = new FormData();
         formData.append('video', file);
         
-        // Upload video with progress tracking
         const xhr = new XMLHttpRequest();
         xhr.open('POST', `/dashboard/element/${elementId}/upload_video/`, true);
         
         // Track upload progress
         xhr.upload.addEventListener('progress', (e) => {
             if (e.lengthComputable) {
-                const progress = Math.round((e.loaded / e.total) * 100);
-                progressBar.style.width = `${progress}%`;
-                statusText.textContent = `Uploading: ${progress}%`;
+                onProgress(Math.round((e.loaded / e.total) * 100));
             }
         });
         
-        // Handle response
         xhr.onload = function() {
             if (xhr.status >= 200 && xhr.status < 300) {
-                const response = JSON.parse(xhr.responseText);
-                
-                if (response.success) {
-                    statusText.textContent = 'Processing video...';
-                    
-                    // Update video source
-                    setTimeout(() => {
-                        const video = videoContainer.querySelector('video');
-                        const source = video.querySelector('source');
-                        
-                        // Clear video src cache by appending timestamp
-                        const newSrc = `${response.src}?t=${new Date().getTime()}`;
-                        
-                        if (source) {
-                            source.src = newSrc;
-                        } else {
-                            const newSource = document.createElement('source');
-                            newSource.src = newSrc;
-                            newSource.type = 'video/mp4';
-                            video.appendChild(newSource);
-                        }
-                        
-                        // Reload the video
-                        video.load();
-                        
-                        // Remove progress elements
-                        videoContainer.removeChild(progressContainer);
-                        videoContainer.removeChild(statusText);
-                        
-                        showNotification('Video uploaded successfully');
-                    }, 1000);
-                } else {
-                    showNotification(response.error || 'Error uploading video', 'error');
-                    videoContainer.removeChild(progressContainer);
-                    videoContainer.removeChild(statusText);
-                }
+                resolve(JSON.parse(xhr.responseText));
             } else {
-                showNotification('Error uploading video', 'error');
-                videoContainer.removeChild(progressContainer);
-                videoContainer.removeChild(statusText);
+                reject(new Error('Error uploading video'));
             }
         };
-        
-        // Handle error
         xhr.onerror = function() {
-            showNotification('Network error while uploading video', 'error');
-            videoContainer.removeChild(progressContainer);
-            videoContainer.removeChild(statusText);
+            reject(new Error('Network error while uploading video'));
         };
         
-        // Start upload
         xhr.send(formData);
-        
-    } catch (error) {
-        console.error('Upload error:', error);
-        showNotification('Error uploading video', 'error');
-        videoContainer.removeChild(progressContainer);
-        videoContainer.removeChild(statusText);
-    }
+    });
 }
 
 // Create the comprehensive trip highlights editor
@@ -0,0 +1,165 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const editBtn = document.getElementById('navbar-edit-btn');
+    const jsonEditor = document.getElementById('navbar-json-editor');
+    const navbarNavigation = document.getElementById('navbar-navigation');
+    const navbar = document.querySelector('.navbar');
+
+    if (editBtn && jsonEditor && navbarNavigation) {
+        editBtn.addEventListener('click', function() {
+            const isEditingActive = this.classList.contains('active');
+
+            if (isEditingActive) {
+                // Deactivate editing
+                this.classList.remove('active');
+                this.innerHTML = '<i class="fas fa-edit"></i> Edit Navbar';
+                jsonEditor.style.display = 'none';
+                navbarNavigation.style.display = 'flex';
+                navbar.classList.remove('navbar-editing-active');
+
+                // Reload the page to see the changes
+                if (jsonEditor.dataset.hasChanges === 'true') {
+                    location.reload();
+                }
+            } else {
+                // Activate editing
+                this.classList.add('active');
+                this.innerHTML = '<i class="fas fa-times"></i> Close Editor';
+
+                // Initialize the JSON editor
+                initJsonEditor(jsonEditor, navbarNavigation);
+
+                // Show the editor, hide the navigation
+                jsonEditor.style.display = 'block';
+                navbarNavigation.style.display = 'none';
+                navbar.classList.add('navbar-editing-active');
+            }
+        });
+    }
+
+    // Function to initialize the JSON editor
+    function initJsonEditor(editorContainer, navigationContainer) {
+        const elementId = editorContainer.dataset.elementId;
+
+        // Get the element's current JSON content
+        fetch(`/dashboard/element/${elementId}/get/`)
+            .then(response => response.json())
+            .then(data => {
+                let navItems;
+                try {
+                    navItems = JSON.parse(data.json_content);
+                } catch (e) {
+                    navItems = [];
+                }
+
+                // Create the editor interface
+                let editorHtml = `
+                    <div class="json-editor-header">
+                        <h4>Navigation Items</h4>
+                        <p>Edit your navigation menu items below.</p>
+                    </div>
+                    <div class="json-editor-items">
+                `;
+
+                navItems.forEach((item, index) => {
+                    editorHtml += `
+                        <div class="json-editor-item" data-index="${index}">
+                            <div class="form-group">
+                                <label>Menu Text</label>
+                                <input type="text" class="form-control nav-item-title" value="${item.title || ''}" placeholder="Menu Text">
+                            </div>
+                            <div class="form-group">
+                                <label>Link URL</label>
+                                <input type="text" class="form-control nav-item-url" value="${item.src || ''}" placeholder="Link URL">
+                            </div>
+                            <button type="button" class="remove-nav-item"><i class="fas fa-trash"></i></button>
+                        </div>
+                    `;
+                });
+
+                editorHtml += `
+                    </div>
+                    <div class="json-editor-actions">
+                        <button type="button" id="add-nav-item"><i class="fas fa-plus"></i> Add Item</button>
+                        <button type="button" id="save-nav-items"><i class="fas fa-save"></i> Save Changes</button>
+                    </div>
+                `;
+
+                // Set the HTML content
+                editorContainer.innerHTML = editorHtml;
+
+                // Add event listeners
+
+                // Add new item
+                document.getElementById('add-nav-item').addEventListener('click', function() {
+                    const itemsContainer = document.querySelector('.json-editor-items');
+                    const itemCount = itemsContainer.querySelectorAll('.json-editor-item').length;
+
+                    const newItem = document.createElement('div');
+                    newItem.className = 'json-editor-item';
+                    newItem.dataset.index = itemCount;
+                    newItem.innerHTML = `
+                        <div class="form-group">
+                            <label>Menu Text</label>
+                            <input type="text" class="form-control nav-item-title" value="" placeholder="Menu Text">
+                        </div>
+                        <div class="form-group">
+                            <label>Link URL</label>
+                            <input type="text" class="form-control nav-item-url" value="" placeholder="Link URL">
+                        </div>
+                        <button type="button" class="remove-nav-item"><i class="fas fa-trash"></i></button>
+                    `;
+
+                    itemsContainer.appendChild(newItem);
+
+                    // Add event listener to the new remove button
+                    newItem.querySelector('.remove-nav-item').addEventListener('click', function() {
+                        itemsContainer.removeChild(newItem);
+                    });
+                });
+
+                // Remove item buttons
+                document.querySelectorAll('.remove-nav-item').forEach(btn => {
+                    btn.addEventListener('click', function() {
+                        const item = this.closest('.json-editor-item');
+                        item.parentNode.removeChild(item);
+                    });
+                });
+
+                // Save changes
+                document.getElementById('save-nav-items').addEventListener('click', function() {
+                    const items = [];
+
+                    document.querySelectorAll('.json-editor-item').forEach(item => {
+                        const title = item.querySelector('.nav-item-title').value;
+                        const url = item.querySelector('.nav-item-url').value;
+
+                        if (title && url) {
+                            items.push({
+                                title: title,
+                                src: url
+                            });
+                        }
+                    });
+
+                    // Save the updated JSON
+                    queueElementUpdate(elementId, 'json_content', JSON.stringify(items))
+                    .then(data => {
+                        if (data.success) {
+                            showNotification('Navigation menu updated successfully');
+                            editorContainer.dataset.hasChanges = 'true';
+                        } else {
+                            showNotification('Error updating navigation menu', 'error');
+                        }
+                    })
+                    .catch(error => {
+                        console.error('Error:', error);
+                        showNotification('Error updating navigation menu', 'error');
+                    });
+                });
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                editorContainer.innerHTML = '<p class="text-danger">Error loading navigation data</p>';
+            });
+    }
+});
@@ -0,0 +1,381 @@
+// Function to handle element editing
+function editElement(type, elementId, field = '') {
+    if (type === 'image') {
+        // Open image upload modal
+        openImageUploadModal(elementId);
+    } else if (type === 'text') {
+        // Open text edit modal
+        openTextEditModal(elementId, field);
+    }
+}
+
+// These functions should be defined in edit-mode.js
+// If they're not, we can add them here as placeholders
+function openImageUploadModal(elementId) {
+    if (typeof window.openImageEditor === 'function') {
+        window.openImageEditor(elementId);
+    } else {
+        console.log('Opening image upload for element ID:', elementId);
+        // Fallback implementation if the function doesn't exist
+        const fileInput = document.createElement('input');
+        fileInput.type = 'file';
+        fileInput.accept = 'image/*';
+        fileInput.onchange = function(e) {
+            const file = e.target.files[0];
+            if (file) {
+                const formData = new FormData();
+                formData.append('image', file);
+
+                fetch(`/dashboard/element/${elementId}/upload-image/`, {
+                    method: 'POST',
+                    body: formData,
+                    headers: {
+                        'X-CSRFToken': getCookie('csrftoken')
+                    }
+                })
+                .then(response => response.json())
+                .then(data => {
+                    if (data.success) {
+                        showNotification('Image updated successfully', 'success');
+                        setTimeout(() => {
+                            window.location.reload();
+                        }, 1000);
+                    } else {
+                        showNotification('Error updating image', 'error');
+                    }
+                })
+                .catch(error => {
+                    console.error('Error:', error);
+                    showNotification('Error updating image', 'error');
+                });
+            }
+        };
+        fileInput.click();
+    }
+}
+
+function openTextEditModal(elementId, field) {
+    if (typeof window.openTextEditor === 'function') {
+        window.openTextEditor(elementId, field);
+    } else {
+        console.log('Opening text editor for element ID:', elementId, 'field:', field);
+
+        // Fetch current content
+        fetch(`/dashboard/element/${elementId}/get/`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`Server returned ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            // Extract the correct content based on the field
+            let content = '';
+            if (field === 'title') {
+                content = data.title || '';
+            } else if (field === 'description') {
+                content = data.description || '';
+            }
+
+            // Create modal for editing
+            const modal = document.createElement('div');
+            modal.className = 'edit-modal';
+            modal.innerHTML = `
+                <div class="edit-modal-content">
+                    <h3>Edit ${field === 'title' ? 'Title' : 'Description'}</h3>
+                    ${field === 'description' ? 
+                        `<textarea class="form-control" style="min-height:150px; color:#333;">${content}</textarea>` : 
+                        `<input type="text" class="form-control" value="${content}" style="color:#333;">`
+                    }
+                    <div class="button-group">
+                        <button class="edit-save-btn">Save</button>
+                        <button class="edit-cancel-btn">Cancel</button>
+                    </div>
+                </div>
+            `;
+
+            document.body.appendChild(modal);
+
+            // Focus the input/textarea
+            const input = field === 'description' ? 
+                modal.querySelector('textarea') : 
+                modal.querySelector('input');
+            input.focus();
+
+            // Cancel button handler
+            modal.querySelector('.edit-cancel-btn').addEventListener('click', () => {
+                document.body.removeChild(modal);
+            });
+
+            // Save button handler
+            modal.querySelector('.edit-save-btn').addEventListener('click', () => {
+                const newContent = input.value;
+
+                queueElementUpdate(elementId, field, newContent)
+                .then(data => {
+                    if (data.success) {
+                        showNotification('Content updated successfully', 'success');
+
+                        // Update the displayed value in the edit controls
+                        const detailElement = document.querySelector(`.edit-item[data-element-id="${elementId}"] .edit-item-detail:nth-child(${field === 'title' ? '1' : '2'})`);
+                        if (detailElement) {
+                            const spanElement = detailElement.querySelector('span');
+                            detailElement.innerHTML = '';
+                            detailElement.appendChild(spanElement);
+                            detailElement.innerHTML += newContent.length > 0 ? newContent : '<em>Empty - Click to add</em>';
+                        }
+
+                        setTimeout(() => {
+                            window.location.reload();
+                        }, 1000);
+                    } else {
+                        showNotification(data.message || 'Error updating content', 'error');
+                    }
+                })
+                .catch(error => {
+                    console.error('Error:', error);
+                    showNotification('Error updating content: ' + error.message, 'error');
+                })
+                .finally(() => {
+                    document.body.removeChild(modal);
+                });
+            });
+        })
+        .catch(error => {
+            console.error('Error fetching element data:', error);
+            showNotification('Error fetching content: ' + error.message, 'error');
+        });
+    }
+}
+
+function showNotification(message, type) {
+    // Create notification element
+    const notification = document.createElement('div');
+    notification.className = `edit-notification edit-notification-${type}`;
+    notification.textContent = message;
+
+    // Add to document
+    document.body.appendChild(notification);
+
+    // Remove after delay
+    setTimeout(() => {
+        notification.classList.add('fade-out');
+        setTimeout(() => {
+            document.body.removeChild(notification);
+        }, 500);
+    }, 3000);
+}
+
+function getCookie(name) {
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
+
+// Function to create a new slide
+function createNewSlide(pageId) {
+    // Show confirmation dialog
+    if (!confirm("Create a new slide?")) {
+        return;
+    }
+
+    // Create FormData for the request
+    const formData = new FormData();
+    formData.append('action', 'add_element');
+    formData.append('title', '');
+    formData.append('description', '');
+    formData.append('src', '/static/images/default.jpg');
+    formData.append('order', '0');
+
+    // Use the gallery section ID defined at the bottom of the file
+    const sectionId = GALLERY_SECTION_ID;
+
+    if (!sectionId) {
+        showNotification('Error: Could not find the gallery section', 'error');
+        return;
+    }
+
+    // Send request to create a new element
+    fetch(`/dashboard/section/${sectionId}/edit/`, {
+        method: 'POST',
+        body: formData,
+        headers: {
+            'X-CSRFToken': getCookie('csrftoken')
+        }
+    })
+    .then(response => {
+        if (!response.ok) {
+            throw new Error('Network response was not ok');
+        }
+        // Instead of parsing JSON, we're expecting a redirect
+        showNotification('Slide created successfully!');
+        // Reload the page after a short delay
+        setTimeout(() => {
+            window.location.reload();
+        }, 1000);
+    })
+    .catch(error => {
+        console.error('Error creating slide:', error);
+        showNotification('Error creating slide: ' + error.message, 'error');
+    });
+}
+
+// Function to delete a slide
+function deleteSlide(elementId) {
+    // Show confirmation dialog
+    if (!confirm("Are you sure you want to delete this slide? This action cannot be undone.")) {
+        return;
+    }
+
+    // Check if we have a CSRF token
+    const csrftoken = getCookie('csrftoken');
+    if (!csrftoken) {
+        showNotification('Error: CSRF token not found', 'error');
+        return;
+    }
+
+    // Create FormData for the request
+    const formData = new FormData();
+    formData.append('action', 'delete_element');
+
+    // Send request to delete the element
+    fetch(`/dashboard/element/${elementId}/delete/`, {
+        method: 'POST',
+        body: formData,
+        headers: {
+            'X-CSRFToken': csrftoken
+        }
+    })
+    .then(response => {
+        if (!response.ok) {
+            throw new Error(`Server returned ${response.status}: ${response.statusText}`);
+        }
+        return response.json();
+    })
+    .then(data => {
+        if (data.success) {
+            showNotification('Slide deleted successfully!');
+
+            // Remove the slide from the DOM
+            const slideElement = document.querySelector(`.edit-item[data-element-id="${elementId}"]`);
+            if (slideElement) {
+                slideElement.remove();
+            }
+
+            // Reload the page after a short delay
+            setTimeout(() => {
+                window.location.reload();
+            }, 1000);
+        } else {
+            throw new Error(data.message || 'Unknown error');
+        }
+    })
+    .catch(error => {
+        console.error('Error deleting slide:', error);
+        showNotification('Error deleting slide: ' + error.message, 'error');
+    });
+}
+
+// Enhance the existing openTextEditModal function to handle empty values
+function openTextEditModal(elementId, field) {
+    if (typeof window.openTextEditor === 'function') {
+        window.openTextEditor(elementId, field);
+    } else {
+        console.log('Opening text editor for element ID:', elementId, 'field:', field);
+
+        // Fetch current content
+        fetch(`/dashboard/element/${elementId}/get/`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`Server returned ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            // Extract the correct content based on the field
+            let content = '';
+            if (field === 'title') {
+                content = data.title || '';
+            } else if (field === 'description') {
+                content = data.description || '';
+            }
+
+            // Create modal for editing
+            const modal = document.createElement('div');
+            modal.className = 'edit-modal';
+            modal.innerHTML = `
+                <div class="edit-modal-content">
+                    <h3>Edit ${field === 'title' ? 'Title' : 'Description'}</h3>
+                    ${field === 'description' ? 
+                        `<textarea class="form-control" style="min-height:150px; color:#333;">${content}</textarea>` : 
+                        `<input type="text" class="form-control" value="${content}" style="color:#333;">`
+                    }
+                    <div class="button-group">
+                        <button class="edit-save-btn">Save</button>
+                        <button class="edit-cancel-btn">Cancel</button>
+                    </div>
+                </div>
+            `;
+
+            document.body.appendChild(modal);
+
+            // Focus the input/textarea
+            const input = field === 'description' ? 
+                modal.querySelector('textarea') : 
+                modal.querySelector('input');
+            input.focus();
+
+            // Cancel button handler
+            modal.querySelector('.edit-cancel-btn').addEventListener('click', () => {
+                document.body.removeChild(modal);
+            });
+
+            // Save button handler
+            modal.querySelector('.edit-save-btn').addEventListener('click', () => {
+                const newContent = input.value;
+
+                queueElementUpdate(elementId, field, newContent)
+                .then(data => {
+                    if (data.success) {
+                        showNotification('Content updated successfully', 'success');
+
+                        // Update the displayed value in the edit controls
+                        const detailElement = document.querySelector(`.edit-item[data-element-id="${elementId}"] .edit-item-detail:nth-child(${field === 'title' ? '1' : '2'})`);
+                        if (detailElement) {
+                            const spanElement = detailElement.querySelector('span');
+                            detailElement.innerHTML = '';
+                            detailElement.appendChild(spanElement);
+                            detailElement.innerHTML += newContent.length > 0 ? newContent : '<em>Empty - Click to add</em>';
+                        }
+
+                        setTimeout(() => {
+                            window.location.reload();
+                        }, 1000);
+                    } else {
+                        showNotification(data.message || 'Error updating content', 'error');
+                    }
+                })
+                .catch(error => {
+                    console.error('Error:', error);
+                    showNotification('Error updating content: ' + error.message, 'error');
+                })
+                .finally(() => {
+                    document.body.removeChild(modal);
+                });
+            });
+        })
+        .catch(error => {
+            console.error('Error fetching element data:', error);
+            showNotification('Error fetching content: ' + error.message, 'error');
+        });
+    }
+}
@@ -32,11 +32,13 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'cms.middleware.CompressionMiddleware',  # gzip/brotli for HTML and JSON
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'cms.middleware.PerformanceMiddleware',  # Server-Timing and query budgets
     'cms.middleware.EditModeMiddleware',  # Our custom middleware
 ]
 
@@ -59,6 +61,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'website_cms.wsgi.application'
+ASGI_APPLICATION = 'website_cms.asgi.application'
 
 # Database
 DATABASES = {
@@ -75,6 +78,49 @@ DATABASES = {
     }
 }
 
+# Cache
+# Local memory is per process; use FileBasedCache or memcached when running
+# several workers so page cache invalidation reaches all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'website-cms',
+    }
+}
+
+# Full-page cache for public pages, in seconds (0 disables it)
+CMS_PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Cached navbar and footer fragments, in seconds (0 disables them)
+CMS_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Response compression (CompressionMiddleware) for these content types, from
+# CMS_COMPRESSION_MIN_SIZE bytes; smaller bodies gain little. Levels trade CPU
+# for bytes (benchmarks/compression.py): gzip 1-9, brotli 0-11 (brotli needs
+# the brotli package). Cached pages are compressed once, when stored. Leave a
+# coding out of CMS_COMPRESSION_LEVELS to disable it.
+CMS_COMPRESSION_LEVELS = {'br': 5, 'gzip': 6}
+CMS_COMPRESSION_MIN_SIZE = 1024
+CMS_COMPRESSION_TYPES = ['text/html', 'application/json']
+
+# Per-request timings (SQL, template render, cms_tags) in a Server-Timing header
+CMS_SERVER_TIMING = DEBUG
+
+# Log one JSON line per request to the 'cms.performance' logger
+CMS_PERFORMANCE_LOG = False
+
+# Most queries each view may run before a warning is logged, by URL name.
+# With CMS_QUERY_BUDGET_STRICT the request fails instead (use it in tests).
+CMS_QUERY_BUDGETS = {
+    'home': 4,
+    'page_detail': 4,
+    'theme_page': 4,
+    'dashboard': 4,
+    'edit_page': 4,
+    'edit_section': 4,
+}
+CMS_QUERY_BUDGET_STRICT = False
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -104,10 +150,82 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# CSS and JavaScript bundles, built with `python manage.py build_assets` into
+# CMS_ASSET_BUILD_DIR/bundles (inside STATICFILES_DIRS, so collectstatic picks
+# them up) and loaded with {% asset_bundle 'site.css' %}. Until a bundle is
+# built the tag loads its source files one by one.
+CMS_ASSET_BUILD_DIR = os.path.join(BASE_DIR, 'static')
+CMS_ASSET_BUNDLES = {
+    'site.css': ['font/fonts.css', 'css/normalize.css', 'css/utility.css', 'css/style.css',
+                 'css/responsive.css', 'css/navbar-mobile.css'],
+    'theme.css': ['font/fonts.css', 'css/normalize.css', 'css/utility.css', 'css/theme.css',
+                  'css/slider.css', 'css/form.css', 'css/responsive.css', 'css/navbar-mobile.css'],
+    'site.js': ['js/script.js'],
+    'theme.js': ['js/script.js', 'js/slider.js'],
+    # Only sent to editors (edit mode on), deferred
+    'editor.css': ['admin/css/dashboard.css', 'admin/css/json-editor.css', 'admin/css/navbar-editor.css'],
+    'theme-editor.css': ['admin/css/dashboard.css', 'admin/css/theme-editor.css', 'admin/css/json-editor.css',
+                         'admin/css/navbar-editor.css'],
+    'editor.js': ['admin/js/navbar-editor.js', 'admin/js/edit-mode.js'],
+    'theme-editor.js': ['admin/js/navbar-editor.js', 'admin/js/edit-mode.js', 'admin/js/theme-editor.js'],
+    'dashboard.css': ['admin/css/dashboard.css'],
+}
+
+# Icons: `python manage.py build_icon_font` writes a Font Awesome subset with
+# only the icons in use to CMS_ASSET_BUILD_DIR/icons, from a Font Awesome 5
+# Free download (CMS_ICON_FONT_SOURCE, or the fontawesomefree package).
+# {% icon_stylesheet %} loads it, or the CDN stylesheet below until it's built.
+CMS_ICON_FONT_SOURCE = None
+CMS_ICON_FALLBACK_STYLESHEET = {
+    'href': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.3/css/all.min.css',
+    'integrity': 'sha512-iBBXm8fW90+nuLcSKlbmrPcLa0OT92xO1BIsZ+ywDWZCvqsWgccV3gFoRBv0z+8dLJgyAHIhR35VZc2oM/gI1w==',
+}
+
 # Media files (Uploaded content)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Resized images served from /img/<width>/<quality>/... Only these widths
+# and qualities are accepted, so the endpoint can't be used to fill the disk.
+CMS_IMAGE_RESIZE_PREFIXES = ['/static/images/', '/media/uploads/']
+CMS_IMAGE_WIDTHS = [160, 320, 480, 640, 960, 1280, 1920]
+CMS_IMAGE_QUALITIES = [50, 65, 75, 85]
+CMS_IMAGE_DEFAULT_QUALITY = 75
+CMS_IMAGE_CACHE_DIR = os.path.join(BASE_DIR, 'image_cache')
+CMS_IMAGE_CACHE_MAX_SIZE = 512 * 1024 * 1024
+
+# Background jobs (python manage.py run_jobs). Concurrency caps how many jobs
+# of a kind run at once across all workers; failed jobs are retried after
+# CMS_JOB_RETRY_DELAY seconds, doubling each time. Running jobs not finished
+# after CMS_JOB_TIMEOUT seconds are assumed lost and queued again. Eager mode
+# runs jobs inside the request, for development without a worker.
+CMS_JOB_CONCURRENCY = {'image_variants': 2}
+CMS_JOB_RETRY_DELAY = 30
+CMS_JOB_TIMEOUT = 600
+CMS_JOBS_EAGER = False
+
+# Most changes the editor may send in one batch update request
+CMS_EDITOR_BATCH_MAX = 500
+
+# Chunked video uploads: chunk size, largest video accepted, and how long an
+# unfinished upload's chunks are kept (seconds) so it can be resumed
+CMS_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+CMS_VIDEO_MAX_SIZE = 2 * 1024 * 1024 * 1024
+CMS_UPLOAD_EXPIRY = 60 * 60 * 24
+
+# /media/ and /static/ are served by cms.serving (Range requests, ETags;
+# runserver keeps serving /static/ itself unless started with --nostatic). To
+# let nginx send the bytes, set CMS_FILE_OFFLOAD = 'x-accel' and add internal
+# locations matching CMS_FILE_OFFLOAD_LOCATIONS, e.g.
+#   location /protected/media/ { internal; alias /srv/site/media/; }
+#   location /protected/static/ { internal; alias /srv/site/staticfiles/; }
+# 'x-sendfile' does the same for Apache mod_xsendfile and lighttpd.
+CMS_FILE_OFFLOAD = None
+CMS_FILE_OFFLOAD_LOCATIONS = {
+    '/media/': '/protected/media/',
+    '/static/': '/protected/static/',
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 